@@ -1,3 +1,108 @@
-from django.test import TestCase
+import datetime
+import decimal
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from drf_orjson import ORJSONParser, ORJSONRenderer
+from kafka import TopicPartition
+from kafka.errors import NoBrokersAvailable
+from kafka.structs import OffsetAndMetadata
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from .views import MetricsView
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """
+    The orjson renderer must produce exactly the bytes of DRF's JSONRenderer.
+    """
+
+    def test_dashboard_payload(self):
+        now = datetime.datetime(2024, 11, 30, 18, 22, 1, 123456, tzinfo=datetime.timezone.utc)
+        data = {
+            "service_health": {
+                "user-service": {
+                    "status": "healthy",
+                    "last_check": now,
+                    "last_successful_check": now,
+                    "response_time": 12.5,
+                    "error_message": None,
+                },
+                "kafka": {"status": "down", "error_message": "NoBrokersAvailable", "topics": 3},
+            },
+            "service_metrics": {"kafka": {"broker_count": 1, "topic_count": 3, "partition_count": 1}},
+            "timestamp": now,
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_exponent_floats(self):
+        data = {"cpu_usage": 1e-7, "memory_usage": 2.5e-05, "bytes": 1e16, "ratio": decimal.Decimal("1E-7")}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_render_as_null(self):
+        # JSONRenderer raises instead; orjson cannot tell them apart from None in its output
+        for value in (float("nan"), float("inf"), -float("inf")):
+            self.assertEqual(ORJSONRenderer().render({"response_time": value}), b'{"response_time":null}')
+
+
+class ORJSONParserTests(SimpleTestCase):
+
+    def test_matches_json_parser(self):
+        body = b'{"service_name": "post-service", "cpu_usage": 12.5, "request_count": 10}'
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{"))
+
+
+class KafkaMetricsTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("api.views.KafkaAdminClient")
+        self.admin = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("api.views.KafkaConsumer")
+        self.consumer = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+        signup = [TopicPartition("user_signup", p) for p in range(3)]
+        self.admin.describe_cluster.return_value = {"brokers": [{"node_id": 1}, {"node_id": 2}]}
+        self.admin.describe_topics.return_value = [
+            {"topic": "user_signup", "partitions": [{"partition": p} for p in range(3)]},
+            {"topic": "__consumer_offsets", "partitions": [{"partition": p} for p in range(50)]},
+        ]
+        self.admin.list_consumer_groups.return_value = [("email_service_group", "consumer")]
+        self.admin.list_consumer_group_offsets.return_value = {
+            tp: OffsetAndMetadata(offset, "") for tp, offset in zip(signup, [10, 5, 7])
+        }
+        self.consumer.end_offsets.return_value = dict(zip(signup, [12, 5, 10]))
+
+    def test_counts_and_lag(self):
+        metrics = MetricsView().get_kafka_metrics()
+
+        self.assertEqual(metrics["broker_count"], 2)
+        self.assertEqual(metrics["topic_count"], 2)
+        self.assertEqual(metrics["partition_count"], 53)
+        self.assertEqual(
+            metrics["consumer_groups"],
+            {"email_service_group": {"lag": 5, "topics": {"user_signup": 5}}},
+        )
+        self.admin.close.assert_called_once()
+        self.consumer.close.assert_called_once()
+
+    def test_no_groups(self):
+        self.admin.list_consumer_groups.return_value = []
+
+        self.assertEqual(MetricsView().get_kafka_metrics()["consumer_groups"], {})
+        self.consumer.end_offsets.assert_not_called()
+
+    def test_unreachable_cluster(self):
+        self.admin.describe_cluster.side_effect = NoBrokersAvailable()
+
+        self.assertEqual(MetricsView().get_kafka_metrics(), {"error": "NoBrokersAvailable"})
@@ -1,7 +1,7 @@
 import os
 import time
 import requests
-from kafka import KafkaAdminClient
+from kafka import KafkaAdminClient, KafkaConsumer
 from kafka.admin import NewTopic
 from kafka.errors import KafkaError
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
@@ -174,26 +174,58 @@ class MetricsView(APIView):
     permission_classes = [AllowAny]
 
     def get_kafka_metrics(self):
-        """Get Kafka metrics through JMX interface"""
+        """Get broker, topic and partition counts and consumer group lag through the admin API"""
+        bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+        admin_client = None
         try:
-            # Try to get Kafka metrics through JMX
             admin_client = KafkaAdminClient(
-                bootstrap_servers=os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092"),
+                bootstrap_servers=bootstrap_servers,
                 client_id="admin-metrics",
             )
 
-            topics = admin_client.list_topics()
-            metrics = {
-                "broker_count": 1,  # Assuming single broker for now
+            cluster = admin_client.describe_cluster()
+            topics = admin_client.describe_topics()
+            return {
+                "broker_count": len(cluster["brokers"]),
                 "topic_count": len(topics),
-                "partition_count": 1,  # Default partition count
+                "partition_count": sum(len(topic["partitions"]) for topic in topics),
+                "consumer_groups": self.get_consumer_lag(admin_client, bootstrap_servers),
             }
 
-            admin_client.close()
-            return metrics
-
         except KafkaError as e:
             return {"error": str(e)}
+        finally:
+            if admin_client is not None:
+                admin_client.close()
+
+    def get_consumer_lag(self, admin_client, bootstrap_servers):
+        """
+        Lag per consumer group: for each partition the group has committed,
+        the distance from its committed offset to the end of the partition
+        """
+        committed = {
+            group_id: admin_client.list_consumer_group_offsets(group_id)
+            for group_id, _ in admin_client.list_consumer_groups()
+        }
+        partitions = {tp for offsets in committed.values() for tp in offsets}
+        if not partitions:
+            return {}
+
+        # Only a consumer can read end offsets; it joins no group
+        consumer = KafkaConsumer(bootstrap_servers=bootstrap_servers, client_id="admin-metrics")
+        try:
+            end_offsets = consumer.end_offsets(list(partitions))
+        finally:
+            consumer.close()
+
+        groups = {}
+        for group_id, offsets in committed.items():
+            topics = {}
+            for tp, offset in offsets.items():
+                lag = max(end_offsets.get(tp, offset.offset) - offset.offset, 0)
+                topics[tp.topic] = topics.get(tp.topic, 0) + lag
+            groups[group_id] = {"lag": sum(topics.values()), "topics": topics}
+        return groups
 
     def get(self, request, format=None):
         """
@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for admin-service.
+
+    gunicorn -c gunicorn.conf.py
+
+The Django app is imported once in the master (preload_app) and forked into
+workers, which open their own MySQL connections.
+
+Environment:
+    GUNICORN_WORKER_CLASS  sync | gthread | uvicorn.workers.UvicornWorker (default: sync)
+    WEB_CONCURRENCY        number of worker processes (default: 2 * CPUs + 1)
+    GUNICORN_THREADS       threads per gthread worker (default: 4)
+    GUNICORN_MAX_REQUESTS  recycle a worker after this many requests, 0 disables (default: 1000)
+    GUNICORN_MAX_REQUESTS_JITTER  random extra requests before recycling (default: 100)
+    GUNICORN_TIMEOUT       seconds before a silent worker is killed (default: 30)
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4 if worker_class == "gthread" else 1))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# ASGI workers serve config.asgi, the rest config.wsgi
+wsgi_app = "config.asgi:application" if "uvicorn" in worker_class else "config.wsgi:application"
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # Import the URLconf, views and serializers once in the master so workers inherit them
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
@@ -0,0 +1,19 @@
+"""
+orjson-backed JSON renderer and parser for Django REST framework.
+
+Drop-in replacements for DRF's `JSONRenderer` and `JSONParser` that write and
+read the same bytes, only faster:
+
+    REST_FRAMEWORK = {
+        "DEFAULT_RENDERER_CLASSES": ("drf_orjson.renderers.ORJSONRenderer", ...),
+        "DEFAULT_PARSER_CLASSES": ("drf_orjson.parsers.ORJSONParser", ...),
+    }
+
+orjson is optional; without it both fall back to DRF's classes. The package
+is copied into each service image by docker-compose, like `eventschema`;
+locally, put `backend/` on PYTHONPATH.
+"""
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+
+__all__ = ["ORJSONParser", "ORJSONRenderer"]
@@ -0,0 +1,26 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSON parser backed by orjson.
+    Falls back to `JSONParser` for non UTF-8 payloads or when orjson is missing.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
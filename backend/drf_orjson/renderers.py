@@ -0,0 +1,96 @@
+import datetime
+import decimal
+import re
+
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib renderer
+    orjson = None
+
+try:
+    from bson import ObjectId
+except ImportError:  # Only post-service stores documents
+    ObjectId = None
+
+# Applied to orjson's output before `EXPONENT_FLOAT` looks at it: every digit
+# but 0 becomes 1, and the separators before a value become ","
+FLOAT_DIGITS = bytes.maketrans(b"23456789:[", b"11111111,,")
+# A number that orjson writes differently from `json.dumps`: in exponent
+# notation (`1e-7` vs `1e-07`, `1e16` vs `1e+16`), or below 1e-4, which
+# orjson writes as `0.000025` and `json.dumps` as `2.5e-05`
+EXPONENT_FLOAT = re.compile(rb",-?(?:0\.0000|[01][.01]*e)")
+
+
+def orjson_default(obj):
+    """
+    Encode the types orjson does not handle natively, matching the output of
+    DRF's `JSONEncoder` so responses stay byte-for-byte identical.
+    """
+    if ObjectId is not None and isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__getitem__"):
+        cls = list if isinstance(obj, (list, tuple)) else dict
+        try:
+            return cls(obj)
+        except Exception:
+            pass
+    elif hasattr(obj, "__iter__"):
+        return tuple(item for item in obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def has_exponent_float(ret):
+    """
+    Return True if orjson's output `ret` may hold a float `json.dumps` would
+    write differently. Looks at the bytes only, never at the data; text in
+    strings can match too, which just costs a fallback.
+    """
+    # The "," stands in for a separator before a top-level number
+    return EXPONENT_FLOAT.search((b"," + ret).translate(FLOAT_DIGITS)) is not None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+    Produces the same bytes as `JSONRenderer` for compact output and falls back
+    to it for indented output, values orjson rejects, output holding floats
+    orjson formats differently (see `has_exponent_float`), or when orjson is
+    missing. NaN and Infinity render as `null`, where `JSONRenderer` raises.
+    """
+
+    options = 0 if orjson is None else orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=orjson_default, option=self.options)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if has_exponent_float(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Match JSONRenderer, which always escapes \u2028 and \u2029
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
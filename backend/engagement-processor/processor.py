@@ -0,0 +1,366 @@
+"""
+Engagement aggregates materialized from `post_events` into Redis.
+
+post-service publishes posts created and deleted, and likes and comments added
+and removed, to `post_events`, keyed by post id. This worker counts them per
+post and per author, all-time and per WINDOW_SECONDS tumbling window, and keeps
+the counts in Redis hashes:
+
+    engagement:post:<post_id>              likes, comments
+    engagement:author:<username>           posts, likes, comments (received)
+    engagement:window:<start>:posts        <post_id>:likes, <post_id>:comments
+    engagement:window:<start>:authors      <username>:likes, <username>:comments
+    engagement:deleted:<post_id>           tombstone of a deleted post
+
+A post hash is created by `post_created` and only incremented after that, so
+posts created before the first run get none and are counted in MongoDB.
+Deleting a post deletes its hash and leaves a tombstone for TOMBSTONE_SECONDS.
+Likes and comments read after the delete are not counted while it lasts, so
+a late `like_removed` cannot bring the hash back with negative counts.
+
+With ENGAGEMENT_FROM_REDIS, post-service reads the post hashes instead of
+counting likes and comments in MongoDB for every post of a feed.
+
+Counts are added up in memory per partition and flushed every FLUSH_INTERVAL
+seconds, or once FLUSH_EVENTS events are pending. A flush is one MULTI/EXEC
+that adds the pending counts and moves the partition's offset in
+`engagement:offsets`, so the counts and the position they cover are always
+stored, and snapshotted by Redis, together. An assigned partition resumes from
+the offset in Redis rather than the group's, so a restart or rebalance neither
+loses an event nor counts one twice. The offsets hash is watched while
+flushing: if another member has moved a partition's offset since this one read
+it, the partition's pending counts are dropped rather than written.
+"""
+import logging
+import os
+import signal
+import time
+from collections import defaultdict
+
+import redis
+from eventschema import decode, default_registry
+from kafka import ConsumerRebalanceListener, KafkaConsumer, OffsetAndMetadata
+from kafka.errors import KafkaError
+from prometheus_client import Counter, Histogram, start_http_server
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_SERVERS = os.getenv("KAFKA_BROKER", "kafka:9092").split(",")
+TOPIC = os.getenv("POST_EVENTS_TOPIC", "post_events")
+GROUP_ID = os.getenv("GROUP_ID", "engagement_processor")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+MAX_POLL_RECORDS = int(os.getenv("MAX_POLL_RECORDS", "500"))
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", "5"))
+FLUSH_EVENTS = int(os.getenv("FLUSH_EVENTS", "5000"))
+WINDOW_SECONDS = int(os.getenv("WINDOW_SECONDS", "3600"))
+# Window hashes expire once this many later windows have started
+WINDOW_RETENTION = int(os.getenv("WINDOW_RETENTION", "24"))
+# How long a deleted post's tombstone stops later like and comment events from counting
+TOMBSTONE_SECONDS = int(os.getenv("TOMBSTONE_SECONDS", str(7 * 24 * 3600)))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "8000"))
+POLL_TIMEOUT_MS = 1000
+
+OFFSETS = "engagement:offsets"
+
+# Counted field and amount for the events that change engagement
+ENGAGEMENT = {
+    "like_added": ("likes", 1),
+    "like_removed": ("likes", -1),
+    "comment_added": ("comments", 1),
+    "comment_removed": ("comments", -1),
+}
+
+EVENTS = Counter(
+    "engagement_events_total",
+    "post_events records read, by event type; skipped for records that were not counted",
+    ["type"],
+)
+FLUSHES = Counter(
+    "engagement_flushes_total",
+    "Partition flushes to Redis, by outcome: written, fenced or failed",
+    ["outcome"],
+)
+FLUSH_LATENCY = Histogram("engagement_flush_seconds", "Time one flush to Redis took")
+
+
+def post_key(post_id):
+    return f"engagement:post:{post_id}"
+
+
+def author_key(username):
+    return f"engagement:author:{username}"
+
+
+def tombstone_key(post_id):
+    return f"engagement:deleted:{post_id}"
+
+
+def window_key(start, kind):
+    return f"engagement:window:{start}:{kind}"
+
+
+def window_start(timestamp_ms):
+    return timestamp_ms // 1000 // WINDOW_SECONDS * WINDOW_SECONDS
+
+
+def offset_field(tp):
+    return f"{tp.topic}:{tp.partition}"
+
+
+class Aggregates:
+    """Counts read from one partition and not yet written to Redis."""
+
+    def __init__(self):
+        # Posts created, which get a hash with zero counts
+        self.created = set()
+        # {(username, "posts"): amount}
+        self.authors = defaultdict(int)
+        # {(post_id, author, window start, field): amount}
+        self.engagement = defaultdict(int)
+        self.deleted = set()
+        self.events = 0
+        self.next_offset = None
+
+    def add(self, event, timestamp_ms):
+        """Count one event. Returns False for events that do not change engagement."""
+        kind = event.get("type")
+        post_id = event.get("post_id")
+        if post_id in self.deleted:
+            return False
+        if kind == "post_created":
+            # Zero counts, so feeds find the hash instead of counting in MongoDB
+            self.created.add(post_id)
+            self.authors[(event["username"], "posts")] += 1
+        elif kind == "post_deleted":
+            self.deleted.add(post_id)
+            self.created.discard(post_id)
+            self.authors[(event["username"], "posts")] -= 1
+        elif kind in ENGAGEMENT:
+            field, amount = ENGAGEMENT[kind]
+            self.engagement[(post_id, event["author"], window_start(timestamp_ms), field)] += amount
+        else:
+            return False
+        return True
+
+    def post_ids(self):
+        """Posts whose engagement changed."""
+        return {post_id for post_id, _, _, _ in self.engagement}
+
+    def write(self, pipe, tombstoned=(), existing=()):
+        """
+        Queue the counts on `pipe`, except engagement with posts in `tombstoned`.
+        Post hashes are only incremented if they are in `existing` or were
+        created here, so a post from before the first run keeps no partial counts.
+        """
+        posts = defaultdict(int)
+        authors = defaultdict(int, self.authors)
+        windows = defaultdict(int)
+        for post_id in self.created:
+            posts[(post_id, "likes")] += 0
+            posts[(post_id, "comments")] += 0
+        for (post_id, author, start, field), amount in self.engagement.items():
+            # Read after the post was deleted by an earlier flush
+            if post_id in tombstoned:
+                continue
+            # Counted before the post was deleted: the author keeps them, the post hash goes
+            if post_id not in self.deleted and (post_id in existing or post_id in self.created):
+                posts[(post_id, field)] += amount
+            authors[(author, field)] += amount
+            windows[(start, "posts", f"{post_id}:{field}")] += amount
+            windows[(start, "authors", f"{author}:{field}")] += amount
+
+        for post_id in self.deleted:
+            pipe.delete(post_key(post_id))
+            pipe.set(tombstone_key(post_id), 1, ex=TOMBSTONE_SECONDS)
+        for (post_id, field), amount in posts.items():
+            pipe.hincrby(post_key(post_id), field, amount)
+        for (username, field), amount in authors.items():
+            pipe.hincrby(author_key(username), field, amount)
+        starts = set()
+        for (start, kind, field), amount in windows.items():
+            pipe.hincrby(window_key(start, kind), field, amount)
+            starts.add(start)
+        for start in starts:
+            expire_at = start + WINDOW_SECONDS * (WINDOW_RETENTION + 1)
+            for kind in ("posts", "authors"):
+                pipe.expireat(window_key(start, kind), expire_at)
+
+
+class Rebalance(ConsumerRebalanceListener):
+    def __init__(self, processor):
+        self.processor = processor
+
+    def on_partitions_revoked(self, revoked):
+        if revoked:
+            logger.info(f"Partitions revoked: {sorted(str(tp) for tp in revoked)}")
+            self.processor.revoke(revoked)
+
+    def on_partitions_assigned(self, assigned):
+        logger.info(f"Partitions assigned: {sorted(str(tp) for tp in assigned)}")
+        self.processor.assign(assigned)
+
+
+class Processor:
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or redis.Redis.from_url(REDIS_URL)
+        self.consumer = None
+        self.pending = {}
+        # The offset in Redis for each assigned partition, as last read or written here
+        self.stored = {}
+        self._last_flush = time.monotonic()
+        self._running = False
+
+    def create_consumer(self):
+        return KafkaConsumer(
+            bootstrap_servers=BOOTSTRAP_SERVERS,
+            group_id=GROUP_ID,
+            auto_offset_reset="earliest",
+            enable_auto_commit=False,
+            max_poll_records=MAX_POLL_RECORDS,
+        )
+
+    def run(self):
+        # Raises IncompatibleSchema before anything is counted
+        default_registry().decoder(TOPIC)
+        self.consumer = self.create_consumer()
+        self.consumer.subscribe(topics=[TOPIC], listener=Rebalance(self))
+        start_http_server(METRICS_PORT)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self._running = True
+        logger.info(f"Counting engagement from {TOPIC} as {GROUP_ID}")
+        try:
+            while self._running:
+                batch = self.consumer.poll(timeout_ms=POLL_TIMEOUT_MS)
+                for tp, records in batch.items():
+                    self.count(tp, records)
+                if self.due():
+                    self.flush()
+            self.flush()
+        finally:
+            self.consumer.close()
+
+    def stop(self, *args):
+        self._running = False
+
+    def assign(self, partitions):
+        """Seek each assigned partition to the offset its counts in Redis cover."""
+        partitions = list(partitions)
+        if not partitions:
+            return
+        stored = self.redis.hmget(OFFSETS, [offset_field(tp) for tp in partitions])
+        for tp, offset in zip(partitions, stored):
+            self.pending[tp] = Aggregates()
+            if offset is None:
+                # Nothing counted yet: the group's committed offset may outlive the counts
+                self.stored[tp] = None
+                self.consumer.seek_to_beginning(tp)
+            else:
+                self.stored[tp] = int(offset)
+                self.consumer.seek(tp, int(offset))
+
+    def revoke(self, partitions):
+        self.flush(partitions)
+        for tp in partitions:
+            self.pending.pop(tp, None)
+            self.stored.pop(tp, None)
+
+    def count(self, tp, records):
+        aggregates = self.pending[tp]
+        for record in records:
+            kind = "skipped"
+            # An unknown schema id stops the worker rather than skipping the record,
+            # which the counts would then miss: deploy new schemas here first
+            try:
+                event = decode(TOPIC, record.value)
+                if aggregates.add(event, record.timestamp):
+                    kind = event["type"]
+            except (ValueError, KeyError) as e:
+                logger.error(f"Skipping bad record {tp.topic}[{tp.partition}]@{record.offset}: {str(e)}")
+            EVENTS.labels(kind).inc()
+            aggregates.events += 1
+            aggregates.next_offset = record.offset + 1
+
+    def due(self):
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            return True
+        return sum(aggregates.events for aggregates in self.pending.values()) >= FLUSH_EVENTS
+
+    def flush(self, partitions=None):
+        """Write the pending counts of `partitions`, all by default, with their offsets."""
+        self._last_flush = time.monotonic()
+        partitions = [
+            tp for tp in (self.pending if partitions is None else partitions)
+            if tp in self.pending and self.pending[tp].next_offset is not None
+        ]
+        if not partitions:
+            return
+        start = time.perf_counter()
+        fields = [offset_field(tp) for tp in partitions]
+        try:
+            with self.redis.pipeline() as pipe:
+                pipe.watch(OFFSETS)
+                stored = pipe.hmget(OFFSETS, fields)
+                owned = []
+                for tp, offset in zip(partitions, stored):
+                    offset = None if offset is None else int(offset)
+                    if offset == self.stored[tp]:
+                        owned.append(tp)
+                    else:
+                        self.fence(tp, offset)
+                if not owned:
+                    return
+                post_ids = sorted(set().union(*(self.pending[tp].post_ids() for tp in owned)))
+                tombstoned, existing = self.lookup(post_ids)
+                pipe.multi()
+                for tp in owned:
+                    self.pending[tp].write(pipe, tombstoned, existing)
+                    pipe.hset(OFFSETS, offset_field(tp), self.pending[tp].next_offset)
+                pipe.execute()
+        except redis.RedisError as e:
+            # WatchError included: the counts stay pending, and are only lost if the
+            # partition is revoked first, in which case its offset was not moved either
+            FLUSHES.labels("failed").inc(len(partitions))
+            logger.error(f"Error flushing engagement counts: {str(e)}")
+            return
+        FLUSH_LATENCY.observe(time.perf_counter() - start)
+        FLUSHES.labels("written").inc(len(owned))
+
+        offsets = {}
+        for tp in owned:
+            self.stored[tp] = self.pending[tp].next_offset
+            offsets[tp] = OffsetAndMetadata(self.stored[tp], "")
+            self.pending[tp] = Aggregates()
+        # Only reported as the group's lag: partitions resume from the offsets in Redis
+        try:
+            self.consumer.commit(offsets)
+        except KafkaError as e:
+            logger.error(f"Error committing offsets: {str(e)}")
+
+    def lookup(self, post_ids):
+        """Return which of `post_ids` have a tombstone and which have a hash, in one round trip."""
+        if not post_ids:
+            return set(), set()
+        # Both keys of a post are only written by the member owning its partition
+        with self.redis.pipeline(transaction=False) as pipe:
+            for post_id in post_ids:
+                pipe.exists(tombstone_key(post_id))
+                pipe.exists(post_key(post_id))
+            found = pipe.execute()
+        tombstoned = {post_id for post_id, dead in zip(post_ids, found[0::2]) if dead}
+        existing = {post_id for post_id, known in zip(post_ids, found[1::2]) if known}
+        return tombstoned, existing
+
+    def fence(self, tp, offset):
+        """Drop the pending counts of a partition another member has written since."""
+        FLUSHES.labels("fenced").inc()
+        logger.warning(f"Offset of {tp} moved to {offset} by another member, dropping pending counts")
+        self.pending[tp] = Aggregates()
+        self.stored[tp] = offset
+        if offset is not None and tp in self.consumer.assignment():
+            self.consumer.seek(tp, offset)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    Processor().run()
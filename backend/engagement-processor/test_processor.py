@@ -0,0 +1,292 @@
+"""
+Tests for the engagement processor, against fakeredis and a stub consumer.
+
+    cd backend/engagement-processor && PYTHONPATH=.. python -m pytest
+"""
+import time
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+import fakeredis
+from eventschema import encode
+from kafka import OffsetAndMetadata, TopicPartition
+
+import processor
+from processor import OFFSETS, Processor, author_key, post_key, tombstone_key, window_key, window_start
+
+Record = namedtuple("Record", "offset timestamp value")
+
+TP = TopicPartition("post_events", 0)
+OTHER = TopicPartition("post_events", 1)
+
+
+def event(kind, post_id="p1", **fields):
+    if kind in ("post_created", "post_deleted"):
+        fields.setdefault("username", "bob")
+    else:
+        fields.setdefault("username", "alice")
+        fields.setdefault("author", "bob")
+    return {"type": kind, "post_id": post_id, **fields}
+
+
+class StubConsumer:
+    def __init__(self):
+        self.positions = {}
+        self.commits = []
+        self.assigned = set()
+
+    def assignment(self):
+        return self.assigned
+
+    def seek(self, tp, offset):
+        self.positions[tp] = offset
+
+    def seek_to_beginning(self, tp):
+        self.positions[tp] = "beginning"
+
+    def commit(self, offsets):
+        self.commits.append(dict(offsets))
+
+
+class ProcessorTests(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=self.server)
+        self.processor = self.member()
+        self.offset = 0
+        self.now_ms = int(time.time() * 1000)
+
+    def member(self):
+        """A processor on its own connection, like another member of the group."""
+        member = Processor(fakeredis.FakeRedis(server=self.server))
+        member.consumer = StubConsumer()
+        return member
+
+    def assign(self, member, *partitions):
+        member.consumer.assigned.update(partitions)
+        member.assign(partitions)
+
+    def count(self, member, tp, *events, offset=None):
+        offset = self.offset if offset is None else offset
+        records = []
+        for i, value in enumerate(events):
+            records.append(Record(offset + i, self.now_ms, encode("post_events", value)))
+        self.offset = offset + len(events)
+        member.count(tp, records)
+
+    def existing(self, post_id):
+        """A post whose post_created was counted in an earlier run."""
+        self.redis.hset(post_key(post_id), mapping={"likes": 0, "comments": 0})
+
+    def hash(self, key):
+        return {field.decode(): int(value) for field, value in self.redis.hgetall(key).items()}
+
+    def test_flush_writes_counts_with_the_offset(self):
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP,
+                   event("post_created"), event("like_added"), event("comment_added"),
+                   event("like_added", username="carol"), event("like_removed"))
+
+        self.processor.flush()
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 1, "comments": 1})
+        self.assertEqual(self.hash(author_key("bob")), {"posts": 1, "likes": 1, "comments": 1})
+        start = window_start(self.now_ms)
+        self.assertEqual(self.hash(window_key(start, "posts")), {"p1:likes": 1, "p1:comments": 1})
+        self.assertEqual(self.hash(window_key(start, "authors")), {"bob:likes": 1, "bob:comments": 1})
+        self.assertEqual(self.redis.hget(OFFSETS, "post_events:0"), b"5")
+        self.assertEqual(self.processor.consumer.commits, [{TP: OffsetAndMetadata(5, "")}])
+
+    def test_new_post_gets_zero_counts(self):
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("post_created"))
+
+        self.processor.flush()
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 0, "comments": 0})
+
+    def test_post_from_before_the_first_run_gets_no_hash(self):
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("like_added"), event("comment_added"))
+        self.processor.flush()
+        self.count(self.processor, TP, event("like_added"))
+        self.processor.flush()
+
+        # post-service counts it in MongoDB instead of showing only the likes since the deploy
+        self.assertFalse(self.redis.exists(post_key("p1")))
+        self.assertEqual(self.hash(author_key("bob")), {"likes": 2, "comments": 1})
+        self.assertEqual(self.redis.hget(OFFSETS, "post_events:0"), b"3")
+
+    def test_post_created_in_an_earlier_flush_is_counted(self):
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("post_created"))
+        self.processor.flush()
+
+        self.count(self.processor, TP, event("like_added"), event("comment_added"))
+        self.processor.flush()
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 1, "comments": 1})
+
+    def test_nothing_to_flush(self):
+        self.assign(self.processor, TP)
+
+        self.processor.flush()
+
+        self.assertEqual(self.redis.hgetall(OFFSETS), {})
+        self.assertEqual(self.processor.consumer.commits, [])
+
+    def test_assigned_partition_resumes_from_the_offset_in_redis(self):
+        self.redis.hset(OFFSETS, "post_events:0", 42)
+
+        self.assign(self.processor, TP, OTHER)
+
+        # The partition without counts in Redis starts over, whatever the group committed
+        self.assertEqual(self.processor.consumer.positions, {TP: 42, OTHER: "beginning"})
+        self.assertEqual(self.processor.stored, {TP: 42, OTHER: None})
+
+    def test_counts_are_not_added_twice_after_a_restart(self):
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("post_created"), event("like_added"), event("like_added"))
+        self.processor.flush()
+
+        restarted = self.member()
+        self.assign(restarted, TP)
+        self.assertEqual(restarted.consumer.positions, {TP: 3})
+        self.count(restarted, TP, event("like_added"), offset=3)
+        restarted.flush()
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 3, "comments": 0})
+
+    def test_member_whose_offset_moved_is_fenced(self):
+        self.existing("p1")
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("like_added"), event("like_added"))
+        # The partition moves to another member, which counts the same events and more
+        other = self.member()
+        self.assign(other, TP)
+        self.count(other, TP, event("like_added"), event("like_added"), event("like_added"), offset=0)
+        other.flush()
+
+        self.processor.flush()
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 3, "comments": 0})
+        self.assertEqual(self.redis.hget(OFFSETS, "post_events:0"), b"3")
+        self.assertEqual(self.processor.consumer.positions[TP], 3)
+        self.assertEqual(self.processor.stored[TP], 3)
+        self.assertIsNone(self.processor.pending[TP].next_offset)
+        self.assertEqual(self.processor.consumer.commits, [])
+
+    def test_offset_moved_during_the_flush_aborts_it(self):
+        self.existing("p1")
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("like_added"))
+        write = processor.Aggregates.write
+
+        def interleaved(aggregates, pipe, *args):
+            # Another member writes between WATCH and EXEC
+            self.redis.hset(OFFSETS, "post_events:0", 7)
+            write(aggregates, pipe, *args)
+
+        with mock.patch.object(processor.Aggregates, "write", interleaved):
+            self.processor.flush()
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 0, "comments": 0})
+        self.assertEqual(self.redis.hget(OFFSETS, "post_events:0"), b"7")
+        # Kept pending until the next flush, which finds the offset moved and fences
+        self.assertEqual(self.processor.pending[TP].next_offset, 1)
+        self.processor.flush()
+        self.assertIsNone(self.processor.pending[TP].next_offset)
+        self.assertEqual(self.processor.consumer.positions[TP], 7)
+
+    def test_revoked_partition_is_flushed(self):
+        self.existing("p1")
+        self.assign(self.processor, TP, OTHER)
+        self.count(self.processor, TP, event("like_added"))
+        self.count(self.processor, OTHER, event("comment_added", post_id="p2"), offset=10)
+
+        self.processor.revoke({TP})
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 1, "comments": 0})
+        self.assertFalse(self.redis.exists(post_key("p2")))
+        self.assertEqual(self.processor.consumer.commits, [{TP: OffsetAndMetadata(1, "")}])
+        self.assertNotIn(TP, self.processor.pending)
+        self.assertIn(OTHER, self.processor.pending)
+
+    def test_windows_expire_after_the_retention(self):
+        self.existing("p1")
+        self.assign(self.processor, TP)
+        start = window_start(self.now_ms)
+        self.count(self.processor, TP, event("like_added"))
+
+        self.processor.flush()
+
+        expire_at = start + processor.WINDOW_SECONDS * (processor.WINDOW_RETENTION + 1)
+        for kind in ("posts", "authors"):
+            self.assertEqual(self.redis.expiretime(window_key(start, kind)), expire_at)
+        # All-time counts do not expire
+        self.assertEqual(self.redis.ttl(post_key("p1")), -1)
+
+    def test_old_window_is_not_written(self):
+        self.existing("p1")
+        self.assign(self.processor, TP)
+        self.now_ms = 1_000_000_000_000
+        self.count(self.processor, TP, event("like_added"))
+
+        self.processor.flush()
+
+        self.assertFalse(self.redis.exists(window_key(window_start(self.now_ms), "posts")))
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 1, "comments": 0})
+
+    def test_deleted_post_hash_is_not_recreated(self):
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("post_created"), event("like_added"), event("post_deleted"))
+        self.processor.flush()
+        self.assertFalse(self.redis.exists(post_key("p1")))
+        self.assertGreater(self.redis.ttl(tombstone_key("p1")), 0)
+
+        self.count(self.processor, TP, event("like_removed"), event("comment_removed"))
+        self.processor.flush()
+
+        self.assertFalse(self.redis.exists(post_key("p1")))
+        # The like before the delete stays with the author; the removals after it do not count
+        self.assertEqual(self.hash(author_key("bob")), {"posts": 0, "likes": 1})
+        self.assertEqual(self.redis.hget(OFFSETS, "post_events:0"), b"5")
+
+    def test_tombstone_holds_after_a_restart(self):
+        self.existing("p2")
+        self.assign(self.processor, TP)
+        self.count(self.processor, TP, event("post_created"), event("post_deleted"))
+        self.processor.flush()
+
+        restarted = self.member()
+        self.assign(restarted, TP)
+        self.count(restarted, TP, event("like_removed"), event("like_added", post_id="p2"), offset=2)
+        restarted.flush()
+
+        self.assertFalse(self.redis.exists(post_key("p1")))
+        self.assertEqual(self.hash(post_key("p2")), {"likes": 1, "comments": 0})
+
+    def test_events_after_a_delete_in_the_same_batch_are_skipped(self):
+        self.assign(self.processor, TP)
+
+        self.count(self.processor, TP, event("post_created"), event("post_deleted"), event("like_removed"))
+        self.processor.flush()
+
+        self.assertFalse(self.redis.exists(post_key("p1")))
+        self.assertEqual(self.hash(author_key("bob")), {"posts": 0})
+
+    def test_undecodable_record_is_skipped(self):
+        self.existing("p1")
+        self.assign(self.processor, TP)
+
+        self.processor.count(TP, [Record(0, self.now_ms, b"\x00\x00"),
+                                  Record(1, self.now_ms, encode("post_events", event("like_added")))])
+        self.processor.flush()
+
+        self.assertEqual(self.hash(post_key("p1")), {"likes": 1, "comments": 0})
+        self.assertEqual(self.redis.hget(OFFSETS, "post_events:0"), b"2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Versioned schemas and a compact binary encoding for the events on Kafka.
+
+Producers encode with the latest version of the topic's schema, consumers
+decode into the version they were written against:
+
+    from eventschema import decode, encode
+
+    data = encode("post_events", {"type": "like_added", "post_id": "...", ...})
+    event = decode("post_events", data)
+
+See `codec` for the wire format and `registry` for how versions evolve. The
+package is copied into each service image by docker-compose; locally, put
+`backend/` on PYTHONPATH.
+"""
+from functools import lru_cache
+
+from .errors import IncompatibleSchema, SchemaError, UnknownSchema
+from .registry import Registry
+
+__all__ = [
+    "IncompatibleSchema",
+    "Registry",
+    "SchemaError",
+    "UnknownSchema",
+    "decode",
+    "default_registry",
+    "encode",
+]
+
+
+@lru_cache(maxsize=None)
+def default_registry():
+    return Registry()
+
+
+def encode(subject, event):
+    return default_registry().encoder(subject).encode(event)
+
+
+def decode(subject, data, version=None):
+    return default_registry().decoder(subject, version).decode(data)
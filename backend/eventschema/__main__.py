@@ -0,0 +1,42 @@
+"""
+    python -m eventschema check               # every version of every subject reads every other
+    python -m eventschema register FILE.json  # add FILE as the next version of its subject
+"""
+import argparse
+import json
+import sys
+
+from . import IncompatibleSchema, Registry
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m eventschema", description="Manage event schemas")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("check", help="Check that all versions of each subject are compatible")
+    register = commands.add_parser("register", help="Add the next version of a subject")
+    register.add_argument("file", help="JSON with the subject and its fields")
+    args = parser.parse_args()
+
+    registry = Registry()
+    if args.command == "check":
+        problems = registry.problems()
+        for problem in problems:
+            print(problem)
+        subjects = registry.subjects()
+        print(f"{len(subjects)} subjects, {len(problems)} problems")
+        return 1 if problems else 0
+
+    with open(args.file) as f:
+        data = json.load(f)
+    try:
+        schema = registry.register(data)
+    except IncompatibleSchema as e:
+        for problem in e.problems:
+            print(problem)
+        return 1
+    print(f"Registered {schema} with id {schema.id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
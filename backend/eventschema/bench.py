@@ -0,0 +1,65 @@
+"""
+Compare the schema encoding with JSON, the encoding events used before, on
+representative events of each subject.
+
+    python -m eventschema.bench --events 100000
+"""
+import argparse
+import json
+import time
+
+import msgpack
+
+from . import default_registry
+
+EVENTS = {
+    "user_signup": {
+        "user_id": 48213, "username": "alice_w", "first_name": "Alice", "last_name": "Walker",
+        "email": "alice.walker@example.com",
+    },
+    "user_unfollowed": {
+        "follower_id": 48213, "follower": "alice_w", "followee_id": 1177, "followee": "bob",
+    },
+    "post_events": {
+        "type": "like_added", "post_id": "6650f1c2a9d3b27e4c1d8a90", "username": "alice_w",
+        "author": "bob",
+    },
+}
+
+
+def codecs(subject):
+    encoder = default_registry().encoder(subject)
+    decoder = default_registry().decoder(subject)
+    return [
+        # What the producers and consumers did before
+        ("json", lambda event: json.dumps(event).encode("utf-8"), lambda data: json.loads(data.decode("utf-8"))),
+        # msgpack with field names, to separate the schema's saving from msgpack's
+        ("msgpack map", lambda event: msgpack.packb(event), lambda data: msgpack.unpackb(data)),
+        ("eventschema", encoder.encode, decoder.decode),
+    ]
+
+
+def timed(func, values):
+    start = time.perf_counter()
+    results = [func(value) for value in values]
+    return len(values) / (time.perf_counter() - start), results
+
+
+def run(subject, event, count):
+    print(subject)
+    # Decoded events carry every reader field, so compare against those
+    event = default_registry().decoder(subject).decode(default_registry().encoder(subject).encode(event))
+    events = [dict(event) for _ in range(count)]
+    for name, encode, decode in codecs(subject):
+        encode_rate, encoded = timed(encode, events)
+        decode_rate, decoded = timed(decode, encoded)
+        assert decoded[0] == event, name
+        print(f"  {name:12} {len(encoded[0]):5} bytes  {encode_rate:10.0f} enc/s  {decode_rate:10.0f} dec/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+    for subject, event in EVENTS.items():
+        run(subject, event, args.events)
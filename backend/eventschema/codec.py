@@ -0,0 +1,189 @@
+"""
+The binary encoding of events.
+
+An encoded event starts with a 3-byte header: a zero byte, then the writer
+schema's id as an unsigned 16-bit integer. The field values follow as one
+msgpack array, in the order of the writer schema's fields. Field names are never sent, and
+enums are sent as the index of their symbol.
+
+Readers decode with the writer schema the header names, then map its fields
+onto their own: fields the writer does not have take the reader's default, and
+fields the reader does not have are dropped. Events published as JSON, before
+topics had schemas, start with "{" and are read the same way.
+"""
+import copy
+import json
+import struct
+
+import msgpack
+
+from .errors import SchemaError
+from .schema import NO_DEFAULT, check_readable
+
+MAGIC = 0
+HEADER = struct.Struct(">BH")
+
+
+def _check(kind, test):
+    def convert(value):
+        if not test(value):
+            raise SchemaError(f"Expected {kind}, got {type(value).__name__}")
+        return value
+    return convert
+
+
+def _double(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise SchemaError(f"Expected double, got {type(value).__name__}")
+    return float(value)
+
+
+def writer_for(type_):
+    """A function that checks a value of `type_` and returns what is packed for it."""
+    kind = type_[0]
+    if kind == "string":
+        return _check("string", lambda value: isinstance(value, str))
+    if kind == "long":
+        return _check("long", lambda value: isinstance(value, int) and not isinstance(value, bool))
+    if kind == "double":
+        return _double
+    if kind == "boolean":
+        return _check("boolean", lambda value: isinstance(value, bool))
+    if kind == "array":
+        item = writer_for(type_[1])
+
+        def array(value):
+            if not isinstance(value, (list, tuple)):
+                raise SchemaError(f"Expected array, got {type(value).__name__}")
+            return [item(element) for element in value]
+        return array
+    if kind == "enum":
+        index = {symbol: position for position, symbol in enumerate(type_[1])}
+
+        def enum(value):
+            try:
+                return index[value]
+            except (KeyError, TypeError):
+                raise SchemaError(f"{value!r} is not one of {list(type_[1])}")
+        return enum
+    inner = writer_for(type_[1])
+    return lambda value: None if value is None else inner(value)
+
+
+def reader_for(writer, reader):
+    """A function turning an unpacked `writer` value into a `reader` value, or None if unchanged."""
+    if writer[0] == "nullable" or reader[0] == "nullable":
+        inner = reader_for(
+            writer[1] if writer[0] == "nullable" else writer,
+            reader[1] if reader[0] == "nullable" else reader,
+        )
+        if inner is None:
+            return None
+        return lambda value: None if value is None else inner(value)
+    if writer[0] == "enum":
+        return writer[1].__getitem__
+    if writer[0] == "long" and reader[0] == "double":
+        return float
+    if writer[0] == "array":
+        item = reader_for(writer[1], reader[1])
+        if item is None:
+            return None
+        return lambda value: [item(element) for element in value]
+    return None
+
+
+class Encoder:
+    def __init__(self, schema):
+        self.schema = schema
+        self.header = HEADER.pack(MAGIC, schema.id)
+        self.names = frozenset(field.name for field in schema.fields)
+        self.fields = [(field.name, field.default, writer_for(field.type)) for field in schema.fields]
+
+    def encode(self, event):
+        extra = event.keys() - self.names
+        if extra:
+            raise SchemaError(f"{sorted(extra)} not in {self.schema}")
+        values = []
+        for name, default, convert in self.fields:
+            value = event.get(name, default)
+            if value is NO_DEFAULT:
+                raise SchemaError(f"{name} is required by {self.schema}")
+            try:
+                values.append(convert(value))
+            except SchemaError as e:
+                raise SchemaError(f"{name} in {self.schema}: {str(e)}")
+        return self.header + msgpack.packb(values, use_bin_type=True)
+
+
+class Decoder:
+    """
+    Decodes events of one subject into dicts shaped by the `reader` schema.
+    Raises IncompatibleSchema up front if any registered version of the subject
+    cannot be read with it.
+    """
+
+    def __init__(self, registry, reader):
+        self.registry = registry
+        self.reader = reader
+        check_readable(reader, registry.versions(reader.subject))
+        self._plans = {}
+
+    def plan(self, schema_id):
+        plan = self._plans.get(schema_id)
+        if plan is None:
+            writer = self.registry.by_id(schema_id)
+            if writer.subject != self.reader.subject:
+                raise SchemaError(f"Expected a {self.reader.subject} event, got {writer}")
+            check_readable(self.reader, [writer])
+            positions = {field.name: position for position, field in enumerate(writer.fields)}
+            steps = []
+            for field in self.reader.fields:
+                position = positions.get(field.name)
+                convert = None
+                if position is not None:
+                    convert = reader_for(writer.fields[position].type, field.type)
+                steps.append((field.name, position, convert, field.default))
+            plan = self._plans[schema_id] = (len(writer.fields), steps)
+        return plan
+
+    def decode(self, data):
+        if data[:1] == b"{":
+            return self.decode_json(data)
+        if len(data) < HEADER.size or data[0] != MAGIC:
+            raise SchemaError("Not an encoded event")
+        width, steps = self.plan(HEADER.unpack_from(data)[1])
+        try:
+            values = msgpack.unpackb(memoryview(data)[HEADER.size:], raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as e:
+            raise SchemaError(f"Undecodable {self.reader.subject} event: {type(e).__name__}: {str(e)}")
+        if not isinstance(values, list) or len(values) != width:
+            raise SchemaError(f"Malformed {self.reader.subject} event")
+        event = {}
+        try:
+            for name, position, convert, default in steps:
+                if position is None:
+                    event[name] = copy.copy(default)
+                elif convert is None:
+                    event[name] = values[position]
+                else:
+                    event[name] = convert(values[position])
+        except (IndexError, TypeError) as e:
+            raise SchemaError(f"Malformed {self.reader.subject} event: {str(e)}")
+        return event
+
+    def decode_json(self, data):
+        try:
+            value = json.loads(data)
+        except ValueError as e:
+            raise SchemaError(f"Undecodable {self.reader.subject} event: {str(e)}")
+        if not isinstance(value, dict):
+            raise SchemaError(f"Malformed {self.reader.subject} event")
+        event = {}
+        for field in self.reader.fields:
+            if field.name in value:
+                event[field.name] = value[field.name]
+            elif field.has_default:
+                event[field.name] = copy.copy(field.default)
+            else:
+                raise SchemaError(f"{field.name} is required by {self.reader}")
+        return event
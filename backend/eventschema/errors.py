@@ -0,0 +1,15 @@
+class SchemaError(ValueError):
+    """An event or a schema file that does not match what it should."""
+
+
+class IncompatibleSchema(SchemaError):
+    def __init__(self, message, problems):
+        super().__init__(f"{message}: {'; '.join(problems)}")
+        self.problems = problems
+
+
+class UnknownSchema(LookupError):
+    """
+    An event written with a schema id this registry does not have, typically by
+    a producer deployed with a newer registry than the consumer.
+    """
@@ -0,0 +1,117 @@
+"""
+Publish events from request handlers without waiting on Kafka.
+
+`publish()` only queues the event. A sender thread per process owns one
+KafkaProducer, built by the `create_producer` callable the service passes in,
+and sends the queue in order. Kafka keeps the order of records with the same
+key only if the producer retries them itself with one request in flight per
+connection, so configure it with `retries` and
+`max_in_flight_requests_per_connection=1`. An event the producer gave up on
+is counted and logged, never queued again behind newer ones.
+
+    publisher = EventPublisher(create_producer, queue_size=10000, count=count)
+    publisher.publish("post_events", {"type": "like_added", ...}, key=post_id)
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+from kafka.errors import KafkaError
+
+logger = logging.getLogger(__name__)
+
+# Sends of one event that fail before reaching the producer, e.g. no broker reachable
+SEND_ATTEMPTS = 5
+# Pause between them
+RETRY_BACKOFF = 1.0
+
+
+class EventPublisher:
+    def __init__(self, create_producer, queue_size=10000, count=None):
+        """`count(topic, outcome)` is called with "delivered", "retried", "failed" or "dropped"."""
+        self.create_producer = create_producer
+        self.queue_size = queue_size
+        self.count = count or (lambda topic, outcome: None)
+        self._queue = None
+        self._thread = None
+        self._producer = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_sender(self):
+        # Threads do not survive fork, so each worker starts its own sender
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.queue_size)
+                    self._producer = None
+                    self._thread = threading.Thread(
+                        target=self._run, name="kafka-events", daemon=True
+                    )
+                    self._pid = os.getpid()
+                    self._thread.start()
+
+    def publish(self, topic, value, key=None):
+        """Queue `value` for `topic`. Returns False if the queue is full and it was dropped."""
+        self._ensure_sender()
+        try:
+            self._queue.put_nowait((topic, value, key))
+        except queue.Full:
+            self.count(topic, "dropped")
+            logger.error(f"Kafka queue full, dropped event for {topic}")
+            return False
+        return True
+
+    def producer(self):
+        if self._producer is None:
+            self._producer = self.create_producer()
+        return self._producer
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            self._send(*message)
+
+    def _send(self, topic, value, key):
+        # Retried here, before anything queued after it, so the order holds
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            try:
+                future = self.producer().send(topic, value=value, key=key)
+            except KafkaError as e:
+                if attempt < SEND_ATTEMPTS:
+                    self.count(topic, "retried")
+                    time.sleep(RETRY_BACKOFF)
+                    continue
+                self._failed(topic, e)
+            except Exception as e:
+                # Not a broker problem, e.g. the event does not match its schema
+                self._failed(topic, e)
+            else:
+                future.add_callback(self._delivered, topic)
+                future.add_errback(self._failed, topic)
+            return
+
+    def _delivered(self, topic, metadata):
+        self.count(topic, "delivered")
+
+    def _failed(self, topic, exc):
+        self.count(topic, "failed")
+        logger.error(f"Error publishing event to {topic}: {str(exc)}")
+
+    def close(self, timeout=10):
+        """Send what is queued, then close the producer. Called on worker exit."""
+        if self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.error("Kafka queue still full on close, dropping queued events")
+        self._thread.join(timeout)
+        if self._producer is not None:
+            self._producer.close(timeout=timeout)
+            self._producer = None
+        self._pid = None
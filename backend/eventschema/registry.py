@@ -0,0 +1,124 @@
+"""
+A schema registry kept as files, one per version: `schemas/<subject>/v<N>.json`.
+
+The files are part of the repository and copied into every image that
+produces or consumes events, so services need no registry server. Every
+version of a subject must be readable by every other, in both directions:
+consumers can then be upgraded before or after producers. A consumer still
+meets a schema id it does not know if a producer ships a new version first;
+that raises UnknownSchema, and the record is retried until the consumer has
+the new file.
+
+    python -m eventschema check
+    python -m eventschema register new_post_events.json
+"""
+import json
+import os
+from pathlib import Path
+
+from .codec import Decoder, Encoder
+from .errors import IncompatibleSchema, SchemaError, UnknownSchema
+from .schema import Schema, read_problems
+
+SCHEMAS_DIR = Path(os.getenv("EVENT_SCHEMAS_DIR", Path(__file__).resolve().parent / "schemas"))
+
+
+class Registry:
+    def __init__(self, path=SCHEMAS_DIR):
+        self.path = Path(path)
+        self._subjects = {}
+        self._by_id = {}
+        self._encoders = {}
+        self._decoders = {}
+        for file in sorted(self.path.glob("*/v*.json")):
+            with open(file) as f:
+                self._add(Schema.from_dict(json.load(f)))
+        for subject, versions in self._subjects.items():
+            numbers = [schema.version for schema in versions]
+            if numbers != list(range(1, len(numbers) + 1)):
+                raise SchemaError(f"Versions of {subject} are not 1 to {len(numbers)}: {numbers}")
+
+    def _add(self, schema):
+        if schema.id in self._by_id:
+            raise SchemaError(f"{schema} and {self._by_id[schema.id]} share id {schema.id}")
+        self._by_id[schema.id] = schema
+        versions = self._subjects.setdefault(schema.subject, [])
+        versions.append(schema)
+        versions.sort(key=lambda version: version.version)
+
+    def subjects(self):
+        return sorted(self._subjects)
+
+    def versions(self, subject):
+        try:
+            return list(self._subjects[subject])
+        except KeyError:
+            raise UnknownSchema(f"No schema for {subject}")
+
+    def get(self, subject, version=None):
+        """Version `version` of `subject`, the latest by default."""
+        versions = self.versions(subject)
+        if version is None:
+            return versions[-1]
+        for schema in versions:
+            if schema.version == version:
+                return schema
+        raise UnknownSchema(f"No version {version} of {subject}")
+
+    def by_id(self, schema_id):
+        try:
+            return self._by_id[schema_id]
+        except KeyError:
+            raise UnknownSchema(f"No schema with id {schema_id}")
+
+    def encoder(self, subject):
+        """Encoder for the latest version of `subject`."""
+        encoder = self._encoders.get(subject)
+        if encoder is None:
+            encoder = self._encoders[subject] = Encoder(self.get(subject))
+        return encoder
+
+    def decoder(self, subject, version=None):
+        """Decoder reading every version of `subject` as `version`, the latest by default."""
+        decoder = self._decoders.get((subject, version))
+        if decoder is None:
+            decoder = self._decoders[(subject, version)] = Decoder(self, self.get(subject, version))
+        return decoder
+
+    def problems(self):
+        """Every pair of versions of a subject that cannot read each other."""
+        return [
+            problem
+            for versions in self._subjects.values()
+            for reader in versions
+            for writer in versions
+            for problem in read_problems(reader, writer)
+        ]
+
+    def register(self, data):
+        """
+        Add the next version of `data["subject"]`, given its fields, and write
+        its file. Raises IncompatibleSchema if any version could not read it or
+        it could not read any version.
+        """
+        subject = data["subject"]
+        versions = self._subjects.get(subject, [])
+        schema = Schema.from_dict({
+            **data,
+            "version": len(versions) + 1,
+            "id": max(self._by_id, default=0) + 1,
+        })
+        problems = [
+            problem
+            for version in versions
+            for problem in read_problems(schema, version) + read_problems(version, schema)
+        ]
+        if problems:
+            raise IncompatibleSchema(f"{schema} is not compatible with earlier versions", problems)
+        file = self.path / subject / f"v{schema.version}.json"
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with open(file, "w") as f:
+            json.dump({**data, "version": schema.version, "id": schema.id}, f, indent=2)
+            f.write("\n")
+        self._add(schema)
+        return schema
@@ -0,0 +1,129 @@
+"""
+Schemas and the rules for reading data written with one schema through another.
+
+A schema file describes one version of a subject, the topic its events go to:
+
+    {
+      "subject": "post_events",
+      "version": 1,
+      "id": 3,
+      "fields": [
+        {"name": "type", "type": {"type": "enum", "symbols": ["post_created", "like_added"]}},
+        {"name": "author", "type": ["null", "string"], "default": null}
+      ]
+    }
+
+Types follow Avro's JSON notation: "string", "long", "double", "boolean",
+{"type": "array", "items": ...}, {"type": "enum", "symbols": [...]} and the
+nullable union ["null", ...].
+"""
+from .errors import IncompatibleSchema, SchemaError
+
+PRIMITIVES = ("string", "long", "double", "boolean")
+NO_DEFAULT = object()
+
+
+def parse_type(spec):
+    """Turn a type from a schema file into a tuple such as ("array", ("string",))."""
+    if isinstance(spec, str):
+        if spec not in PRIMITIVES:
+            raise SchemaError(f"Unknown type {spec!r}")
+        return (spec,)
+    if isinstance(spec, list):
+        if len(spec) != 2 or spec[0] != "null":
+            raise SchemaError(f"Only [\"null\", type] unions are supported, not {spec!r}")
+        return ("nullable", parse_type(spec[1]))
+    if isinstance(spec, dict):
+        if spec.get("type") == "array":
+            return ("array", parse_type(spec["items"]))
+        if spec.get("type") == "enum":
+            symbols = tuple(spec["symbols"])
+            if len(set(symbols)) != len(symbols):
+                raise SchemaError(f"Duplicate enum symbols in {spec!r}")
+            return ("enum", symbols)
+    raise SchemaError(f"Unknown type {spec!r}")
+
+
+def describe(type_):
+    if type_[0] == "nullable":
+        return f"{describe(type_[1])} or null"
+    if type_[0] == "array":
+        return f"array of {describe(type_[1])}"
+    if type_[0] == "enum":
+        return f"enum {list(type_[1])}"
+    return type_[0]
+
+
+class Field:
+    def __init__(self, name, type_, default=NO_DEFAULT):
+        self.name = name
+        self.type = type_
+        self.default = default
+
+    @property
+    def has_default(self):
+        return self.default is not NO_DEFAULT
+
+
+class Schema:
+    def __init__(self, subject, version, id, fields):
+        self.subject = subject
+        self.version = version
+        self.id = id
+        self.fields = fields
+        names = [field.name for field in fields]
+        if len(set(names)) != len(names):
+            raise SchemaError(f"Duplicate field names in {self}")
+
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            fields = [
+                Field(field["name"], parse_type(field["type"]), field.get("default", NO_DEFAULT))
+                for field in data["fields"]
+            ]
+            return cls(data["subject"], int(data["version"]), int(data["id"]), fields)
+        except (KeyError, TypeError) as e:
+            raise SchemaError(f"Malformed schema {data.get('subject')!r}: {str(e)}")
+
+    def __str__(self):
+        return f"{self.subject} v{self.version}"
+
+
+def resolves(writer, reader):
+    """Whether a value written as type `writer` can be read as type `reader`."""
+    if reader[0] == "nullable":
+        return resolves(writer[1] if writer[0] == "nullable" else writer, reader[1])
+    if writer[0] == "nullable":
+        return False
+    if writer[0] == "long" and reader[0] == "double":
+        return True
+    if writer[0] != reader[0]:
+        return False
+    if writer[0] == "array":
+        return resolves(writer[1], reader[1])
+    if writer[0] == "enum":
+        return set(writer[1]) <= set(reader[1])
+    return True
+
+
+def read_problems(reader, writer):
+    """List why events written with schema `writer` cannot be read with `reader`."""
+    written = {field.name: field for field in writer.fields}
+    problems = []
+    for field in reader.fields:
+        if field.name not in written:
+            if not field.has_default:
+                problems.append(f"{field.name} is missing from {writer} and has no default in {reader}")
+        elif not resolves(written[field.name].type, field.type):
+            problems.append(
+                f"{field.name} is {describe(written[field.name].type)} in {writer} "
+                f"but {describe(field.type)} in {reader}"
+            )
+    return problems
+
+
+def check_readable(reader, writers):
+    problems = [problem for writer in writers for problem in read_problems(reader, writer)]
+    if problems:
+        raise IncompatibleSchema(f"{reader} cannot read every version of {reader.subject}", problems)
@@ -0,0 +1,14 @@
+"""A kafka-python value serializer encoding each record with its topic's schema."""
+from kafka.serializer import Serializer
+
+from . import default_registry
+
+
+class EventSerializer(Serializer):
+    """Pass as `value_serializer`; kafka-python hands it the topic of every value."""
+
+    def __init__(self, registry=None):
+        self.registry = registry or default_registry()
+
+    def serialize(self, topic, value):
+        return self.registry.encoder(topic).encode(value)
@@ -0,0 +1,325 @@
+"""
+Tests for the schemas, the registry and the binary encoding.
+
+    cd backend && python -m pytest eventschema
+"""
+import json
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+import msgpack
+
+from eventschema import (
+    IncompatibleSchema,
+    Registry,
+    SchemaError,
+    UnknownSchema,
+    decode,
+    default_registry,
+    encode,
+)
+from eventschema.codec import HEADER, MAGIC, Encoder
+
+# One full event per subject in schemas/
+EVENTS = {
+    "post_events": {
+        "type": "comment_added",
+        "post_id": "6752a0e1c1f0a2b3c4d5e6f7",
+        "username": "alice",
+        "author": "bob",
+        "comment_id": "6752a0e1c1f0a2b3c4d5e6f8",
+        "hashtags": ["AI", "cats"],
+    },
+    "user_signup": {
+        "user_id": 42,
+        "username": "alice",
+        "first_name": "Alice",
+        "last_name": "Liddell",
+        "email": "alice@example.com",
+    },
+    "user_unfollowed": {"follower_id": 1, "follower": "alice", "followee_id": 2, "followee": "bob"},
+}
+
+MEASUREMENT_V1 = {
+    "subject": "measurement",
+    "fields": [
+        {"name": "sensor", "type": "string"},
+        {"name": "unit", "type": {"type": "enum", "symbols": ["celsius", "kelvin"]}},
+        {"name": "value", "type": "long"},
+    ],
+}
+# Readable by v1 too: the new field has a default
+MEASUREMENT_V2 = {
+    "subject": "measurement",
+    "fields": MEASUREMENT_V1["fields"] + [
+        {"name": "tags", "type": {"type": "array", "items": "string"}, "default": []},
+        {"name": "note", "type": ["null", "string"], "default": None},
+    ],
+}
+
+
+class RoundTripTests(unittest.TestCase):
+    def test_every_subject_has_an_example(self):
+        self.assertEqual(default_registry().subjects(), sorted(EVENTS))
+
+    def test_round_trip(self):
+        for subject, event in EVENTS.items():
+            with self.subTest(subject=subject):
+                data = encode(subject, event)
+
+                self.assertEqual(data[:HEADER.size], HEADER.pack(MAGIC, default_registry().get(subject).id))
+                self.assertEqual(decode(subject, data), event)
+
+    def test_defaults_fill_fields_left_out(self):
+        data = encode("post_events", {"type": "post_created", "post_id": "p1", "username": "alice"})
+
+        self.assertEqual(decode("post_events", data), {
+            "type": "post_created", "post_id": "p1", "username": "alice",
+            "author": None, "comment_id": None, "hashtags": [],
+        })
+
+    def test_defaults_are_not_shared_between_events(self):
+        data = encode("post_events", {"type": "post_created", "post_id": "p1", "username": "alice"})
+
+        decode("post_events", data)["hashtags"].append("AI")
+
+        self.assertEqual(decode("post_events", data)["hashtags"], [])
+
+    def test_json_from_before_schemas(self):
+        event = {key: value for key, value in EVENTS["user_signup"].items() if key != "first_name"}
+
+        decoded = decode("user_signup", json.dumps({**event, "extra": 1}).encode())
+
+        self.assertEqual(decoded, {**event, "first_name": ""})
+
+    def test_encoding_is_smaller_than_json(self):
+        for subject, event in EVENTS.items():
+            with self.subTest(subject=subject):
+                self.assertLess(len(encode(subject, event)), len(json.dumps(event)))
+
+
+class EncodeErrorTests(unittest.TestCase):
+    def assertRejected(self, subject, event):
+        with self.assertRaises(SchemaError):
+            encode(subject, event)
+
+    def test_missing_required_field(self):
+        self.assertRejected("user_unfollowed", {"follower_id": 1, "follower": "alice", "followee_id": 2})
+
+    def test_unknown_field(self):
+        self.assertRejected("user_unfollowed", {**EVENTS["user_unfollowed"], "reason": "spam"})
+
+    def test_wrong_types(self):
+        self.assertRejected("user_signup", {**EVENTS["user_signup"], "user_id": "42"})
+        self.assertRejected("user_signup", {**EVENTS["user_signup"], "user_id": True})
+        self.assertRejected("user_signup", {**EVENTS["user_signup"], "email": None})
+        self.assertRejected("post_events", {**EVENTS["post_events"], "hashtags": "AI"})
+        self.assertRejected("post_events", {**EVENTS["post_events"], "hashtags": ["AI", 1]})
+
+    def test_unknown_enum_symbol(self):
+        self.assertRejected("post_events", {**EVENTS["post_events"], "type": "post_edited"})
+
+    def test_unknown_subject(self):
+        with self.assertRaises(UnknownSchema):
+            encode("post_edits", {})
+
+
+class RegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name)
+
+    def write(self, data, version, schema_id):
+        """Add a schema file directly, without the compatibility check of `register`."""
+        file = self.path / data["subject"] / f"v{version}.json"
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(json.dumps({**data, "version": version, "id": schema_id}))
+
+
+class EvolutionTests(RegistryTestCase):
+    def test_newer_reader_applies_defaults(self):
+        registry = Registry(self.path)
+        registry.register(MEASUREMENT_V1)
+        data = registry.encoder("measurement").encode({"sensor": "s1", "unit": "kelvin", "value": 300})
+        registry.register(MEASUREMENT_V2)
+
+        event = registry.decoder("measurement").decode(data)
+
+        self.assertEqual(event, {"sensor": "s1", "unit": "kelvin", "value": 300, "tags": [], "note": None})
+
+    def test_older_reader_drops_new_fields(self):
+        registry = Registry(self.path)
+        registry.register(MEASUREMENT_V1)
+        registry.register(MEASUREMENT_V2)
+        data = registry.encoder("measurement").encode(
+            {"sensor": "s1", "unit": "celsius", "value": 21, "tags": ["roof"], "note": "sunny"}
+        )
+
+        event = registry.decoder("measurement", version=1).decode(data)
+
+        self.assertEqual(event, {"sensor": "s1", "unit": "celsius", "value": 21})
+
+    def test_long_read_as_double_and_widened_enum(self):
+        # Only readable one way, so written directly rather than registered
+        self.write(MEASUREMENT_V1, 1, 1)
+        self.write({"subject": "measurement", "fields": [
+            {"name": "sensor", "type": "string"},
+            {"name": "unit", "type": {"type": "enum", "symbols": ["fahrenheit", "celsius", "kelvin"]}},
+            {"name": "value", "type": "double"},
+        ]}, 2, 2)
+        registry = Registry(self.path)
+        v1 = Encoder(registry.get("measurement", 1))
+        data = v1.encode({"sensor": "s1", "unit": "kelvin", "value": 300})
+
+        # "kelvin" is symbol 1 for the writer and 2 for the reader
+        event = registry.decoder("measurement").decode(data)
+
+        self.assertEqual(event, {"sensor": "s1", "unit": "kelvin", "value": 300.0})
+        self.assertIsInstance(event["value"], float)
+
+    def test_reader_that_cannot_read_every_version_is_refused(self):
+        self.write(MEASUREMENT_V1, 1, 1)
+        self.write({"subject": "measurement", "fields": [
+            {"name": "sensor", "type": "string"},
+            {"name": "unit", "type": {"type": "enum", "symbols": ["celsius"]}},
+            {"name": "value", "type": "long"},
+        ]}, 2, 2)
+        registry = Registry(self.path)
+
+        with self.assertRaises(IncompatibleSchema) as raised:
+            registry.decoder("measurement")
+
+        self.assertEqual(len(raised.exception.problems), 1)
+        self.assertIn("unit", raised.exception.problems[0])
+        self.assertEqual(registry.problems(), raised.exception.problems)
+        # v1 has every symbol v2 writes
+        registry.decoder("measurement", version=1)
+
+
+class RegisterTests(RegistryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = Registry(self.path)
+        self.registry.register(MEASUREMENT_V1)
+
+    def assertRefused(self, fields):
+        with self.assertRaises(IncompatibleSchema) as raised:
+            self.registry.register({"subject": "measurement", "fields": fields})
+
+        self.assertEqual(len(self.registry.versions("measurement")), 1)
+        self.assertFalse((self.path / "measurement" / "v2.json").exists())
+        return raised.exception.problems
+
+    def test_register_writes_the_next_version(self):
+        schema = self.registry.register(MEASUREMENT_V2)
+
+        self.assertEqual((schema.version, schema.id), (2, 2))
+        saved = json.loads((self.path / "measurement" / "v2.json").read_text())
+        self.assertEqual((saved["version"], saved["id"]), (2, 2))
+        self.assertEqual(Registry(self.path).get("measurement").version, 2)
+
+    def test_new_required_field_is_refused(self):
+        problems = self.assertRefused(MEASUREMENT_V1["fields"] + [{"name": "room", "type": "string"}])
+
+        self.assertEqual(
+            problems, ["room is missing from measurement v1 and has no default in measurement v2"]
+        )
+
+    def test_changed_type_is_refused(self):
+        self.assertRefused([
+            {"name": "sensor", "type": "long"},
+            *MEASUREMENT_V1["fields"][1:],
+        ])
+
+    def test_widened_enum_is_refused(self):
+        # Consumers still on v1 could not read the new symbol
+        problems = self.assertRefused([
+            MEASUREMENT_V1["fields"][0],
+            {"name": "unit", "type": {"type": "enum", "symbols": ["celsius", "kelvin", "fahrenheit"]}},
+            MEASUREMENT_V1["fields"][2],
+        ])
+
+        self.assertEqual(len(problems), 1)
+
+    def test_removed_required_field_is_refused(self):
+        self.assertRefused(MEASUREMENT_V1["fields"][:2])
+
+    def test_malformed_schema(self):
+        with self.assertRaises(SchemaError):
+            self.registry.register({"subject": "measurement", "fields": [{"name": "x", "type": "int"}]})
+        with self.assertRaises(SchemaError):
+            self.registry.register({"subject": "measurement", "fields": [{"type": "string"}]})
+
+    def test_gaps_in_versions_are_refused(self):
+        self.write(MEASUREMENT_V2, 3, 3)
+
+        with self.assertRaises(SchemaError):
+            Registry(self.path)
+
+    def test_shared_ids_are_refused(self):
+        self.write(MEASUREMENT_V2, 2, 1)
+
+        with self.assertRaises(SchemaError):
+            Registry(self.path)
+
+
+class DecodeErrorTests(unittest.TestCase):
+    def assertMalformed(self, data, subject="user_unfollowed"):
+        with self.assertRaises(SchemaError):
+            decode(subject, data)
+
+    def header(self, schema_id=2):
+        return HEADER.pack(MAGIC, schema_id)
+
+    def test_unknown_schema_id(self):
+        data = self.header(999) + msgpack.packb([1, "alice", 2, "bob"])
+
+        with self.assertRaises(UnknownSchema):
+            decode("user_unfollowed", data)
+
+    def test_schema_errors_are_value_errors(self):
+        # Consumers skip records that raise ValueError, and retry UnknownSchema
+        self.assertTrue(issubclass(SchemaError, ValueError))
+        self.assertFalse(issubclass(UnknownSchema, ValueError))
+
+    def test_too_short(self):
+        self.assertMalformed(b"")
+        self.assertMalformed(b"\x00\x00")
+
+    def test_wrong_magic_byte(self):
+        self.assertMalformed(b"\x01" + encode("user_unfollowed", EVENTS["user_unfollowed"])[1:])
+
+    def test_event_of_another_subject(self):
+        self.assertMalformed(encode("user_signup", EVENTS["user_signup"]))
+
+    def test_truncated(self):
+        self.assertMalformed(encode("user_unfollowed", EVENTS["user_unfollowed"])[:-3])
+
+    def test_trailing_bytes(self):
+        self.assertMalformed(encode("user_unfollowed", EVENTS["user_unfollowed"]) + b"\x00")
+
+    def test_wrong_number_of_fields(self):
+        self.assertMalformed(self.header() + msgpack.packb([1, "alice", 2]))
+        self.assertMalformed(self.header() + msgpack.packb([1, "alice", 2, "bob", 3]))
+
+    def test_not_an_array(self):
+        self.assertMalformed(self.header() + msgpack.packb({"follower_id": 1}))
+
+    def test_enum_index_out_of_range(self):
+        data = HEADER.pack(MAGIC, 3) + msgpack.packb([17, "p1", "alice", None, None, []])
+
+        self.assertMalformed(data, "post_events")
+
+    def test_bad_json(self):
+        self.assertMalformed(b"{not json")
+        self.assertMalformed(b'{"follower_id": 1}')
+
+    def test_header_is_big_endian(self):
+        self.assertEqual(struct.unpack(">H", encode("post_events", EVENTS["post_events"])[1:3]), (3,))
+
+
+if __name__ == "__main__":
+    unittest.main()
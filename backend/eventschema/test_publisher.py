@@ -0,0 +1,146 @@
+"""
+Tests for the queued event publisher, against a fake producer.
+
+    cd backend && python -m pytest eventschema
+"""
+import unittest
+from unittest import mock
+
+from kafka.errors import KafkaTimeoutError
+
+from eventschema import publisher as publisher_module
+from eventschema.publisher import EventPublisher
+
+
+class FakeFuture:
+    def __init__(self):
+        self.callbacks = []
+        self.errbacks = []
+
+    def add_callback(self, func, *args):
+        self.callbacks.append((func, args))
+
+    def add_errback(self, func, *args):
+        self.errbacks.append((func, args))
+
+
+class FakeProducer:
+    def __init__(self):
+        # Raised by the first sends, one each
+        self.errors = []
+        self.sent = []
+        self.futures = []
+        self.closed = False
+
+    def send(self, topic, value=None, key=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((topic, value, key))
+        future = FakeFuture()
+        self.futures.append(future)
+        return future
+
+    def close(self, timeout=None):
+        self.closed = True
+
+
+@mock.patch.object(publisher_module, "RETRY_BACKOFF", 0)
+class EventPublisherTests(unittest.TestCase):
+    def setUp(self):
+        self.outcomes = []
+        self.producer = FakeProducer()
+
+    def publisher(self, **kwargs):
+        return EventPublisher(
+            lambda: self.producer, count=lambda topic, outcome: self.outcomes.append(outcome), **kwargs
+        )
+
+    def test_queued_events_are_sent_in_order(self):
+        publisher = self.publisher()
+
+        for i in range(5):
+            self.assertTrue(publisher.publish("post_events", {"n": i}, key="p1"))
+        publisher.close()
+
+        self.assertEqual(self.producer.sent, [("post_events", {"n": i}, "p1") for i in range(5)])
+        self.assertTrue(self.producer.closed)
+
+    def test_outcomes_are_counted(self):
+        publisher = self.publisher()
+        publisher.publish("post_events", {"n": 0})
+        publisher.publish("post_events", {"n": 1})
+        publisher.close()
+
+        (func, args), = self.producer.futures[0].callbacks
+        func(*args, mock.Mock())
+        (func, args), = self.producer.futures[1].errbacks
+        func(*args, KafkaTimeoutError("Batch expired"))
+
+        self.assertEqual(self.outcomes, ["delivered", "failed"])
+
+    def test_failed_delivery_is_not_queued_again(self):
+        publisher = self.publisher()
+        publisher.publish("post_events", {"n": 0})
+        publisher.publish("post_events", {"n": 1})
+        publisher.close()
+
+        (func, args), = self.producer.futures[0].errbacks
+        func(*args, KafkaTimeoutError("Batch expired"))
+
+        # The producer already retried it; sending it again would land it after {"n": 1}
+        self.assertTrue(publisher._queue.empty())
+        self.assertEqual(self.outcomes, ["failed"])
+
+    def test_send_is_retried_before_later_events(self):
+        self.producer.errors = [KafkaTimeoutError("Failed to update metadata")] * 2
+        publisher = self.publisher()
+
+        publisher.publish("post_events", {"n": 0})
+        publisher.publish("post_events", {"n": 1})
+        publisher.close()
+
+        self.assertEqual([value for _, value, _ in self.producer.sent], [{"n": 0}, {"n": 1}])
+        self.assertEqual(self.outcomes, ["retried", "retried"])
+
+    def test_send_gives_up_after_the_last_attempt(self):
+        attempts = publisher_module.SEND_ATTEMPTS
+        self.producer.errors = [KafkaTimeoutError("Failed to update metadata")] * attempts
+        publisher = self.publisher()
+
+        publisher.publish("post_events", {"n": 0})
+        publisher.publish("post_events", {"n": 1})
+        publisher.close()
+
+        self.assertEqual(self.producer.sent, [("post_events", {"n": 1}, None)])
+        self.assertEqual(self.outcomes.count("retried"), attempts - 1)
+        self.assertEqual(self.outcomes[-1], "failed")
+
+    def test_invalid_event_is_not_retried(self):
+        self.producer.errors = [ValueError("post_events: missing field 'post_id'")]
+        publisher = self.publisher()
+
+        publisher.publish("post_events", {"n": 0})
+        publisher.close()
+
+        self.assertEqual(self.outcomes, ["failed"])
+        self.assertEqual(self.producer.sent, [])
+
+    def test_full_queue_drops_the_event(self):
+        publisher = self.publisher(queue_size=1)
+        with mock.patch.object(publisher, "_run"):
+            publisher.publish("post_events", {"n": 0})
+
+            self.assertFalse(publisher.publish("post_events", {"n": 1}))
+
+        self.assertEqual(self.outcomes, ["dropped"])
+
+    def test_close_without_events_does_nothing(self):
+        publisher = self.publisher()
+
+        publisher.close()
+
+        self.assertFalse(self.producer.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Compare a connection per message with the SMTP pool, against the local stand-in.
+
+    python bench_smtp.py --messages 500 --workers 8 --handshake-delay 0.05
+"""
+import argparse
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from smtp_pool import SMTPPool
+from smtp_standin import SMTPStandIn
+
+SENDER = "bench@threadhive.local"
+MESSAGE = "Subject: Welcome to Thread-Hive!\r\n\r\nHi bench,\r\n\r\nWelcome to Thread-Hive."
+
+
+def connection_per_message(port):
+    def send(n):
+        # What the consumer did before the pool, minus STARTTLS
+        server = smtplib.SMTP("127.0.0.1", port)
+        server.login(SENDER, "secret")
+        server.sendmail(SENDER, f"user{n}@example.com", MESSAGE)
+        server.quit()
+    return send
+
+
+def pooled(port, workers):
+    pool = SMTPPool("127.0.0.1", port, SENDER, "secret", size=workers, starttls=False)
+
+    def send(n):
+        pool.send(SENDER, f"user{n}@example.com", MESSAGE)
+    return send
+
+
+def run(name, send, messages, workers, stats):
+    before = stats.sessions
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(send, range(messages)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:24} {messages / elapsed:8.0f} msg/s  "
+        f"{stats.sessions - before:5} sessions  {elapsed:6.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--handshake-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with SMTPStandIn(("127.0.0.1", 0), args.handshake_delay) as server:
+        port = server.start()
+        run("connection per message", connection_per_message(port), args.messages, 1, server.stats)
+        run(f"pool of {args.workers}", pooled(port, args.workers), args.messages, args.workers,
+            server.stats)
+        server.shutdown()
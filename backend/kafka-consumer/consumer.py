@@ -1,6 +1,7 @@
-from kafka import KafkaConsumer
-import json
-import smtplib
+from framework import WORKERS, ConsumerApp, header
+from smtp_pool import SMTPPool
+import logging
+import redis
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
@@ -8,13 +9,48 @@ from email import encoders
 import os
 import time
 
+logger = logging.getLogger(__name__)
+
+SENDER_EMAIL = os.getenv('SENDER_EMAIL', "threadhive912@gmail.com") #Add email
+SENDER_PASSWORD = os.getenv('SENDER_PASSWORD', "qjur ofrr xbhz xzmk") # Add password
+
+# One logged-in connection per handler thread, reused across messages
+smtp_pool = SMTPPool(
+    host=os.getenv('SMTP_HOST', 'smtp.gmail.com'),
+    port=int(os.getenv('SMTP_PORT', '587')),
+    username=SENDER_EMAIL,
+    password=SENDER_PASSWORD,
+    size=WORKERS,
+    max_messages=int(os.getenv('SMTP_MAX_MESSAGES', '100')),
+    starttls=os.getenv('SMTP_STARTTLS', 'true').lower() == 'true',
+)
+
+# Set by user-service's outbox relay, which can publish an event more than once
+IDEMPOTENCY_KEY = 'idempotency_key'
+# Seconds a key is remembered, well past the last retry topic's delay
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', str(7 * 24 * 3600)))
+redis_client = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://redis:6379/0'))
 
-def send_email_with_attachment(sender_email, sender_password, recipient_email, subject, message):
-    try:
-        # Set up the SMTP server
-        smtp_server = 'smtp.gmail.com'
-        smtp_port = 587
 
+def claim(key):
+    """
+    Claim an event by its idempotency key. False if another delivery of it
+    already did, in which case it is skipped. Events without a key are always
+    handled.
+    """
+    if key is None:
+        return True
+    return bool(redis_client.set(f'welcome_email:{key}', 1, nx=True, ex=IDEMPOTENCY_TTL))
+
+
+def release(key):
+    """Give up a claim so a retry of the event is handled."""
+    if key is not None:
+        redis_client.delete(f'welcome_email:{key}')
+
+
+def send_email_with_attachment(sender_email, recipient_email, subject, message):
+    try:
         # Create the email message
         msg = MIMEMultipart()
         msg['From'] = sender_email
@@ -24,41 +60,47 @@ def send_email_with_attachment(sender_email, sender_password, recipient_email, s
 
         # Attach the file
 
-        # Connect to the SMTP server and log in
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Upgrade the connection to a secure encrypted SSL/TLS
-        server.login(sender_email, sender_password)
-
-        # Send the email
-        server.sendmail(sender_email, recipient_email, msg.as_string())
-        print("Email sent successfully!")
-
-        # Close the server connection
-        server.quit()
+        # Send the email over a pooled connection
+        smtp_pool.send(sender_email, recipient_email, msg.as_string())
+        logger.info(f"Email sent to {recipient_email}")
 
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error(f"Error sending email to {recipient_email}: {str(e)}")
+        # The framework sends the record to a retry topic, and to the DLQ in the end
+        raise
 
 
-consumer = KafkaConsumer(
-    'user_signup',
-    bootstrap_servers='kafka:9092',
-    auto_offset_reset='earliest',
-    value_deserializer=lambda v: json.loads(v.decode('utf-8')),
-    group_id='email_service_group'
-)
+app = ConsumerApp(group_id='email_service_group')
 
-for message in consumer:
-    user_data = message.value
+
+@app.handler('user_signup')
+def welcome_email(record):
+    user_data = record.value
     recipient_email = user_data['email']
     subject = "Welcome to Thread-Hive!"
     message = f"Hi {user_data['username']},\n\nWelcome to Thread-Hive. We're excited to have you!"
-    
+
+    key = header(record, IDEMPOTENCY_KEY)
+    if not claim(key):
+        logger.info(f"Welcome email for event {key} already sent, skipping")
+        return
+
     # Send the email
-    send_email_with_attachment(
-        sender_email="threadhive912@gmail.com", #Add email
-        sender_password="qjur ofrr xbhz xzmk", # Add password
-        recipient_email=recipient_email,
-        subject=subject,
-        message=message 
-    )
+    try:
+        send_email_with_attachment(
+            sender_email=SENDER_EMAIL,
+            recipient_email=recipient_email,
+            subject=subject,
+            message=message
+        )
+    except Exception:
+        release(key)
+        raise
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        app.run()
+    finally:
+        smtp_pool.close()
@@ -0,0 +1,255 @@
+"""
+A small Kafka consumer framework: register a handler per topic and call run().
+
+    app = ConsumerApp(group_id="email_service_group")
+
+    @app.handler("user_signup")
+    def welcome(record):
+        ...
+
+Records are polled in batches of up to MAX_POLL_RECORDS and handed to a
+bounded thread pool, so one slow record does not hold up the rest of the
+batch. Offsets are committed manually once a batch is done. Delivery is at
+least once, so handlers must tolerate seeing a record twice. Values are
+decoded with their topic's schema (see `eventschema`) before the handler sees
+them; records that do not match it are logged and skipped. `run()` refuses to
+start if a topic's schema cannot read every registered version of it, and a
+record written with a version this consumer does not know yet is retried like
+a failed one.
+
+A record whose handler raises is republished to `<topic>.retry.<n>`, one
+topic per delay in RETRY_DELAYS, and handled again once its delay is over.
+Partitions of a retry topic are paused until their next record is due, so
+waiting never blocks the main topic. After the last retry the record goes to
+`<topic>.dlq` with the error in its headers; `replay_dlq.py` sends it back.
+If the record cannot be republished, the consumer seeks back to it instead.
+"""
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from eventschema import default_registry
+from kafka import ConsumerRebalanceListener, KafkaConsumer, KafkaProducer, OffsetAndMetadata
+from kafka.errors import KafkaError
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_SERVERS = os.getenv("KAFKA_BROKER", "kafka:9092").split(",")
+MAX_POLL_RECORDS = int(os.getenv("MAX_POLL_RECORDS", "100"))
+WORKERS = int(os.getenv("CONSUMER_WORKERS", "8"))
+POLL_TIMEOUT_MS = 1000
+# Seconds before each retry; a record fails len(RETRY_DELAYS) + 1 times before the DLQ
+RETRY_DELAYS = [int(delay) for delay in os.getenv("RETRY_DELAYS", "30,300,1800").split(",")]
+# Seconds to wait for Kafka to acknowledge a republished record
+SEND_TIMEOUT = 30
+
+# Headers the framework adds to republished records
+ATTEMPT = "retry-attempt"
+DUE = "retry-due"
+ORIGINAL_TOPIC = "original-topic"
+ORIGINAL_PARTITION = "original-partition"
+ORIGINAL_OFFSET = "original-offset"
+ERROR = "error"
+ERROR_TYPE = "error-type"
+
+
+def decode(topic, value):
+    return default_registry().decoder(topic).decode(value)
+
+
+def header(record, name, default=None):
+    for key, value in record.headers or ():
+        if key == name:
+            return value.decode()
+    return default
+
+
+def original_topic(record):
+    return header(record, ORIGINAL_TOPIC, record.topic)
+
+
+def retry_topic(topic, attempt):
+    return f"{topic}.retry.{attempt}"
+
+
+def dlq_topic(topic):
+    return f"{topic}.dlq"
+
+
+class Rebalance(ConsumerRebalanceListener):
+    def __init__(self, app):
+        self.app = app
+
+    def on_partitions_revoked(self, revoked):
+        # Batches are finished before the next poll, so only commits can be pending
+        if revoked:
+            logger.info(f"Partitions revoked: {sorted(str(tp) for tp in revoked)}")
+            self.app.commit()
+            for tp in revoked:
+                self.app._paused.pop(tp, None)
+
+    def on_partitions_assigned(self, assigned):
+        logger.info(f"Partitions assigned: {sorted(str(tp) for tp in assigned)}")
+
+
+class ConsumerApp:
+    def __init__(self, group_id, **config):
+        self.group_id = group_id
+        self.config = config
+        self.handlers = {}
+        self.consumer = None
+        self.producer = None
+        self._offsets = {}
+        # Retry partitions waiting for their next record: {tp: due timestamp}
+        self._paused = {}
+        self.lag = metrics.LagMonitor(group_id)
+        self._running = False
+
+    def handler(self, topic):
+        """Register the decorated function for records of `topic`."""
+        def register(func):
+            self.handlers[topic] = func
+            return func
+        return register
+
+    def create_consumer(self):
+        return KafkaConsumer(
+            bootstrap_servers=BOOTSTRAP_SERVERS,
+            group_id=self.group_id,
+            auto_offset_reset="earliest",
+            enable_auto_commit=False,
+            max_poll_records=MAX_POLL_RECORDS,
+            **self.config,
+        )
+
+    def topics(self):
+        return [
+            name
+            for topic in self.handlers
+            for name in [topic] + [retry_topic(topic, n) for n in range(1, len(RETRY_DELAYS) + 1)]
+        ]
+
+    def run(self):
+        for topic in self.handlers:
+            # Raises IncompatibleSchema before anything is consumed
+            default_registry().decoder(topic)
+        self.consumer = self.create_consumer()
+        self.producer = KafkaProducer(bootstrap_servers=BOOTSTRAP_SERVERS, acks="all")
+        self.consumer.subscribe(topics=self.topics(), listener=Rebalance(self))
+        metrics.serve()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self._running = True
+        logger.info(f"Consuming {sorted(self.handlers)} as {self.group_id}")
+        with ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="handler") as pool:
+            try:
+                while self._running:
+                    self.resume_due()
+                    batch = self.consumer.poll(
+                        timeout_ms=POLL_TIMEOUT_MS, max_records=MAX_POLL_RECORDS
+                    )
+                    if batch:
+                        self.process(pool, batch)
+                        self.commit()
+                    self.lag.update(self.consumer)
+            finally:
+                self.consumer.close()
+                self.producer.close()
+
+    def stop(self, *args):
+        self._running = False
+
+    def handle(self, record):
+        topic = original_topic(record)
+        # Decoded here rather than by the consumer, where a bad record would fail every poll
+        try:
+            value = decode(topic, record.value)
+        except ValueError as e:
+            logger.error(f"Skipping undecodable record {record.topic}@{record.offset}: {str(e)}")
+            metrics.RECORDS.labels(self.group_id, topic, "skipped").inc()
+            return
+        start = time.perf_counter()
+        try:
+            self.handlers[topic](record._replace(value=value))
+        except Exception as e:
+            metrics.RECORDS.labels(self.group_id, topic, "failed").inc()
+            metrics.ERRORS.labels(self.group_id, topic, type(e).__name__).inc()
+            raise
+        finally:
+            metrics.HANDLER_LATENCY.labels(self.group_id, topic).observe(time.perf_counter() - start)
+        metrics.RECORDS.labels(self.group_id, topic, "handled").inc()
+
+    def process(self, pool, batch):
+        """Run every due record of `batch` on `pool` and note the offsets to commit."""
+        now = time.time()
+        futures = {}
+        for tp, records in batch.items():
+            submitted = futures[tp] = []
+            for record in records:
+                due = float(header(record, DUE, 0))
+                if due > now:
+                    # Records of a retry topic are due in order, so wait for this one
+                    self.consumer.seek(tp, record.offset)
+                    self.consumer.pause(tp)
+                    self._paused[tp] = due
+                    break
+                submitted.append((record, pool.submit(self.handle, record)))
+
+        self.lag.record(sum(len(submitted) for submitted in futures.values()))
+        for tp, submitted in futures.items():
+            next_offset = None
+            for record, future in submitted:
+                error = future.exception()
+                if error is not None:
+                    logger.error(
+                        f"Error handling {record.topic}[{record.partition}]@{record.offset}: {str(error)}"
+                    )
+                    try:
+                        self.retry_later(record, error)
+                    except KafkaError as e:
+                        logger.error(f"Error republishing failed record, retrying in place: {str(e)}")
+                        # Records after this one are delivered again too
+                        self.consumer.seek(tp, record.offset)
+                        break
+                next_offset = record.offset + 1
+            if next_offset is not None:
+                self._offsets[tp] = OffsetAndMetadata(next_offset, "")
+
+    def retry_later(self, record, error):
+        """Republish a failed record to its next retry topic, or to the DLQ after the last one."""
+        topic = original_topic(record)
+        attempt = int(header(record, ATTEMPT, 0)) + 1
+        headers = {key: value for key, value in record.headers or ()}
+        headers.setdefault(ORIGINAL_TOPIC, topic.encode())
+        headers.setdefault(ORIGINAL_PARTITION, str(record.partition).encode())
+        headers.setdefault(ORIGINAL_OFFSET, str(record.offset).encode())
+        headers[ATTEMPT] = str(attempt).encode()
+        headers[ERROR] = str(error).encode()
+        headers[ERROR_TYPE] = type(error).__name__.encode()
+        if attempt <= len(RETRY_DELAYS):
+            destination = retry_topic(topic, attempt)
+            headers[DUE] = str(time.time() + RETRY_DELAYS[attempt - 1]).encode()
+        else:
+            destination = dlq_topic(topic)
+            headers.pop(DUE, None)
+        self.producer.send(
+            destination, key=record.key, value=record.value, headers=list(headers.items())
+        ).get(SEND_TIMEOUT)
+        logger.warning(f"Sent {topic}@{header(record, ORIGINAL_OFFSET, record.offset)} to {destination}")
+
+    def resume_due(self):
+        now = time.time()
+        due = [tp for tp, at in self._paused.items() if at <= now]
+        if due:
+            self.consumer.resume(*due)
+            for tp in due:
+                del self._paused[tp]
+
+    def commit(self):
+        if self._offsets:
+            self.consumer.commit(self._offsets)
+            self._offsets = {}
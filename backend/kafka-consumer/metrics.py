@@ -0,0 +1,77 @@
+"""
+Prometheus metrics for the consumer, served on METRICS_PORT.
+
+Lag is the distance from the group's position to the end of each assigned
+partition. It is refreshed every LAG_INTERVAL seconds, together with the
+records-per-second rate over that interval.
+"""
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "8000"))
+LAG_INTERVAL = 10
+
+RECORDS = Counter(
+    "consumer_records_total",
+    "Records handled, by topic and outcome: handled, failed or skipped",
+    ["group", "topic", "outcome"],
+)
+ERRORS = Counter(
+    "consumer_errors_total",
+    "Handler exceptions, by topic and exception type",
+    ["group", "topic", "error_type"],
+)
+HANDLER_LATENCY = Histogram(
+    "consumer_handler_seconds",
+    "Time a handler took for one record, by topic",
+    ["group", "topic"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+LAG = Gauge(
+    "consumer_lag",
+    "Records between the group's position and the end of the partition",
+    ["group", "topic", "partition"],
+)
+THROUGHPUT = Gauge(
+    "consumer_records_per_second",
+    "Records handled per second over the last lag interval",
+    ["group"],
+)
+
+
+class LagMonitor:
+    def __init__(self, group_id):
+        self.group_id = group_id
+        self.handled = 0
+        self._last = time.monotonic()
+        self._reported = set()
+
+    def record(self, count):
+        self.handled += count
+
+    def update(self, consumer, force=False):
+        """Refresh lag and throughput if LAG_INTERVAL has passed since the last refresh."""
+        now = time.monotonic()
+        if not force and now - self._last < LAG_INTERVAL:
+            return
+        THROUGHPUT.labels(self.group_id).set(self.handled / (now - self._last))
+        self.handled = 0
+        self._last = now
+
+        assignment = consumer.assignment()
+        ends = consumer.end_offsets(list(assignment)) if assignment else {}
+        current = set()
+        for tp, end in ends.items():
+            labels = (self.group_id, tp.topic, str(tp.partition))
+            LAG.labels(*labels).set(max(end - consumer.position(tp), 0))
+            current.add(labels)
+        # Partitions moved to another member stop being reported here
+        for labels in self._reported - current:
+            LAG.remove(*labels)
+        self._reported = current
+
+
+def serve():
+    start_http_server(METRICS_PORT)
@@ -0,0 +1,77 @@
+"""
+Send the records in a dead-letter topic back to the topic they came from.
+
+    python replay_dlq.py user_signup --dry-run
+    python replay_dlq.py user_signup --limit 100
+
+Replayed records start again with a full set of retries. Progress is committed
+for the `dlq-replay` group, so a second run only replays newer records.
+"""
+import argparse
+
+from kafka import KafkaConsumer, KafkaProducer, OffsetAndMetadata, TopicPartition
+
+from framework import (
+    ATTEMPT,
+    BOOTSTRAP_SERVERS,
+    DUE,
+    ERROR,
+    ERROR_TYPE,
+    ORIGINAL_OFFSET,
+    ORIGINAL_PARTITION,
+    ORIGINAL_TOPIC,
+    SEND_TIMEOUT,
+    dlq_topic,
+    header,
+)
+
+# Stripped before replaying, so the record is treated as new
+FRAMEWORK_HEADERS = {
+    ATTEMPT, DUE, ERROR, ERROR_TYPE, ORIGINAL_OFFSET, ORIGINAL_PARTITION, ORIGINAL_TOPIC,
+}
+
+
+def replay(topic, limit=None, dry_run=False):
+    consumer = KafkaConsumer(
+        dlq_topic(topic),
+        bootstrap_servers=BOOTSTRAP_SERVERS,
+        group_id="dlq-replay",
+        auto_offset_reset="earliest",
+        enable_auto_commit=False,
+        # Stop once the DLQ has been read to the end
+        consumer_timeout_ms=5000,
+    )
+    producer = KafkaProducer(bootstrap_servers=BOOTSTRAP_SERVERS, acks="all")
+    replayed = 0
+    try:
+        for record in consumer:
+            print(
+                f"{header(record, ORIGINAL_TOPIC, topic)}@{header(record, ORIGINAL_OFFSET)}: "
+                f"{header(record, ERROR_TYPE)}: {header(record, ERROR)}"
+            )
+            if not dry_run:
+                headers = [(key, value) for key, value in record.headers if key not in FRAMEWORK_HEADERS]
+                producer.send(
+                    header(record, ORIGINAL_TOPIC, topic),
+                    key=record.key, value=record.value, headers=headers,
+                ).get(SEND_TIMEOUT)
+                consumer.commit({
+                    TopicPartition(record.topic, record.partition): OffsetAndMetadata(record.offset + 1, ""),
+                })
+            replayed += 1
+            if limit and replayed >= limit:
+                break
+    finally:
+        consumer.close()
+        producer.close()
+    return replayed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("topic", help="The original topic, e.g. user_signup")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="List the records without replaying them")
+    args = parser.parse_args()
+    count = replay(args.topic, args.limit, args.dry_run)
+    print(f"{'Found' if args.dry_run else 'Replayed'} {count} records from {dlq_topic(args.topic)}")
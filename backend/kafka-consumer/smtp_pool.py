@@ -0,0 +1,103 @@
+"""
+A pool of persistent, authenticated SMTP connections.
+
+Opening a connection costs a TCP and TLS handshake plus a login, which is far
+more than sending one message over it. The pool keeps up to `size` connections
+logged in and shares them between the handler threads. A connection is
+replaced after `max_messages` messages, since providers cap messages per
+session. A connection the server dropped is reopened and the message is sent
+again once.
+"""
+import logging
+import queue
+import smtplib
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Connection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+
+
+class SMTPPool:
+    def __init__(self, host, port, username=None, password=None, size=4,
+                 max_messages=100, starttls=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_messages = max_messages
+        self.starttls = starttls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        # Bounds open connections: one token per connection that may be opened
+        self._slots = threading.BoundedSemaphore(size)
+
+    def connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return Connection(smtp)
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, broken=False):
+        if broken or connection.sent >= self.max_messages:
+            self.discard(connection)
+        else:
+            self._idle.put(connection)
+        self._slots.release()
+
+    def discard(self, connection):
+        try:
+            connection.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.smtp.close()
+
+    def send(self, sender, recipients, message):
+        """Send `message` over a pooled connection, reconnecting once if it was dropped."""
+        for attempt in (1, 2):
+            connection = self.acquire()
+            try:
+                connection.smtp.sendmail(sender, recipients, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+                # Idle connections get closed by the server; a fresh one usually works
+                self.release(connection, broken=True)
+                if attempt == 2:
+                    raise
+                logger.info(f"SMTP connection lost, reconnecting: {str(e)}")
+                continue
+            except Exception as e:
+                # A rejected message leaves the session usable
+                rejected = isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+                self.release(connection, broken=not rejected)
+                raise
+            connection.sent += 1
+            self.release(connection)
+            return
+
+    def close(self):
+        while True:
+            try:
+                self.discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,87 @@
+"""
+A local SMTP stand-in for benchmarking the email consumer offline.
+
+It accepts any login and any message, counts the messages and drops them. No
+mail leaves the machine. `--handshake-delay` adds a delay to each new session
+and login, to model the TLS handshake and authentication of a real provider.
+
+    python smtp_standin.py --port 2525 --handshake-delay 0.2
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = 0
+        self.messages = 0
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.stats.lock:
+            server.stats.sessions += 1
+        time.sleep(server.handshake_delay)
+        self.reply("220 localhost SMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                time.sleep(server.handshake_delay)
+                self.reply("235 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with server.stats.lock:
+                    server.stats.messages += 1
+                self.reply("250 OK: queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handshake_delay=0.0):
+        super().__init__(address, SMTPHandler)
+        self.handshake_delay = handshake_delay
+        self.stats = Stats()
+
+    def start(self):
+        """Serve from a background thread and return the bound port."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.server_address[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--handshake-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    with SMTPStandIn((args.host, args.port), args.handshake_delay) as server:
+        print(f"SMTP stand-in listening on {args.host}:{args.port}")
+        server.serve_forever()
@@ -0,0 +1,67 @@
+"""
+Tests for the welcome email handler, against fakeredis and a stub SMTP pool.
+
+    cd backend/kafka-consumer && PYTHONPATH=.. python -m pytest
+"""
+import smtplib
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+import fakeredis
+
+import consumer
+
+Record = namedtuple("Record", "topic value headers")
+
+USER = {"user_id": 1, "username": "alice", "first_name": "", "last_name": "", "email": "alice@example.com"}
+
+
+def signup(key=b"7f6d0c1e-5a2b-4c3d-9e8f-0a1b2c3d4e5f", topic="user_signup"):
+    headers = [(consumer.IDEMPOTENCY_KEY, key)] if key is not None else []
+    return Record(topic, USER, headers)
+
+
+class WelcomeEmailTests(unittest.TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(consumer, "redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(consumer.smtp_pool, "send")
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_event_relayed_twice_is_sent_once(self):
+        consumer.welcome_email(signup())
+        consumer.welcome_email(signup())
+
+        self.send.assert_called_once()
+        self.assertEqual(self.send.call_args[0][1], "alice@example.com")
+        self.assertGreater(self.redis.ttl(b"welcome_email:7f6d0c1e-5a2b-4c3d-9e8f-0a1b2c3d4e5f"), 0)
+
+    def test_other_events_are_sent(self):
+        consumer.welcome_email(signup())
+        consumer.welcome_email(signup(key=b"0e6c2d4f-1b3a-4d5e-8f90-a1b2c3d4e5f6"))
+
+        self.assertEqual(self.send.call_count, 2)
+
+    def test_events_without_a_key_are_always_sent(self):
+        consumer.welcome_email(signup(key=None))
+        consumer.welcome_email(signup(key=None))
+
+        self.assertEqual(self.send.call_count, 2)
+
+    def test_failed_send_is_sent_on_retry(self):
+        self.send.side_effect = [smtplib.SMTPServerDisconnected("gone"), None]
+
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            consumer.welcome_email(signup())
+        # The retry topic keeps the headers of the record
+        consumer.welcome_email(signup(topic="user_signup.retry.1"))
+
+        self.assertEqual(self.send.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+"""
+Tests for the consumer framework, against a fake consumer and producer.
+
+    cd backend/kafka-consumer && PYTHONPATH=.. python -m pytest
+"""
+import time
+import unittest
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from eventschema import encode
+from kafka import OffsetAndMetadata, TopicPartition
+from kafka.errors import KafkaTimeoutError
+
+import framework
+from framework import (
+    ATTEMPT,
+    DUE,
+    ERROR,
+    ERROR_TYPE,
+    ORIGINAL_OFFSET,
+    ORIGINAL_PARTITION,
+    ORIGINAL_TOPIC,
+    ConsumerApp,
+    Rebalance,
+    header,
+)
+
+Record = namedtuple("Record", "topic partition offset key value headers")
+
+SIGNUP = TopicPartition("user_signup", 0)
+RETRY_1 = TopicPartition("user_signup.retry.1", 0)
+
+
+def signup(offset, topic="user_signup", headers=None, user_id=None):
+    value = encode("user_signup", {
+        "user_id": user_id if user_id is not None else offset,
+        "username": f"user{offset}",
+        "email": f"user{offset}@example.com",
+    })
+    return Record(topic, 0, offset, b"1", value, headers or [])
+
+
+class FakeFuture:
+    def __init__(self, error=None):
+        self.error = error
+
+    def get(self, timeout=None):
+        if self.error is not None:
+            raise self.error
+
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+        self.error = None
+
+    def send(self, topic, key=None, value=None, headers=None):
+        self.sent.append((topic, key, value, dict(headers)))
+        return FakeFuture(self.error)
+
+
+class FakeConsumer:
+    def __init__(self):
+        self.seeks = []
+        self.paused = set()
+        self.commits = []
+
+    def seek(self, tp, offset):
+        self.seeks.append((tp, offset))
+
+    def pause(self, *partitions):
+        self.paused.update(partitions)
+
+    def resume(self, *partitions):
+        self.paused.difference_update(partitions)
+
+    def commit(self, offsets):
+        self.commits.append(dict(offsets))
+
+
+@mock.patch.object(framework, "RETRY_DELAYS", [30, 300])
+class ConsumerAppTests(unittest.TestCase):
+    def setUp(self):
+        self.app = ConsumerApp(group_id="test-group")
+        self.app.consumer = FakeConsumer()
+        self.app.producer = FakeProducer()
+        self.handled = []
+        self.failing = set()
+
+        @self.app.handler("user_signup")
+        def welcome(record):
+            if record.value["user_id"] in self.failing:
+                raise ConnectionError("SMTP server unavailable")
+            self.handled.append(record.value["user_id"])
+
+        self.pool = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.pool.shutdown)
+
+    def process(self, batch):
+        self.app.process(self.pool, batch)
+        self.app.commit()
+
+    def test_topics_include_retry_topics(self):
+        self.assertEqual(
+            self.app.topics(), ["user_signup", "user_signup.retry.1", "user_signup.retry.2"]
+        )
+
+    def test_batch_is_committed_once(self):
+        self.process({SIGNUP: [signup(0), signup(1), signup(2)]})
+
+        self.assertEqual(sorted(self.handled), [0, 1, 2])
+        self.assertEqual(self.app.consumer.commits, [{SIGNUP: OffsetAndMetadata(3, "")}])
+        self.assertEqual(self.app.producer.sent, [])
+
+    def test_handlers_see_decoded_values(self):
+        values = []
+        self.app.handlers["user_signup"] = lambda record: values.append(record.value)
+
+        self.process({SIGNUP: [signup(7)]})
+
+        self.assertEqual(values, [{
+            "user_id": 7, "username": "user7", "first_name": "", "last_name": "",
+            "email": "user7@example.com",
+        }])
+
+    def test_undecodable_record_is_skipped(self):
+        bad = signup(0)._replace(value=b"\x00\x00")
+
+        self.process({SIGNUP: [bad, signup(1)]})
+
+        self.assertEqual(self.handled, [1])
+        self.assertEqual(self.app.consumer.commits, [{SIGNUP: OffsetAndMetadata(2, "")}])
+        self.assertEqual(self.app.producer.sent, [])
+
+    def test_failed_record_goes_to_the_first_retry_topic(self):
+        self.failing.add(1)
+        before = time.time()
+
+        self.process({SIGNUP: [signup(0), signup(1), signup(2)]})
+
+        # The batch is still committed past the failed record
+        self.assertEqual(self.app.consumer.commits, [{SIGNUP: OffsetAndMetadata(3, "")}])
+        ((topic, key, value, headers),) = self.app.producer.sent
+        self.assertEqual(topic, "user_signup.retry.1")
+        self.assertEqual((key, value), (b"1", signup(1).value))
+        self.assertEqual(headers[ATTEMPT], b"1")
+        self.assertEqual(headers[ORIGINAL_TOPIC], b"user_signup")
+        self.assertEqual(headers[ORIGINAL_PARTITION], b"0")
+        self.assertEqual(headers[ORIGINAL_OFFSET], b"1")
+        self.assertEqual(headers[ERROR], b"SMTP server unavailable")
+        self.assertEqual(headers[ERROR_TYPE], b"ConnectionError")
+        self.assertGreaterEqual(float(headers[DUE]), before + 30)
+
+    def test_retries_end_in_the_dlq(self):
+        self.failing.add(5)
+        record = signup(5)
+        topics = []
+        # Each attempt is consumed from the topic the previous one was sent to
+        for _ in range(3):
+            self.app.producer.sent = []
+            self.process({TopicPartition(record.topic, 0): [record]})
+            ((topic, key, value, headers),) = self.app.producer.sent
+            topics.append(topic)
+            record = Record(topic, 0, 40 + len(topics), key, value, [
+                (name, data) for name, data in headers.items() if name != DUE
+            ])
+
+        self.assertEqual(topics, ["user_signup.retry.1", "user_signup.retry.2", "user_signup.dlq"])
+        self.assertEqual(header(record, ATTEMPT), "3")
+        # The origin of the first failure is kept all the way
+        self.assertEqual(header(record, ORIGINAL_TOPIC), "user_signup")
+        self.assertEqual(header(record, ORIGINAL_OFFSET), "5")
+        self.assertIsNone(header(record, DUE))
+
+    def test_retried_record_is_handled_once_due(self):
+        due = str(time.time() - 1).encode()
+        record = signup(3, topic=RETRY_1.topic, headers=[
+            (ATTEMPT, b"1"), (DUE, due), (ORIGINAL_TOPIC, b"user_signup"),
+        ])
+
+        self.process({RETRY_1: [record]})
+
+        self.assertEqual(self.handled, [3])
+        self.assertEqual(self.app.consumer.commits, [{RETRY_1: OffsetAndMetadata(4, "")}])
+
+    def test_retry_partition_is_paused_until_due(self):
+        due = time.time() + 60
+        headers = [(ATTEMPT, b"1"), (ORIGINAL_TOPIC, b"user_signup")]
+        ready = signup(0, topic=RETRY_1.topic, headers=headers + [(DUE, b"0")])
+        waiting = signup(1, topic=RETRY_1.topic, headers=headers + [(DUE, str(due).encode())])
+        later = signup(2, topic=RETRY_1.topic, headers=headers + [(DUE, b"0")])
+
+        self.process({RETRY_1: [ready, waiting, later], SIGNUP: [signup(9)]})
+
+        # Records after the first one not due wait too, the main topic does not
+        self.assertEqual(sorted(self.handled), [0, 9])
+        self.assertEqual(self.app.consumer.seeks, [(RETRY_1, 1)])
+        self.assertEqual(self.app.consumer.paused, {RETRY_1})
+        self.assertEqual(self.app._paused, {RETRY_1: due})
+        self.assertEqual(
+            self.app.consumer.commits,
+            [{RETRY_1: OffsetAndMetadata(1, ""), SIGNUP: OffsetAndMetadata(10, "")}],
+        )
+
+        self.app.resume_due()
+        self.assertEqual(self.app.consumer.paused, {RETRY_1})
+
+        with mock.patch("framework.time.time", return_value=due):
+            self.app.resume_due()
+        self.assertEqual(self.app.consumer.paused, set())
+        self.assertEqual(self.app._paused, {})
+
+    def test_failed_republish_seeks_back(self):
+        self.failing.add(1)
+        self.app.producer.error = KafkaTimeoutError("Failed to update metadata")
+
+        self.process({SIGNUP: [signup(0), signup(1), signup(2)]})
+
+        # Offset 1 is delivered again; only offset 0 is committed
+        self.assertEqual(self.app.consumer.seeks, [(SIGNUP, 1)])
+        self.assertEqual(self.app.consumer.commits, [{SIGNUP: OffsetAndMetadata(1, "")}])
+
+    def test_failed_republish_of_the_first_record_commits_nothing(self):
+        self.failing.add(0)
+        self.app.producer.error = KafkaTimeoutError("Failed to update metadata")
+
+        self.process({SIGNUP: [signup(0), signup(1)]})
+
+        self.assertEqual(self.app.consumer.seeks, [(SIGNUP, 0)])
+        self.assertEqual(self.app.consumer.commits, [])
+
+    def test_revoke_commits_and_forgets_paused_partitions(self):
+        self.process({SIGNUP: []})
+        self.app._offsets = {SIGNUP: OffsetAndMetadata(4, "")}
+        self.app._paused = {RETRY_1: time.time() + 60}
+
+        Rebalance(self.app).on_partitions_revoked({SIGNUP, RETRY_1})
+
+        self.assertEqual(self.app.consumer.commits, [{SIGNUP: OffsetAndMetadata(4, "")}])
+        self.assertEqual(self.app._paused, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
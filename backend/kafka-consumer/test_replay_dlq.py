@@ -0,0 +1,101 @@
+"""
+Tests for replaying a dead-letter topic, against a fake consumer and producer.
+
+    cd backend/kafka-consumer && PYTHONPATH=.. python -m pytest
+"""
+import unittest
+from unittest import mock
+
+from kafka import OffsetAndMetadata, TopicPartition
+from kafka.errors import KafkaTimeoutError
+
+import replay_dlq
+from framework import ATTEMPT, ERROR, ERROR_TYPE, ORIGINAL_OFFSET, ORIGINAL_PARTITION, ORIGINAL_TOPIC
+from test_framework import FakeConsumer, FakeProducer, Record
+
+DLQ = TopicPartition("user_signup.dlq", 0)
+
+
+def dead(offset):
+    return Record(DLQ.topic, 0, offset, b"1", f"value {offset}".encode(), [
+        ("trace-id", b"abc"),
+        (ORIGINAL_TOPIC, b"user_signup"),
+        (ORIGINAL_PARTITION, b"2"),
+        (ORIGINAL_OFFSET, str(100 + offset).encode()),
+        (ATTEMPT, b"4"),
+        (ERROR, b"SMTP server unavailable"),
+        (ERROR_TYPE, b"ConnectionError"),
+    ])
+
+
+class DLQConsumer(FakeConsumer):
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def close(self):
+        self.closed = True
+
+
+class ReplayTests(unittest.TestCase):
+    def setUp(self):
+        self.consumer = DLQConsumer([dead(0), dead(1), dead(2)])
+        self.producer = FakeProducer()
+        self.producer.close = mock.Mock()
+        for name, fake in [("KafkaConsumer", self.consumer), ("KafkaProducer", self.producer)]:
+            patcher = mock.patch.object(replay_dlq, name, return_value=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_records_go_back_to_their_original_topic(self):
+        self.assertEqual(replay_dlq.replay("user_signup"), 3)
+
+        self.assertEqual(self.producer.sent, [
+            ("user_signup", b"1", f"value {offset}".encode(), {"trace-id": b"abc"})
+            for offset in range(3)
+        ])
+        self.assertEqual(self.consumer.commits, [
+            {DLQ: OffsetAndMetadata(offset, "")} for offset in (1, 2, 3)
+        ])
+        self.assertTrue(self.consumer.closed)
+        self.producer.close.assert_called_once_with()
+
+    def test_dlq_is_read_with_its_own_group(self):
+        replay_dlq.replay("user_signup")
+
+        args, kwargs = replay_dlq.KafkaConsumer.call_args
+        self.assertEqual(args, ("user_signup.dlq",))
+        self.assertEqual(kwargs["group_id"], "dlq-replay")
+        self.assertFalse(kwargs["enable_auto_commit"])
+
+    def test_limit(self):
+        self.assertEqual(replay_dlq.replay("user_signup", limit=2), 2)
+
+        self.assertEqual(len(self.producer.sent), 2)
+        self.assertEqual(self.consumer.commits[-1], {DLQ: OffsetAndMetadata(2, "")})
+
+    def test_dry_run_sends_and_commits_nothing(self):
+        self.assertEqual(replay_dlq.replay("user_signup", dry_run=True), 3)
+
+        self.assertEqual(self.producer.sent, [])
+        self.assertEqual(self.consumer.commits, [])
+
+    def test_record_is_not_committed_if_it_cannot_be_sent(self):
+        self.producer.error = KafkaTimeoutError("Failed to update metadata")
+
+        with self.assertRaises(KafkaTimeoutError):
+            replay_dlq.replay("user_signup")
+
+        self.assertEqual(self.consumer.commits, [])
+        self.assertTrue(self.consumer.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the SMTP connection pool, against the local SMTP stand-in.
+
+    cd backend/kafka-consumer && PYTHONPATH=.. python -m pytest
+"""
+import socket
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from smtp_pool import SMTPPool
+from smtp_standin import SMTPStandIn
+
+SENDER = "noreply@example.com"
+MESSAGE = "Subject: Welcome\r\n\r\nHello"
+
+
+class SMTPPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn(("127.0.0.1", 0))
+        port = self.server.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.pool = SMTPPool("127.0.0.1", port, SENDER, "secret", size=2, starttls=False)
+        self.addCleanup(self.pool.close)
+
+    def send(self, count):
+        for i in range(count):
+            self.pool.send(SENDER, [f"user{i}@example.com"], MESSAGE)
+
+    def drop_idle(self):
+        for connection in self.pool._idle.queue:
+            connection.smtp.sock.shutdown(socket.SHUT_RDWR)
+
+    def test_connection_is_reused(self):
+        self.send(5)
+
+        self.assertEqual(self.server.stats.messages, 5)
+        self.assertEqual(self.server.stats.sessions, 1)
+
+    def test_connection_is_replaced_after_max_messages(self):
+        self.pool.max_messages = 2
+
+        self.send(5)
+
+        self.assertEqual(self.server.stats.messages, 5)
+        self.assertEqual(self.server.stats.sessions, 3)
+
+    def test_dropped_connection_is_reopened_once(self):
+        self.send(1)
+        # The idle connection is dropped; the pool only notices on the next send
+        self.drop_idle()
+
+        self.send(1)
+
+        self.assertEqual(self.server.stats.messages, 2)
+        self.assertEqual(self.server.stats.sessions, 2)
+
+    def test_second_failure_is_raised(self):
+        self.send(1)
+        self.drop_idle()
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertRaises(ConnectionError):
+            self.send(1)
+
+        # The failed attempts gave back their slots
+        self.assertTrue(self.pool._slots.acquire(blocking=False))
+        self.assertTrue(self.pool._slots.acquire(blocking=False))
+
+    def test_open_connections_are_bounded(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: self.send(3), range(8)))
+
+        self.assertEqual(self.server.stats.messages, 24)
+        self.assertLessEqual(self.server.stats.sessions, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import os
-from mongoengine import connect
-from decouple import config
+from mongoengine import register_connection
+from decouple import Csv, config
 from datetime import timedelta
 
 # Base Directory
@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 
 # Middleware configuration (minimal for MongoEngine)
 MIDDLEWARE = [
+    "post.metrics.MetricsMiddleware",  # Outermost, so it times the whole stack
+    "post.profiling.QueryProfilerMiddleware",  # Only active with QUERY_PROFILING
     "corsheaders.middleware.CorsMiddleware",  # Must be at the top
     "django.middleware.security.SecurityMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -50,6 +52,8 @@ CACHES = {
         "LOCATION": "redis://redis:6379/0",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # Charges Redis time to the current request, see post.metrics
+            "CONNECTION_POOL_CLASS": "post.metrics.InstrumentedConnectionPool",
         },
     }
 }
@@ -57,6 +61,9 @@ CACHES = {
 # Cache time to live is 15 minutes (in seconds)
 CACHE_TTL = 60 * 15
 
+# Render and parse JSON with orjson (falls back to the stdlib when disabled)
+USE_ORJSON = config("USE_ORJSON", default=True, cast=bool)
+
 # REST Framework configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -67,7 +74,16 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,  # Number of records per page
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+    "DEFAULT_RENDERER_CLASSES": (
+        ("drf_orjson.renderers.ORJSONRenderer",)
+        if USE_ORJSON
+        else ("rest_framework.renderers.JSONRenderer",)
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "drf_orjson.parsers.ORJSONParser" if USE_ORJSON else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 # Simple JWT configuration
@@ -88,8 +104,44 @@ SIMPLE_JWT = {
 MONGO_DB_NAME = config("MONGO_DB_NAME")
 MONGO_HOST = config("MONGO_URI")
 
-#  Connect to MongoDB
-connect(db=MONGO_DB_NAME, host=MONGO_HOST)
+#  Register MongoDB; the client is created on first query, in the process that runs it
+register_connection("default", db=MONGO_DB_NAME, host=MONGO_HOST, connect=False)
+
+# User service, used to resolve who a user follows
+USER_SERVICE_URL = config("USER_SERVICE_URL", default="http://user-service:8000")
+USER_SERVICE_TIMEOUT = config("USER_SERVICE_TIMEOUT", default=5.0, cast=float)
+
+# Author cards embedded in feeds: seconds and entries kept per process, the
+# timeout for fetching them, and how long to stop asking after user-service fails
+AUTHOR_CACHE_TTL = config("AUTHOR_CACHE_TTL", default=300, cast=int)
+AUTHOR_CACHE_SIZE = config("AUTHOR_CACHE_SIZE", default=10000, cast=int)
+AUTHOR_CARDS_TIMEOUT = config("AUTHOR_CARDS_TIMEOUT", default=1.0, cast=float)
+AUTHOR_CARDS_RETRY_AFTER = config("AUTHOR_CARDS_RETRY_AFTER", default=30, cast=int)
+
+# Post, like and comment events, keyed by post id
+KAFKA_BOOTSTRAP_SERVERS = config("KAFKA_BOOTSTRAP_SERVERS", default="kafka:9092", cast=Csv())
+KAFKA_POST_EVENTS_TOPIC = config("KAFKA_POST_EVENTS_TOPIC", default="post_events")
+# The producer waits up to KAFKA_LINGER_MS to fill batches of KAFKA_BATCH_SIZE bytes
+KAFKA_LINGER_MS = config("KAFKA_LINGER_MS", default=20, cast=int)
+KAFKA_BATCH_SIZE = config("KAFKA_BATCH_SIZE", default=65536, cast=int)
+KAFKA_COMPRESSION = config("KAFKA_COMPRESSION", default="gzip")
+# Events waiting for the sender thread; further events are dropped and counted
+KAFKA_QUEUE_SIZE = config("KAFKA_QUEUE_SIZE", default=10000, cast=int)
+# Resends of a failed batch by the producer, which keeps one request in flight
+KAFKA_RETRIES = config("KAFKA_RETRIES", default=5, cast=int)
+
+# Read the like and comment counts of feeds from the hashes engagement-processor
+# keeps in Redis instead of counting them in MongoDB
+ENGAGEMENT_FROM_REDIS = config("ENGAGEMENT_FROM_REDIS", default=False, cast=bool)
+
+# Serve the hot read endpoints (feeds, hashtags, comments, like check) through
+# async views using Motor and httpx. Only pays off when served via config.asgi.
+ASYNC_READ_PATH = config("ASYNC_READ_PATH", default=False, cast=bool)
+
+# Profile the MongoDB queries of every request: adds a Server-Timing header and
+# logs query shapes repeated N_PLUS_ONE_THRESHOLD times or more
+QUERY_PROFILING = config("QUERY_PROFILING", default=False, cast=bool)
+N_PLUS_ONE_THRESHOLD = config("N_PLUS_ONE_THRESHOLD", default=5, cast=int)
 
 # Time zone and internationalization
 LANGUAGE_CODE = "en-us"
@@ -18,10 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from post.metrics import metrics_view
 
 urlpatterns = [
     # path('admin/', admin.site.urls),
     path('api/posts/', include('post.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -1,6 +1,18 @@
+import atexit
+
 from django.apps import AppConfig
 
 
 class PostConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'post'
+
+    def ready(self):
+        from . import metrics, profiling
+        from .warmup import close_connections
+
+        metrics.install_hooks()
+        profiling.install_hooks()
+
+        # Clients are opened lazily; close whatever this process opened when it exits
+        atexit.register(close_connections)
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+from django.conf import settings
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Clients are bound to the event loop they were created on. Under ASGI every
+# worker runs one loop; under WSGI `async_to_sync` may run each request on a
+# fresh loop, so keep one client per loop instead of a single global.
+_mongo_clients = {}
+_http_clients = {}
+
+
+def _current_loop():
+    loop = asyncio.get_running_loop()
+    for stale in [l for l in _mongo_clients if l.is_closed()]:
+        _mongo_clients.pop(stale).close()
+    for stale in [l for l in _http_clients if l.is_closed()]:
+        _http_clients.pop(stale)
+    return loop
+
+
+def get_async_db():
+    """
+    Return the Motor database for the running event loop, creating the client on first use.
+    """
+    loop = _current_loop()
+    client = _mongo_clients.get(loop)
+    if client is None:
+        client = AsyncIOMotorClient(settings.MONGO_HOST, io_loop=loop)
+        _mongo_clients[loop] = client
+    return client[settings.MONGO_DB_NAME]
+
+
+def get_http_client():
+    """
+    Return the shared httpx client for the running event loop, used to reach user-service.
+    """
+    loop = _current_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url=settings.USER_SERVICE_URL,
+            timeout=settings.USER_SERVICE_TIMEOUT,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        _http_clients[loop] = client
+    return client
+
+
+def close_clients():
+    """Close the Motor clients and forget the httpx clients. Called on worker exit."""
+    for client in _mongo_clients.values():
+        client.close()
+    _mongo_clients.clear()
+    # httpx clients can only be closed from their own loop, which is gone by now
+    _http_clients.clear()
@@ -0,0 +1,391 @@
+"""
+Async implementations of the hot read endpoints.
+
+They return the same payloads as the viewsets in `views.py`, but read MongoDB
+through Motor and call user-service through httpx, so a request waiting on I/O
+does not hold a worker thread. Enabled with `ASYNC_READ_PATH` and effective when
+served through `config.asgi`.
+"""
+import asyncio
+import logging
+import math
+from collections import OrderedDict
+from datetime import timezone as dt_timezone
+
+import httpx
+from asgiref.sync import sync_to_async
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from drf_orjson import ORJSONRenderer
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .async_db import get_async_db, get_http_client
+from .authentication import CustomJWTAuthentication
+from .authors import embed_authors
+from .blocks import blocked_usernames, exclude_blocked, filter_posts
+from .engagement import engagement_counts
+from .metrics import track
+from .views import FOLLOWING_PAGE_SIZE, CustomPagination
+
+logger = logging.getLogger(__name__)
+
+# Cache calls run in the default thread pool rather than the single
+# thread-sensitive executor, which would serialise every request.
+cache_get = sync_to_async(cache.get, thread_sensitive=False)
+cache_set = sync_to_async(cache.set, thread_sensitive=False)
+get_blocked_usernames = sync_to_async(blocked_usernames, thread_sensitive=False)
+# Only a cache miss leaves the process, and that is a short blocking request
+embed_authors_async = sync_to_async(embed_authors, thread_sensitive=False)
+get_engagement_counts = sync_to_async(engagement_counts, thread_sensitive=False)
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    response = HttpResponse(
+        ORJSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+    )
+    for key, value in (headers or {}).items():
+        response[key] = value
+    return response
+
+
+def exception_response(exc):
+    """Render an APIException the way DRF's default exception handler does."""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    headers = {}
+    if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+        headers["WWW-Authenticate"] = CustomJWTAuthentication().authenticate_header(None)
+    return json_response(data, exc.status_code, headers)
+
+
+def authenticate(request):
+    """
+    Return the username from the request's JWT, mirroring `IsAuthenticatedCustom`.
+    Token validation is pure CPU work, so it runs inline.
+    """
+    result = CustomJWTAuthentication().authenticate(request)
+    if result is None:
+        raise NotAuthenticated()
+    return result[0]
+
+
+def authenticate_optional(request):
+    """Like `authenticate`, but None for anonymous requests on public endpoints."""
+    result = CustomJWTAuthentication().authenticate(request)
+    return result[0] if result is not None else None
+
+
+def format_datetime(value):
+    """Format a naive UTC datetime from MongoDB like DRF's DateTimeField."""
+    if value is None:
+        return None
+    representation = value.replace(tzinfo=dt_timezone.utc).isoformat()
+    if representation.endswith("+00:00"):
+        representation = representation[:-6] + "Z"
+    return representation
+
+
+def parse_object_id(value):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+class AsyncPageNumberPagination:
+    """
+    Page-number pagination over a Motor cursor, producing the same envelope and
+    links as `CustomPagination`.
+    """
+
+    page_size = CustomPagination.page_size
+    page_size_query_param = CustomPagination.page_size_query_param
+    max_page_size = CustomPagination.max_page_size
+
+    def __init__(self, request):
+        self.request = request
+
+    def get_page_size(self):
+        try:
+            size = int(self.request.GET[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    async def paginate(self, collection, query, sort):
+        page_size = self.get_page_size()
+        count = await collection.count_documents(query)
+        num_pages = max(1, math.ceil(count / page_size))
+
+        page_number = self.request.GET.get("page", 1)
+        if page_number == "last":
+            page_number = num_pages
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            raise NotFound("Invalid page.")
+        if page_number < 1 or page_number > num_pages:
+            raise NotFound("Invalid page.")
+
+        cursor = collection.find(query, sort=sort, skip=(page_number - 1) * page_size, limit=page_size)
+        documents = await cursor.to_list(length=page_size)
+
+        self.count = count
+        self.page_number = page_number
+        self.num_pages = num_pages
+        return documents
+
+    def get_next_link(self):
+        if self.page_number >= self.num_pages:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, "page", self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number - 1 == 1:
+            return remove_query_param(url, "page")
+        return replace_query_param(url, "page", self.page_number - 1)
+
+    def get_paginated_data(self, results):
+        return OrderedDict([
+            ("count", self.count),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", results),
+        ])
+
+
+async def count_by_post(collection, post_ids):
+    pipeline = [
+        {"$match": {"post": {"$in": post_ids}}},
+        {"$group": {"_id": "$post", "n": {"$sum": 1}}},
+    ]
+    return {row["_id"]: row["n"] async for row in collection.aggregate(pipeline)}
+
+
+async def find_by_ids(collection, ids, projection):
+    if not ids:
+        return {}
+    cursor = collection.find({"_id": {"$in": list(ids)}}, projection)
+    return {doc["_id"]: doc async for doc in cursor}
+
+
+async def represent_posts(db, posts):
+    """
+    Build `PostSerializer` representations for a page of raw post documents,
+    batching the per-post like, comment, hashtag and image lookups.
+    """
+    post_ids = [post["_id"] for post in posts]
+    hashtag_ids = {tag_id for post in posts for tag_id in post.get("hashtags", [])}
+    image_ids = {post["image"] for post in posts if post.get("image")}
+
+    engagement = {}
+    if settings.ENGAGEMENT_FROM_REDIS:
+        engagement = await get_engagement_counts(post_ids)
+    # Posts Redis has no counts for are counted in MongoDB
+    uncounted = [post_id for post_id in post_ids if str(post_id) not in engagement]
+
+    likes, comments, hashtags, images = await asyncio.gather(
+        count_by_post(db.likes, uncounted),
+        count_by_post(db.comments, uncounted),
+        find_by_ids(db.hashtags, hashtag_ids, {"tag": 1, "count": 1}),
+        find_by_ids(db["fs.files"], image_ids, {"filename": 1}),
+    )
+
+    results = []
+    for post in posts:
+        image = None
+        image_doc = images.get(post.get("image"))
+        if image_doc and image_doc.get("filename"):
+            image = (
+                f"http://localhost:8001{settings.MEDIA_URL}posts/"
+                f"{post['username']}/{image_doc['filename']}"
+            )
+        counts = engagement.get(str(post["_id"]))
+        results.append(OrderedDict([
+            ("id", str(post["_id"])),
+            ("username", post["username"]),
+            ("content", post["content"]),
+            ("image", image),
+            ("hashtags", [
+                # str(Hashtag), as rendered by the serializer's CharField child
+                f"#{hashtags[tag_id]['tag']} (Used {hashtags[tag_id].get('count', 0)} times)"
+                for tag_id in post.get("hashtags", [])
+                if tag_id in hashtags
+            ]),
+            ("updated_at", format_datetime(post.get("updated_at"))),
+            ("likes", counts[0] if counts else likes.get(post["_id"], 0)),
+            ("comments_count", counts[1] if counts else comments.get(post["_id"], 0)),
+            ("timestamp", format_datetime(post.get("created_at"))),
+        ]))
+    return results
+
+
+def represent_comment(comment):
+    return OrderedDict([
+        ("id", str(comment["_id"])),
+        ("post", str(comment["post"])),
+        ("username", comment["username"]),
+        ("content", comment["content"]),
+        ("created_at", format_datetime(comment.get("created_at"))),
+        ("updated_at", format_datetime(comment.get("updated_at"))),
+    ])
+
+
+def represent_hashtag(hashtag):
+    return OrderedDict([
+        ("id", str(hashtag["_id"])),
+        ("tag", hashtag["tag"]),
+        ("count", hashtag.get("count", 0)),
+        ("posts", [str(post_id) for post_id in hashtag.get("posts", [])]),
+        ("last_updated", format_datetime(hashtag.get("last_updated"))),
+    ])
+
+
+async def paginated_posts(request, query):
+    db = get_async_db()
+    paginator = AsyncPageNumberPagination(request)
+    posts = await paginator.paginate(db.posts, query, [("created_at", -1)])
+    return paginator.get_paginated_data(await embed_authors_async(await represent_posts(db, posts)))
+
+
+async def fetch_following(username, auth_token):
+    """Return the usernames `username` follows, or an empty list if user-service fails."""
+    following_users = []
+    params = {"limit": FOLLOWING_PAGE_SIZE}
+    while True:
+        try:
+            with track("http"):
+                response = await get_http_client().get(
+                    f"/api/users/following/{username}/",
+                    headers={"Authorization": auth_token},
+                    params=params,
+                )
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching following list: {str(e)}")
+            return []
+        if response.status_code != 200:
+            return []
+        page = response.json()
+        following_users.extend(user["username"] for user in page["results"])
+        if page["next_cursor"] is None:
+            return following_users
+        params["cursor"] = page["next_cursor"]
+
+
+async def post_list(request):
+    """Async counterpart of `PostViewSet.list`."""
+    blocked = await get_blocked_usernames(authenticate_optional(request))
+    return json_response(await paginated_posts(request, exclude_blocked({}, blocked)))
+
+
+async def following_post_list(request):
+    """Async counterpart of `SpecificPostViewSet.list`."""
+    username = authenticate(request)
+    following_users = await fetch_following(username, request.headers.get("Authorization"))
+    return json_response(await paginated_posts(request, {"username": {"$in": following_users}}))
+
+
+async def hashtag_list(request):
+    """Async counterpart of `HashtagViewSet.list`, sharing its cache entry."""
+    cached_hashtags = await cache_get("all_hashtags")
+    if cached_hashtags is not None:
+        return json_response(cached_hashtags)
+
+    db = get_async_db()
+    paginator = AsyncPageNumberPagination(request)
+    hashtags = await paginator.paginate(db.hashtags, {}, [("count", -1)])
+    response_data = paginator.get_paginated_data([represent_hashtag(h) for h in hashtags])
+
+    await cache_set("all_hashtags", response_data, timeout=900)
+    return json_response(response_data)
+
+
+async def hashtag_detail(request, id):
+    """Async counterpart of `HashtagViewSet.retrieve`, sharing its cache entry."""
+    tag = id
+    blocked = await get_blocked_usernames(authenticate_optional(request))
+    cached_data = await cache_get(f"hashtag_{tag}")
+    if cached_data is not None:
+        posts = await embed_authors_async(filter_posts(cached_data["posts"], blocked))
+        return json_response({**cached_data, "posts": posts})
+
+    db = get_async_db()
+    hashtag = await db.hashtags.find_one({"tag": tag}, {"posts": 1})
+    if not hashtag:
+        return json_response(
+            {"error": f"Hashtag #{tag} not found."}, status.HTTP_404_NOT_FOUND
+        )
+
+    post_ids = hashtag.get("posts", [])
+    found = await find_by_ids(db.posts, post_ids, None)
+    posts = [found[post_id] for post_id in post_ids if post_id in found]
+    response_data = {"hashtag": f"#{tag}", "posts": await represent_posts(db, posts)}
+
+    await cache_set(f"hashtag_{tag}", response_data, timeout=900)
+    posts = await embed_authors_async(filter_posts(response_data["posts"], blocked))
+    return json_response({**response_data, "posts": posts})
+
+
+async def comment_list(request, post_id):
+    """Async counterpart of `CommentViewSet.list_comments`."""
+    post_oid = parse_object_id(post_id)
+    if post_oid is None:
+        return json_response({"error": "Post not found"}, status.HTTP_404_NOT_FOUND)
+
+    blocked = await get_blocked_usernames(authenticate_optional(request))
+    db = get_async_db()
+    paginator = AsyncPageNumberPagination(request)
+    query = exclude_blocked({"post": post_oid}, blocked)
+    comments = await paginator.paginate(db.comments, query, [("created_at", -1)])
+    results = await embed_authors_async([represent_comment(c) for c in comments])
+    return json_response(paginator.get_paginated_data(results))
+
+
+async def like_check(request, id):
+    """Async counterpart of `LikeViewSet.check`."""
+    username = authenticate(request)
+    post_oid = parse_object_id(id)
+    try:
+        db = get_async_db()
+        post = await db.posts.find_one({"_id": post_oid}, {"_id": 1}) if post_oid else None
+        if post is None:
+            return json_response({"error": "Post not found"}, status.HTTP_404_NOT_FOUND)
+        like = await db.likes.find_one({"post": post_oid, "username": username}, {"_id": 1})
+        return json_response({"liked": bool(like)})
+    except Exception as e:
+        logger.error(f"Error checking like status: {str(e)}")
+        return json_response(
+            {"error": "Failed to check like status"},
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+def async_read_view(async_view, sync_view):
+    """
+    Serve GET/HEAD through `async_view` and hand every other method to the
+    existing DRF view, so writes keep their current behaviour.
+    """
+
+    async def view(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        try:
+            return await async_view(request, *args, **kwargs)
+        except APIException as exc:
+            return exception_response(exc)
+
+    # Django 4.2's csrf_exempt decorator does not preserve coroutine functions
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,131 @@
+"""
+Author cards (display name and avatar) embedded in post and comment payloads.
+
+Cards come from user-service's batch `profiles` endpoint and are kept in a
+per-process cache for AUTHOR_CACHE_TTL seconds. user-service publishes the
+username on the `author_cards` channel whenever a profile changes; a listener
+thread evicts that card, so edits show up without waiting for the TTL.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+import requests
+from django.conf import settings
+
+from .metrics import track
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "author_cards"
+# user-service's limit per profiles request
+MAX_USERNAMES = 100
+
+
+class AuthorCache:
+    def __init__(self):
+        self._cards = OrderedDict()
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+        self._listener_pid = None
+        # After user-service fails, feeds skip author cards until this time
+        self._retry_at = 0.0
+
+    @property
+    def session(self):
+        # A session reuses connections to user-service; never shared across fork
+        if self._session is None or self._pid != os.getpid():
+            self._session = requests.Session()
+            self._pid = os.getpid()
+        return self._session
+
+    def get_many(self, usernames):
+        """Return {username: card or None}, fetching misses in batches of MAX_USERNAMES."""
+        now = time.monotonic()
+        cards = {}
+        missing = []
+        with self._lock:
+            for username in dict.fromkeys(usernames):
+                entry = self._cards.get(username)
+                if entry is not None and entry[0] > now:
+                    cards[username] = entry[1]
+                else:
+                    missing.append(username)
+        if missing:
+            cards.update(self.fetch(missing, now))
+        return cards
+
+    def fetch(self, usernames, now):
+        if now < self._retry_at:
+            return {}
+        profiles = {}
+        try:
+            for start in range(0, len(usernames), MAX_USERNAMES):
+                with track("http"):
+                    response = self.session.get(
+                        f"{settings.USER_SERVICE_URL}/api/users/profiles/",
+                        params={"usernames": ",".join(usernames[start:start + MAX_USERNAMES])},
+                        timeout=settings.AUTHOR_CARDS_TIMEOUT,
+                    )
+                response.raise_for_status()
+                profiles.update(response.json()["profiles"])
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.error(f"Error fetching author cards: {str(e)}")
+            self._retry_at = now + settings.AUTHOR_CARDS_RETRY_AFTER
+            return {}
+
+        # Usernames user-service does not know are cached as None too
+        fetched = {username: profiles.get(username) for username in usernames}
+        expires = now + settings.AUTHOR_CACHE_TTL
+        with self._lock:
+            for username, card in fetched.items():
+                self._cards[username] = (expires, card)
+                self._cards.move_to_end(username)
+            while len(self._cards) > settings.AUTHOR_CACHE_SIZE:
+                self._cards.popitem(last=False)
+        return fetched
+
+    def evict(self, username):
+        with self._lock:
+            self._cards.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._cards.clear()
+        self._retry_at = 0.0
+
+    def start_listener(self):
+        """Start the invalidation listener for this process, once."""
+        if self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        threading.Thread(target=self.listen, name="author-cards", daemon=True).start()
+
+    def listen(self):
+        while True:
+            try:
+                client = redis.Redis.from_url(settings.CACHES["default"]["LOCATION"])
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                # Changes published while we were not subscribed are lost
+                self.clear()
+                for message in pubsub.listen():
+                    self.evict(message["data"].decode())
+            except redis.RedisError as e:
+                logger.error(f"Author card listener disconnected: {str(e)}")
+                time.sleep(5)
+
+
+author_cards = AuthorCache()
+
+
+def embed_authors(items):
+    """Add an `author` card to each serialized post or comment, in place."""
+    cards = author_cards.get_many(item["username"] for item in items)
+    for item in items:
+        item["author"] = cards.get(item["username"])
+    return items
@@ -0,0 +1,48 @@
+"""
+Authors a viewer must not see, read from the block sets user-service publishes.
+
+user-service keeps `blocks:<username>` in the shared Redis as the set of users
+that user blocks or is blocked by. Feeds and comment lists leave those authors
+out of their queries; cached pages are filtered in-process against the set.
+"""
+import logging
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+def key(username):
+    return f"blocks:{username}"
+
+
+def viewer(request):
+    """The authenticated username, or None on endpoints open to anonymous users."""
+    return request.user if isinstance(request.user, str) else None
+
+
+def blocked_usernames(username):
+    """
+    Return the set of usernames hidden from `username`. Empty for anonymous
+    viewers, and when Redis is down so that feeds keep working.
+    """
+    if not username:
+        return frozenset()
+    try:
+        members = get_redis_connection("default").smembers(key(username))
+    except RedisError as e:
+        logger.error(f"Error reading block set for {username}: {str(e)}")
+        return frozenset()
+    return frozenset(member.decode() for member in members)
+
+
+def exclude_blocked(query, blocked):
+    """Add `username $nin blocked` to a raw MongoDB filter."""
+    if not blocked:
+        return query
+    return {**query, "username": {"$nin": sorted(blocked)}}
+
+
+def filter_posts(posts, blocked):
+    return [post for post in posts if post["username"] not in blocked]
@@ -0,0 +1,63 @@
+"""
+Domain events published by post-service: posts created and deleted, likes and
+comments added and removed.
+
+All of them go to one topic, KAFKA_POST_EVENTS_TOPIC, keyed by post id. Kafka
+keeps the order of records within a partition, so consumers see the events of
+any one post in the order they happened. Events are small: ids, usernames and
+the post's author, so aggregates per author need no lookup.
+
+`publish()` only queues the event for a sender thread with one batching,
+compressing KafkaProducer, see `eventschema.publisher`. The producer retries
+failed sends itself, KAFKA_RETRIES times with one request in flight, so a
+retried event never overtakes a newer one. Values are encoded with the
+`post_events` schema, see `eventschema`.
+"""
+from django.conf import settings
+from eventschema.publisher import EventPublisher
+
+from .metrics import KAFKA_MESSAGES, SERVICE
+
+POST_CREATED = "post_created"
+POST_DELETED = "post_deleted"
+LIKE_ADDED = "like_added"
+LIKE_REMOVED = "like_removed"
+COMMENT_ADDED = "comment_added"
+COMMENT_REMOVED = "comment_removed"
+
+
+def create_producer():
+    from eventschema.serializers import EventSerializer
+    from kafka import KafkaProducer
+
+    return KafkaProducer(
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+        acks="all",
+        linger_ms=settings.KAFKA_LINGER_MS,
+        batch_size=settings.KAFKA_BATCH_SIZE,
+        compression_type=settings.KAFKA_COMPRESSION,
+        retries=settings.KAFKA_RETRIES,
+        # More in flight would let a retried batch land after the next one
+        max_in_flight_requests_per_connection=1,
+        key_serializer=lambda k: str(k).encode("utf-8"),
+        value_serializer=EventSerializer(),
+    )
+
+
+def count(topic, outcome):
+    KAFKA_MESSAGES.labels(SERVICE, topic, outcome).inc()
+
+
+publisher = EventPublisher(create_producer, queue_size=settings.KAFKA_QUEUE_SIZE, count=count)
+
+
+def publish(topic, value, key=None):
+    return publisher.publish(topic, value, key=key)
+
+
+def post_event(event_type, post_id, **fields):
+    """Publish an event about post `post_id`, keyed by it."""
+    post_id = str(post_id)
+    return publish(
+        settings.KAFKA_POST_EVENTS_TOPIC, {"type": event_type, "post_id": post_id, **fields}, key=post_id
+    )
@@ -0,0 +1,49 @@
+"""
+A test case that cannot touch the databases the settings point at.
+
+Tests that save and delete documents or clear the cache run against the
+`test_thread_hive_db` MongoDB database, like `tests.PostServiceTests`, with
+both mongoengine and the Motor clients of the async read path pointed at it.
+The cache moves to a separate Redis database, so `cache.clear()` leaves the
+block sets and `engagement:*` hashes in the shared one alone.
+"""
+import copy
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from mongoengine import connect, disconnect, register_connection
+from mongoengine.connection import DEFAULT_CONNECTION_NAME
+
+from .async_db import close_clients
+
+TEST_DB_NAME = "test_thread_hive_db"
+TEST_MONGO_HOST = f"mongodb://localhost/{TEST_DB_NAME}"
+TEST_CACHE_DB = 15
+
+
+def test_caches():
+    """The cache settings with the default cache moved to TEST_CACHE_DB."""
+    caches = copy.deepcopy(settings.CACHES)
+    location = caches["default"]["LOCATION"]
+    caches["default"]["LOCATION"] = f"{location.rsplit('/', 1)[0]}/{TEST_CACHE_DB}"
+    return caches
+
+
+@override_settings(MONGO_DB_NAME=TEST_DB_NAME, MONGO_HOST=TEST_MONGO_HOST, CACHES=test_caches())
+class IsolatedTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        disconnect(alias=DEFAULT_CONNECTION_NAME)
+        connect(TEST_DB_NAME, host=TEST_MONGO_HOST)
+        # Motor clients are created from the settings on first use
+        close_clients()
+
+    @classmethod
+    def tearDownClass(cls):
+        disconnect(alias=DEFAULT_CONNECTION_NAME)
+        close_clients()
+        super().tearDownClass()
+        register_connection(
+            DEFAULT_CONNECTION_NAME, db=settings.MONGO_DB_NAME, host=settings.MONGO_HOST, connect=False
+        )
@@ -0,0 +1,75 @@
+import io
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+from drf_orjson import ORJSONParser, ORJSONRenderer
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+def feed_page(size):
+    """Build a payload shaped like a paginated feed (`PostSerializer`) response."""
+    results = [
+        OrderedDict([
+            ("id", str(ObjectId())),
+            ("username", f"user{i}"),
+            ("content", f"Post number {i} about #AI and #Python, with some extra text ❤"),
+            ("image", f"http://localhost:8001/media/posts/user{i}/user{i}_photo.jpg"),
+            ("hashtags", ["#AI (Used 120 times)", "#Python (Used 48 times)"]),
+            ("updated_at", "2024-11-30T18:22:01.123000Z"),
+            ("likes", i * 7),
+            ("comments_count", i),
+            ("timestamp", "2024-11-30T18:22:01.123000Z"),
+        ])
+        for i in range(size)
+    ]
+    return OrderedDict([
+        ("count", 100000),
+        ("next", "http://post-service:8000/api/posts/posts/?page=2"),
+        ("previous", None),
+        ("results", results),
+    ])
+
+
+def best_of(func, iterations, repeat=5):
+    """Return the best wall time, in seconds, of `repeat` runs of `iterations` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the stdlib and orjson JSON renderers/parsers on feed-sized payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, nargs="+", default=[10, 100])
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        for size in options["page_size"]:
+            data = feed_page(size)
+            body = JSONRenderer().render(data)
+            if ORJSONRenderer().render(data) != body:
+                self.stderr.write(self.style.ERROR(f"page_size={size}: renderer output differs"))
+
+            cases = [
+                ("render", lambda: JSONRenderer().render(data), lambda: ORJSONRenderer().render(data)),
+                ("parse", lambda: JSONParser().parse(io.BytesIO(body)),
+                 lambda: ORJSONParser().parse(io.BytesIO(body))),
+            ]
+            for name, stdlib, fast in cases:
+                slow_time = best_of(stdlib, iterations)
+                fast_time = best_of(fast, iterations)
+                self.stdout.write(
+                    f"feed page_size={size:<4} {name:<6} ({len(body)} bytes): "
+                    f"json {slow_time / iterations * 1e6:8.1f}us  "
+                    f"orjson {fast_time / iterations * 1e6:8.1f}us  "
+                    f"speedup x{slow_time / fast_time:.1f}"
+                )
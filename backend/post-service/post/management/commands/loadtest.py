@@ -0,0 +1,68 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent GET requests at read endpoints and report throughput and latency. "
+        "Run it once against the sync server (runserver / config.wsgi) and once against "
+        "the async one (ASYNC_READ_PATH=True under config.asgi) to compare the two modes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8001/api/posts")
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Endpoint path to hit, may be repeated (default: feed, hashtags, following).",
+        )
+        parser.add_argument("--token", help="Bearer token for authenticated endpoints.")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=1000, help="Requests per path.")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--label", default="", help="Label printed with each result line.")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or ["/posts/", "/hashtags/", "/following/"]
+        for path in paths:
+            asyncio.run(self.run_path(path, options))
+
+    async def run_path(self, path, options):
+        headers = {"Authorization": f"Bearer {options['token']}"} if options["token"] else {}
+        limits = httpx.Limits(max_connections=options["concurrency"])
+        latencies = []
+        statuses = {}
+        remaining = iter(range(options["requests"]))
+
+        async with httpx.AsyncClient(
+            base_url=options["base_url"], headers=headers, limits=limits, timeout=options["timeout"]
+        ) as client:
+
+            async def worker():
+                for _ in remaining:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(path)
+                        key = response.status_code
+                    except httpx.HTTPError as e:
+                        key = type(e).__name__
+                    latencies.append(time.perf_counter() - start)
+                    statuses[key] = statuses.get(key, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(options["concurrency"])))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f"{options['label']} {path}: {len(latencies)} requests in {elapsed:.2f}s "
+            f"({len(latencies) / elapsed:.1f} req/s) "
+            f"p50={quantiles[49] * 1000:.1f}ms p95={quantiles[94] * 1000:.1f}ms "
+            f"p99={quantiles[98] * 1000:.1f}ms statuses={statuses}"
+        )
@@ -0,0 +1,196 @@
+"""
+Prometheus metrics for post-service.
+
+`MetricsMiddleware` records request counts, latency and in-flight requests per
+route, plus the time each request spent waiting on MongoDB, Redis and
+user-service. Datastore time is accumulated in a context variable by the hooks
+below and observed once when the response is returned.
+
+Under gunicorn, set `PROMETHEUS_MULTIPROC_DIR` so that `/metrics` aggregates
+every worker instead of whichever one answered the scrape.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+from redis.connection import Connection, ConnectionPool
+
+SERVICE = "post-service"
+
+BACKENDS = ("mongo", "redis", "http")
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "Requests handled, by route and status code",
+    ["service", "method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route",
+    ["service", "method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled",
+    ["service", "method"],
+    multiprocess_mode="livesum",
+)
+BACKEND_TIME = Histogram(
+    "http_request_backend_seconds",
+    "Time a request spent waiting on a backend, by route",
+    ["service", "backend", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency, including commands run outside a request",
+    ["service", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+KAFKA_MESSAGES = Counter(
+    "kafka_messages_total",
+    "Events handed to Kafka, by topic and outcome: delivered, retried, failed or dropped",
+    ["service", "topic", "outcome"],
+)
+
+# Seconds spent per backend by the current request, None outside a request
+_backend_time = ContextVar("backend_time", default=None)
+
+
+def add_backend_time(backend, seconds):
+    timings = _backend_time.get()
+    if timings is not None:
+        timings[backend] += seconds
+
+
+@contextmanager
+def track(backend):
+    """Charge the time spent in the block to `backend` for the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_backend_time(backend, time.perf_counter() - start)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every MongoDB command issued by this process."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event)
+
+    def failed(self, event):
+        self._observe(event)
+
+    def _observe(self, event):
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_LATENCY.labels(SERVICE, event.command_name).observe(seconds)
+        add_backend_time("mongo", seconds)
+
+
+class InstrumentedRedisConnection(Connection):
+    """Redis connection that charges socket time to the current request."""
+
+    def send_packed_command(self, command, check_health=True):
+        with track("redis"):
+            return super().send_packed_command(command, check_health)
+
+    def read_response(self, *args, **kwargs):
+        with track("redis"):
+            return super().read_response(*args, **kwargs)
+
+
+class InstrumentedConnectionPool(ConnectionPool):
+    """Pool for django-redis' `CONNECTION_POOL_CLASS` that hands out instrumented connections."""
+
+    def __init__(self, connection_class=InstrumentedRedisConnection, **kwargs):
+        super().__init__(connection_class=connection_class, **kwargs)
+
+
+def install_hooks():
+    """Register the MongoDB listener. Must run before the first client is created."""
+    monitoring.register(MongoCommandListener())
+
+
+def get_route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.route if match is not None else "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Records per-route request metrics. Works under both WSGI and ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self.finish(request, response, *state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self.finish(request, response, *state)
+
+    def start(self, request):
+        REQUESTS_IN_PROGRESS.labels(SERVICE, request.method).inc()
+        token = _backend_time.set(dict.fromkeys(BACKENDS, 0.0))
+        return token, time.perf_counter()
+
+    def finish(self, request, response, token, start):
+        elapsed = time.perf_counter() - start
+        timings = _backend_time.get()
+        _backend_time.reset(token)
+        REQUESTS_IN_PROGRESS.labels(SERVICE, request.method).dec()
+
+        route = get_route(request)
+        status_code = response.status_code if response is not None else 500
+        REQUEST_COUNT.labels(SERVICE, request.method, route, status_code).inc()
+        REQUEST_LATENCY.labels(SERVICE, request.method, route).observe(elapsed)
+        for backend, seconds in timings.items():
+            if seconds:
+                BACKEND_TIME.labels(SERVICE, backend, route).observe(seconds)
+
+
+def metrics_view(request):
+    """Expose the metrics in the Prometheus text format."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
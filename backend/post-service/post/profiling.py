@@ -0,0 +1,210 @@
+"""
+Per-request MongoDB query profiler.
+
+Every command a request sends is grouped by its shape: the command with its
+values replaced by `?`, so `find likes {"post": ObjectId(...)}` issued for 20
+different posts is one shape seen 20 times. With `QUERY_PROFILING` on,
+`QueryProfilerMiddleware` logs shapes repeated `N_PLUS_ONE_THRESHOLD` times or
+more (the usual sign of a query issued once per item in a loop) and reports the
+totals in a `Server-Timing` header.
+
+In tests, `query_budget()` collects the same data and fails when an endpoint
+issues more queries than allowed. Motor sends commands from its thread pool in
+a copy of the request's context, so the async read path is profiled as well.
+"""
+import json
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Session, transaction and batching fields that do not change what a command reads
+MONGO_IGNORED_FIELDS = {
+    "$clusterTime", "$db", "$readPreference", "autocommit", "batchSize", "comment",
+    "cursor", "limit", "lsid", "maxTimeMS", "ordered", "readConcern", "singleBatch",
+    "skip", "startTransaction", "txnNumber", "writeConcern",
+}
+
+
+def strip_values(value):
+    if isinstance(value, dict):
+        return {key: strip_values(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # One element stands for the whole list, so `$in` lists of any length match
+        return [strip_values(item) for item in value[:1]]
+    return "?"
+
+
+def mongo_shape(command_name, command):
+    """Fingerprint a MongoDB command by its collection and structure."""
+    if command_name == "getMore":
+        collection = command.get("collection")
+    else:
+        collection = command.get(command_name)
+    structure = {
+        key: strip_values(value)
+        for key, value in command.items()
+        if key != command_name and key not in MONGO_IGNORED_FIELDS
+    }
+    return f"{command_name} {collection} {json.dumps(structure, sort_keys=True)}"
+
+
+class QueryProfile:
+    """Queries issued while the profile is active, grouped by backend and shape."""
+
+    def __init__(self):
+        self.queries = defaultdict(list)
+        self.pending = {}
+
+    def record(self, backend, shape, seconds):
+        self.queries[(backend, shape)].append(seconds)
+
+    def count(self, backend=None):
+        return sum(
+            len(timings) for (name, _), timings in self.queries.items()
+            if backend is None or name == backend
+        )
+
+    def duration(self, backend=None):
+        return sum(
+            sum(timings) for (name, _), timings in self.queries.items()
+            if backend is None or name == backend
+        )
+
+    def backends(self):
+        return sorted({backend for backend, _ in self.queries})
+
+    def repeated(self, threshold):
+        """Shapes issued at least `threshold` times, most frequent first."""
+        found = [
+            (backend, shape, len(timings))
+            for (backend, shape), timings in self.queries.items()
+            if len(timings) >= threshold
+        ]
+        return sorted(found, key=lambda item: -item[2])
+
+    def server_timing(self):
+        return ", ".join(
+            f'{backend};desc="{self.count(backend)} queries";dur={self.duration(backend) * 1000:.1f}'
+            for backend in self.backends()
+        )
+
+    def summary(self):
+        return "\n".join(
+            f"  {len(timings)} x {backend} {shape}"
+            for (backend, shape), timings in sorted(
+                self.queries.items(), key=lambda item: -len(item[1])
+            )
+        )
+
+
+_profile = ContextVar("query_profile", default=None)
+
+
+@contextmanager
+def profile():
+    """Collect the queries issued inside the block. Nested calls share the outer profile."""
+    current = _profile.get()
+    if current is not None:
+        yield current
+        return
+    current = QueryProfile()
+    token = _profile.set(current)
+    try:
+        yield current
+    finally:
+        _profile.reset(token)
+
+
+class ProfilingCommandListener(monitoring.CommandListener):
+    """Adds every MongoDB command to the active profile, if any."""
+
+    def started(self, event):
+        current = _profile.get()
+        if current is not None:
+            current.pending[(event.connection_id, event.request_id)] = mongo_shape(
+                event.command_name, event.command
+            )
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        current = _profile.get()
+        if current is None:
+            return
+        shape = current.pending.pop((event.connection_id, event.request_id), None)
+        if shape is not None:
+            current.record("mongo", shape, event.duration_micros / 1e6)
+
+
+def install_hooks():
+    """Register the MongoDB listener. Must run before the first client is created."""
+    monitoring.register(ProfilingCommandListener())
+
+
+def report(request, current):
+    for backend, shape, count in current.repeated(settings.N_PLUS_ONE_THRESHOLD):
+        logger.warning(
+            f"Possible N+1 in {request.method} {request.path}: {count} x {backend} {shape}"
+        )
+
+
+class QueryProfilerMiddleware:
+    """Profiles every request when `QUERY_PROFILING` is on, otherwise removes itself."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profile() as current:
+            response = self.get_response(request)
+        return self.finish(request, response, current)
+
+    async def __acall__(self, request):
+        with profile() as current:
+            response = await self.get_response(request)
+        return self.finish(request, response, current)
+
+    def finish(self, request, response, current):
+        report(request, current)
+        if current.queries:
+            response["Server-Timing"] = current.server_timing()
+        return response
+
+
+@contextmanager
+def query_budget(**limits):
+    """
+    Fail if the block issues more queries than allowed per backend, e.g.
+
+        with query_budget(mongo=4):
+            self.client.get("/api/posts/posts/")
+    """
+    with profile() as current:
+        yield current
+    for backend, limit in limits.items():
+        issued = current.count(backend)
+        if issued > limit:
+            raise AssertionError(
+                f"{issued} {backend} queries issued, budget is {limit}:\n{current.summary()}"
+            )
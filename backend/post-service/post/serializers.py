@@ -1,10 +1,24 @@
 from rest_framework import serializers
 from rest_framework_mongoengine.serializers import DocumentSerializer
 from .models import Post, Like, Comment, Hashtag
+from .engagement import engagement_counts
 from django.conf import settings
 import os
 
 
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of posts, reading their like and comment counts from
+    Redis in one round trip when ENGAGEMENT_FROM_REDIS is set.
+    """
+
+    def to_representation(self, data):
+        if settings.ENGAGEMENT_FROM_REDIS:
+            data = list(data)
+            self.child.engagement = engagement_counts(post.id for post in data)
+        return super().to_representation(data)
+
+
 class PostSerializer(DocumentSerializer):
     """
     Serializer for creating and retrieving posts.
@@ -17,9 +31,12 @@ class PostSerializer(DocumentSerializer):
     likes = serializers.SerializerMethodField()
     comments_count = serializers.SerializerMethodField()
     image = serializers.FileField(required=False, allow_null=True)
+    # {post id: (likes, comments)} for the page being serialized, see PostListSerializer
+    engagement = {}
 
     class Meta:
         model = Post
+        list_serializer_class = PostListSerializer
         fields = [
             "id",
             "username",
@@ -35,10 +52,16 @@ class PostSerializer(DocumentSerializer):
 
     def get_likes(self, obj):
         """Get the number of likes for a post"""
+        counts = self.engagement.get(str(obj.id))
+        if counts is not None:
+            return counts[0]
         return Like.objects(post=obj).count()
 
     def get_comments_count(self, obj):
         """Get the number of comments for a post"""
+        counts = self.engagement.get(str(obj.id))
+        if counts is not None:
+            return counts[1]
         return Comment.objects(post=obj).count()
 
     def to_representation(self, instance):
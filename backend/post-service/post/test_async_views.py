@@ -0,0 +1,286 @@
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import async_views
+from .async_db import get_async_db
+from .async_views import async_read_view
+from .authors import AuthorCache, author_cards
+from .isolated import TEST_CACHE_DB, TEST_DB_NAME, IsolatedTestCase
+from .models import Comment, Hashtag, Like, Post
+from .profiling import query_budget
+
+
+def card(username):
+    return {"username": username, "display_name": username.title(), "avatar_url": None}
+
+
+def profiles(*usernames):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {"profiles": {name: card(name) for name in usernames}}
+    return response
+
+
+def following(usernames):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {
+        "results": [{"id": i, "username": name} for i, name in enumerate(usernames)],
+        "next_cursor": None,
+        "count": len(usernames),
+    }
+    return response
+
+
+class EngagementPipeline:
+    """Answers HMGETs from a dict, in the order they were queued."""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.keys = []
+
+    def hmget(self, key, *fields):
+        self.keys.append(key)
+
+    def execute(self):
+        return [self.counts.get(key, [None, None]) for key in self.keys]
+
+
+class AsyncReadParityTests(IsolatedTestCase):
+    """
+    Every async read view must return the JSON its DRF viewset returns for the
+    same data and request.
+    """
+
+    def setUp(self):
+        cache.clear()
+        author_cards.clear()
+        for document in (Post, Like, Comment, Hashtag):
+            document.objects.delete()
+
+        self.ai = Hashtag(tag="AI", count=3).save()
+        self.cats = Hashtag(tag="cats", count=1).save()
+        start = datetime(2024, 11, 30, 18, 22, 1, 123000)
+        self.posts = []
+        for i, username in enumerate(["bob", "carol", "dave"] * 5):
+            hashtags = [self.ai] if i % 3 == 0 else [self.ai, self.cats] if i == 1 else []
+            self.posts.append(Post(
+                username=username,
+                content=f"Post {i} from {username} ❤",
+                hashtags=hashtags,
+                created_at=start - timedelta(minutes=i),
+            ).save())
+        self.ai.posts = self.posts[:6]
+        self.ai.save()
+        self.cats.posts = [self.posts[1]]
+        self.cats.save()
+
+        post = self.posts[0]
+        for i, username in enumerate(["alice", "bob", "carol"]):
+            Like(post=post, username=username).save()
+            Comment(
+                post=post, username=username, content=f"Comment {i}",
+                created_at=start + timedelta(seconds=i),
+            ).save()
+        Like(post=self.posts[1], username="alice").save()
+
+        token = AccessToken()
+        token["username"] = "alice"
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+        patcher = mock.patch("post.blocks.get_redis_connection")
+        self.redis = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.redis.smembers.return_value = set()
+
+        patcher = mock.patch.object(AuthorCache, "session", new_callable=mock.PropertyMock)
+        self.session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.session.get.return_value = profiles("bob", "carol", "dave", "alice")
+
+    def tearDown(self):
+        for document in (Post, Like, Comment, Hashtag):
+            document.objects.delete()
+        cache.clear()
+        author_cards.clear()
+
+    def async_get(self, async_view, path, *args, **extra):
+        view = async_read_view(async_view, sync_view=None)
+        response = async_to_sync(view)(RequestFactory().get(path, **extra), *args)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return response.status_code, json.loads(response.content)
+
+    def assertParity(self, async_view, path, *args, **extra):
+        """Request `path` from the DRF view and from `async_view`; return the shared JSON."""
+        expected = self.client.get(path, **extra)
+        status_code, data = self.async_get(async_view, path, *args, **extra)
+
+        self.assertEqual(status_code, expected.status_code)
+        self.assertEqual(data, expected.json())
+        return data
+
+    def test_runs_against_the_test_databases(self):
+        async def async_db_name():
+            return get_async_db().name
+
+        self.assertEqual(Post._get_db().name, TEST_DB_NAME)
+        self.assertEqual(async_to_sync(async_db_name)(), TEST_DB_NAME)
+        self.assertTrue(settings.CACHES["default"]["LOCATION"].endswith(f"/{TEST_CACHE_DB}"))
+
+    def test_post_list(self):
+        data = self.assertParity(async_views.post_list, "/api/posts/posts/")
+
+        self.assertEqual(data["count"], 15)
+        self.assertEqual(data["results"][0]["author"], card("bob"))
+        self.assertEqual(data["results"][0]["likes"], 3)
+        self.assertEqual(data["results"][0]["hashtags"], ["#AI (Used 3 times)"])
+
+    def test_post_list_pages(self):
+        self.assertParity(async_views.post_list, "/api/posts/posts/?page=2")
+        self.assertParity(async_views.post_list, "/api/posts/posts/?page=last&page_size=4")
+        self.assertParity(async_views.post_list, "/api/posts/posts/?page_size=1000")
+        data = self.assertParity(async_views.post_list, "/api/posts/posts/?page=9")
+        self.assertEqual(data, {"detail": "Invalid page."})
+
+    def test_post_list_query_budget(self):
+        # Count, page, likes, comments and hashtags, however many posts are on the page
+        for path in ("/api/posts/posts/?page_size=2", "/api/posts/posts/?page_size=15"):
+            with self.subTest(path=path):
+                with query_budget(mongo=5) as current:
+                    self.async_get(async_views.post_list, path)
+
+                # Motor's commands run on its thread pool, in a copy of the request's context
+                self.assertEqual(current.count("mongo"), 5)
+
+    def test_post_list_hides_blocked_authors(self):
+        self.redis.smembers.return_value = {b"bob", b"dave"}
+
+        data = self.assertParity(async_views.post_list, "/api/posts/posts/", **self.auth)
+
+        self.assertEqual({post["username"] for post in data["results"]}, {"carol"})
+
+    def test_unknown_authors(self):
+        self.session.get.return_value = profiles("carol")
+
+        data = self.assertParity(async_views.post_list, "/api/posts/posts/")
+
+        authors = {post["username"]: post["author"] for post in data["results"]}
+        self.assertEqual(authors, {"bob": None, "carol": card("carol"), "dave": None})
+
+    @mock.patch("post.async_views.get_http_client")
+    @mock.patch("post.views.requests.get")
+    def test_following_post_list(self, get, get_http_client):
+        get.return_value = following(["bob", "dave"])
+        get_http_client.return_value.get = mock.AsyncMock(return_value=following(["bob", "dave"]))
+
+        data = self.assertParity(async_views.following_post_list, "/api/posts/following/", **self.auth)
+
+        self.assertEqual(data["count"], 10)
+
+    def test_following_requires_authentication(self):
+        data = self.assertParity(async_views.following_post_list, "/api/posts/following/")
+
+        self.assertIn("detail", data)
+
+    def test_hashtag_list(self):
+        # The DRF view fills the cache, the async view reads it
+        data = self.assertParity(async_views.hashtag_list, "/api/posts/hashtags/")
+
+        # And the other way round
+        cache.clear()
+        self.assertEqual(self.async_get(async_views.hashtag_list, "/api/posts/hashtags/"), (200, data))
+        self.assertEqual(self.client.get("/api/posts/hashtags/").json(), data)
+        self.assertEqual([h["tag"] for h in data["results"]], ["AI", "cats"])
+
+    def test_hashtag_list_is_served_from_cache(self):
+        self.client.get("/api/posts/hashtags/")
+        self.ai.count = 99
+        self.ai.save()
+
+        data = self.assertParity(async_views.hashtag_list, "/api/posts/hashtags/")
+
+        self.assertEqual(data["results"][0]["count"], 3)
+
+    def test_hashtag_detail(self):
+        data = self.assertParity(async_views.hashtag_detail, "/api/posts/hashtags/AI/", "AI")
+
+        cache.clear()
+        self.assertEqual(
+            self.async_get(async_views.hashtag_detail, "/api/posts/hashtags/AI/", "AI"), (200, data)
+        )
+        self.assertEqual(self.client.get("/api/posts/hashtags/AI/").json(), data)
+        self.assertEqual(data["hashtag"], "#AI")
+        self.assertEqual(len(data["posts"]), 6)
+        self.assertEqual(data["posts"][1]["hashtags"], ["#AI (Used 3 times)", "#cats (Used 1 times)"])
+
+    def test_hashtag_detail_cache_is_filtered_per_viewer(self):
+        self.client.get("/api/posts/hashtags/AI/")
+        self.redis.smembers.return_value = {b"carol"}
+
+        data = self.assertParity(async_views.hashtag_detail, "/api/posts/hashtags/AI/", "AI", **self.auth)
+
+        self.assertEqual({post["username"] for post in data["posts"]}, {"bob", "dave"})
+        self.assertEqual(len(cache.get("hashtag_AI")["posts"]), 6)
+
+    def test_hashtag_detail_not_found(self):
+        data = self.assertParity(async_views.hashtag_detail, "/api/posts/hashtags/nope/", "nope")
+
+        self.assertEqual(data, {"error": "Hashtag #nope not found."})
+
+    def test_comment_list(self):
+        post_id = str(self.posts[0].id)
+
+        data = self.assertParity(
+            async_views.comment_list, f"/api/posts/comments/by_post/{post_id}/", post_id
+        )
+
+        self.assertEqual([c["content"] for c in data["results"]], ["Comment 2", "Comment 1", "Comment 0"])
+        self.assertEqual(data["results"][0]["author"], card("carol"))
+
+    def test_comment_list_hides_blocked_authors(self):
+        self.redis.smembers.return_value = {b"bob"}
+        post_id = str(self.posts[0].id)
+
+        data = self.assertParity(
+            async_views.comment_list, f"/api/posts/comments/by_post/{post_id}/?page_size=1", post_id,
+            **self.auth,
+        )
+
+        self.assertEqual(data["count"], 2)
+
+    def test_like_check(self):
+        for post, liked in [(self.posts[0], True), (self.posts[2], False)]:
+            data = self.assertParity(
+                async_views.like_check, f"/api/posts/likes/{post.id}/check/", str(post.id), **self.auth
+            )
+            self.assertEqual(data, {"liked": liked})
+
+    def test_like_check_missing_post(self):
+        post_id = str(self.posts[0].id)
+        self.posts[0].delete()
+
+        data = self.assertParity(
+            async_views.like_check, f"/api/posts/likes/{post_id}/check/", post_id, **self.auth
+        )
+
+        self.assertEqual(data, {"error": "Post not found"})
+
+    @override_settings(ENGAGEMENT_FROM_REDIS=True)
+    @mock.patch("post.engagement.get_redis_connection")
+    def test_engagement_from_redis(self, get_redis_connection):
+        counted = str(self.posts[1].id)
+        get_redis_connection.return_value.pipeline.side_effect = (
+            lambda **kwargs: EngagementPipeline({f"engagement:post:{counted}": [b"42", b"7"]})
+        )
+
+        data = self.assertParity(async_views.post_list, "/api/posts/posts/")
+
+        counts = {post["id"]: (post["likes"], post["comments_count"]) for post in data["results"]}
+        self.assertEqual(counts[counted], (42, 7))
+        # Not in Redis, counted in MongoDB
+        self.assertEqual(counts[str(self.posts[0].id)], (3, 3))
@@ -0,0 +1,102 @@
+from unittest import mock
+
+import requests
+from django.test import override_settings
+
+from .authors import AuthorCache, author_cards
+from .isolated import IsolatedTestCase
+from .models import Comment, Post
+
+
+def card(username):
+    return {"username": username, "display_name": username.title(), "avatar_url": None}
+
+
+def profiles(*usernames):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {"profiles": {name: card(name) for name in usernames}}
+    return response
+
+
+class AuthorCardTests(IsolatedTestCase):
+    def setUp(self):
+        author_cards.clear()
+        Post.objects.delete()
+        Comment.objects.delete()
+        for username in ["bob", "carol", "bob"]:
+            Post(username=username, content=f"Hello from {username}").save()
+        patcher = mock.patch.object(AuthorCache, "session", new_callable=mock.PropertyMock)
+        self.session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        Post.objects.delete()
+        Comment.objects.delete()
+        author_cards.clear()
+
+    def test_feed_embeds_authors_with_one_request(self):
+        self.session.get.return_value = profiles("bob", "carol")
+
+        response = self.client.get("/api/posts/posts/")
+
+        for post in response.json()["results"]:
+            self.assertEqual(post["author"], card(post["username"]))
+        self.session.get.assert_called_once()
+        self.assertEqual(
+            sorted(self.session.get.call_args.kwargs["params"]["usernames"].split(",")),
+            ["bob", "carol"],
+        )
+
+    def test_cards_are_cached(self):
+        self.session.get.return_value = profiles("bob", "carol")
+
+        self.client.get("/api/posts/posts/")
+        self.client.get("/api/posts/posts/")
+
+        self.session.get.assert_called_once()
+
+    def test_evicted_card_is_fetched_again(self):
+        self.session.get.return_value = profiles("bob", "carol")
+        self.client.get("/api/posts/posts/")
+
+        author_cards.evict("bob")
+        self.client.get("/api/posts/posts/")
+
+        self.assertEqual(self.session.get.call_args.kwargs["params"]["usernames"], "bob")
+
+    def test_unknown_authors_are_cached_as_none(self):
+        self.session.get.return_value = profiles("carol")
+
+        self.client.get("/api/posts/posts/")
+        response = self.client.get("/api/posts/posts/")
+
+        authors = {post["username"]: post["author"] for post in response.json()["results"]}
+        self.assertEqual(authors, {"bob": None, "carol": card("carol")})
+        self.session.get.assert_called_once()
+
+    @override_settings(AUTHOR_CARDS_RETRY_AFTER=30)
+    def test_user_service_failure_backs_off(self):
+        self.session.get.side_effect = requests.ConnectionError("Connection refused")
+
+        first = self.client.get("/api/posts/posts/")
+        self.client.get("/api/posts/posts/")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIsNone(first.json()["results"][0]["author"])
+        self.session.get.assert_called_once()
+
+    def test_comments_embed_authors(self):
+        self.session.get.return_value = profiles("bob", "carol")
+        post = Post.objects.first()
+        Comment(post=post, username="carol", content="Nice").save()
+
+        response = self.client.get(f"/api/posts/comments/by_post/{post.id}/")
+
+        self.assertEqual(response.json()["results"][0]["author"], card("carol"))
+
+    def test_large_pages_are_fetched_in_batches(self):
+        self.session.get.return_value = profiles()
+
+        author_cards.get_many(f"user{i}" for i in range(250))
+
+        self.assertEqual(self.session.get.call_count, 3)
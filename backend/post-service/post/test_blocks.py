@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.cache import cache
+from redis.exceptions import ConnectionError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .blocks import exclude_blocked
+from .isolated import IsolatedTestCase
+from .models import Comment, Hashtag, Post
+
+
+class BlockFilterTests(IsolatedTestCase):
+    def setUp(self):
+        cache.clear()
+        for document in (Post, Comment, Hashtag):
+            document.objects.delete()
+        self.posts = {
+            username: Post(username=username, content=f"Hello from {username}").save()
+            for username in ["bob", "carol", "dave"]
+        }
+        token = AccessToken()
+        token["username"] = "alice"
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        patcher = mock.patch("post.blocks.get_redis_connection")
+        self.redis = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.redis.smembers.return_value = {b"bob", b"dave"}
+
+    def tearDown(self):
+        for document in (Post, Comment, Hashtag):
+            document.objects.delete()
+
+    def usernames(self, items):
+        return sorted(item["username"] for item in items)
+
+    def test_post_list_hides_blocked_authors(self):
+        response = self.client.get("/api/posts/posts/", **self.auth)
+
+        self.assertEqual(self.usernames(response.json()["results"]), ["carol"])
+        self.assertEqual(response.json()["count"], 1)
+        self.redis.smembers.assert_called_once_with("blocks:alice")
+
+    def test_anonymous_viewers_see_everything(self):
+        response = self.client.get("/api/posts/posts/")
+
+        self.assertEqual(self.usernames(response.json()["results"]), ["bob", "carol", "dave"])
+        self.redis.smembers.assert_not_called()
+
+    def test_comments_hide_blocked_authors(self):
+        post = self.posts["carol"]
+        for username in ["bob", "carol"]:
+            Comment(post=post, username=username, content="Nice").save()
+
+        response = self.client.get(f"/api/posts/comments/by_post/{post.id}/", **self.auth)
+
+        self.assertEqual(self.usernames(response.json()["results"]), ["carol"])
+
+    def test_cached_hashtag_page_is_filtered_per_viewer(self):
+        Hashtag(tag="hello", count=3, posts=list(self.posts.values())).save()
+        self.client.get("/api/posts/hashtags/hello/")
+
+        response = self.client.get("/api/posts/hashtags/hello/", **self.auth)
+
+        self.assertEqual(self.usernames(response.json()["posts"]), ["carol"])
+        # The shared cache entry still holds every post
+        self.assertEqual(len(cache.get("hashtag_hello")["posts"]), 3)
+
+    def test_redis_failure_fails_open(self):
+        self.redis.smembers.side_effect = ConnectionError("Connection refused")
+
+        response = self.client.get("/api/posts/posts/", **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_exclude_blocked(self):
+        self.assertEqual(exclude_blocked({"post": 1}, frozenset()), {"post": 1})
+        self.assertEqual(
+            exclude_blocked({"post": 1}, frozenset({"dave", "bob"})),
+            {"post": 1, "username": {"$nin": ["bob", "dave"]}},
+        )
@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from redis.exceptions import ConnectionError
+
+from .isolated import IsolatedTestCase
+from .models import Comment, Hashtag, Like, Post
+
+
+@override_settings(ENGAGEMENT_FROM_REDIS=True)
+class EngagementFromRedisTests(IsolatedTestCase):
+    def setUp(self):
+        cache.clear()
+        for document in (Post, Like, Comment, Hashtag):
+            document.objects.delete()
+        self.counted = Post(username="bob", content="Counted").save()
+        self.uncounted = Post(username="carol", content="Older than the processor").save()
+        for post in (self.counted, self.uncounted):
+            Like(post=post, username="alice").save()
+        patcher = mock.patch("post.engagement.get_redis_connection")
+        self.pipe = patcher.start().return_value.pipeline.return_value
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for document in (Post, Like, Comment, Hashtag):
+            document.objects.delete()
+
+    def engagement(self):
+        response = self.client.get("/api/posts/posts/")
+        return {
+            post["id"]: (post["likes"], post["comments_count"])
+            for post in response.json()["results"]
+        }
+
+    def reply(self, counts):
+        # One HMGET reply per post, in the order the pipeline was filled
+        def execute():
+            return [
+                counts.get(call.args[0].split(":")[-1], [None, None])
+                for call in self.pipe.hmget.call_args_list
+            ]
+        self.pipe.execute.side_effect = execute
+
+    def test_counts_come_from_redis(self):
+        self.reply({str(self.counted.id): [b"42", b"7"]})
+
+        engagement = self.engagement()
+
+        self.assertEqual(engagement[str(self.counted.id)], (42, 7))
+        self.pipe.hmget.assert_any_call(f"engagement:post:{self.counted.id}", "likes", "comments")
+        self.pipe.execute.assert_called_once()
+
+    def test_posts_without_counts_are_counted_in_mongodb(self):
+        self.reply({str(self.counted.id): [b"42", b"7"]})
+
+        self.assertEqual(self.engagement()[str(self.uncounted.id)], (1, 0))
+
+    def test_redis_errors_fall_back_to_mongodb(self):
+        self.pipe.execute.side_effect = ConnectionError("Redis is down")
+
+        engagement = self.engagement()
+
+        self.assertEqual(engagement[str(self.counted.id)], (1, 0))
+        self.assertEqual(engagement[str(self.uncounted.id)], (1, 0))
+
+    @override_settings(ENGAGEMENT_FROM_REDIS=False)
+    def test_disabled_by_default(self):
+        self.engagement()
+
+        self.pipe.execute.assert_not_called()
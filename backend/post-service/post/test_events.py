@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from eventschema import decode, encode
+from eventschema.serializers import EventSerializer
+from prometheus_client import REGISTRY
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .events import count, create_producer
+from .isolated import IsolatedTestCase
+from .models import Comment, Hashtag, Like, Post
+
+LABELS = {"service": "post-service", "topic": "post_events", "outcome": "delivered"}
+
+
+class PostEventTests(IsolatedTestCase):
+    def setUp(self):
+        for document in (Post, Like, Comment, Hashtag):
+            document.objects.delete()
+        self.post = Post(username="bob", content="Hello").save()
+        token = AccessToken()
+        token["username"] = "alice"
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        patcher = mock.patch("post.events.publisher")
+        self.publisher = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for document in (Post, Like, Comment, Hashtag):
+            document.objects.delete()
+
+    def events(self):
+        return [call.args[1] for call in self.publisher.publish.call_args_list]
+
+    def test_post_created(self):
+        response = self.client.post(
+            "/api/posts/posts/", {"content": "Hi #there", "hashtags": ["#there"]}, **self.auth
+        )
+
+        self.assertEqual(response.status_code, 201)
+        post_id = response.json()["id"]
+        self.publisher.publish.assert_called_once_with(
+            "post_events",
+            {"type": "post_created", "post_id": post_id, "username": "alice", "hashtags": ["#there"]},
+            key=post_id,
+        )
+
+    # Keeps GridFS, where images are deleted from, out of the test
+    @mock.patch.object(Post, "delete")
+    def test_post_deleted(self, delete):
+        post = Post(username="alice", content="Bye").save()
+
+        self.client.delete(f"/api/posts/posts/{post.id}/", **self.auth)
+
+        delete.assert_called_once()
+        self.assertEqual(
+            self.events(), [{"type": "post_deleted", "post_id": str(post.id), "username": "alice"}]
+        )
+
+    def test_like_and_unlike_carry_the_author(self):
+        self.client.post(f"/api/posts/likes/{self.post.id}/like/", **self.auth)
+        self.client.delete(f"/api/posts/likes/{self.post.id}/unlike/", **self.auth)
+
+        expected = {"post_id": str(self.post.id), "username": "alice", "author": "bob"}
+        self.assertEqual(
+            self.events(),
+            [{"type": "like_added", **expected}, {"type": "like_removed", **expected}],
+        )
+
+    def test_comment_added_and_removed(self):
+        response = self.client.post(
+            f"/api/posts/comments/add/{self.post.id}/", {"content": "Nice"}, **self.auth
+        )
+        comment_id = response.json()["id"]
+        self.client.delete(f"/api/posts/comments/{comment_id}/delete/", **self.auth)
+
+        expected = {
+            "post_id": str(self.post.id), "comment_id": comment_id, "username": "alice", "author": "bob",
+        }
+        self.assertEqual(
+            self.events(),
+            [{"type": "comment_added", **expected}, {"type": "comment_removed", **expected}],
+        )
+
+    @mock.patch.object(Post, "delete")
+    def test_events_match_the_schema(self, delete):
+        self.client.post("/api/posts/posts/", {"content": "Hi"}, **self.auth)
+        self.client.post(f"/api/posts/likes/{self.post.id}/like/", **self.auth)
+        response = self.client.post(
+            f"/api/posts/comments/add/{self.post.id}/", {"content": "Nice"}, **self.auth
+        )
+        self.client.delete(f"/api/posts/comments/{response.json()['id']}/delete/", **self.auth)
+        self.client.delete(f"/api/posts/likes/{self.post.id}/unlike/", **self.auth)
+        post = Post(username="alice", content="Bye").save()
+        self.client.delete(f"/api/posts/posts/{post.id}/", **self.auth)
+
+        self.assertEqual(len(self.events()), 6)
+        for event in self.events():
+            decoded = decode("post_events", encode("post_events", event))
+            self.assertEqual({key: decoded[key] for key in event}, event)
+
+    def test_events_are_keyed_by_post(self):
+        self.client.post(f"/api/posts/likes/{self.post.id}/like/", **self.auth)
+
+        self.assertEqual(self.publisher.publish.call_args.kwargs["key"], str(self.post.id))
+
+
+class CreateProducerTests(SimpleTestCase):
+    @mock.patch("kafka.KafkaProducer")
+    def test_producer_keeps_events_in_order(self, kafka_producer):
+        create_producer()
+
+        config = kafka_producer.call_args.kwargs
+        self.assertEqual(config["acks"], "all")
+        self.assertEqual(config["retries"], 5)
+        self.assertEqual(config["max_in_flight_requests_per_connection"], 1)
+        self.assertIsInstance(config["value_serializer"], EventSerializer)
+
+    def test_outcomes_are_counted(self):
+        before = REGISTRY.get_sample_value("kafka_messages_total", LABELS) or 0
+
+        count("post_events", "delivered")
+
+        self.assertEqual(REGISTRY.get_sample_value("kafka_messages_total", LABELS), before + 1)
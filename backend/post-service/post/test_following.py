@@ -0,0 +1,51 @@
+from unittest import mock
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .isolated import IsolatedTestCase
+from .models import Post
+
+
+def page(usernames, next_cursor=None):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {
+        "results": [{"id": i, "username": name} for i, name in enumerate(usernames)],
+        "next_cursor": next_cursor,
+        "count": 3,
+    }
+    return response
+
+
+class FollowingFeedTests(IsolatedTestCase):
+    def setUp(self):
+        Post.objects.delete()
+        for username in ["bob", "carol", "dave", "erin"]:
+            Post(username=username, content=f"Hello from {username}").save()
+        token = AccessToken()
+        token["username"] = "alice"
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def tearDown(self):
+        Post.objects.delete()
+
+    @mock.patch("post.views.requests.get")
+    def test_follows_every_cursor_page(self, get):
+        get.side_effect = [page(["bob", "carol"], next_cursor=7), page(["dave"])]
+
+        response = self.client.get("/api/posts/following/", **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(post["username"] for post in response.json()["results"]),
+            ["bob", "carol", "dave"],
+        )
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(get.call_args_list[1].kwargs["params"]["cursor"], 7)
+
+    @mock.patch("post.views.requests.get")
+    def test_user_service_failure_shows_nothing(self, get):
+        get.side_effect = [page(["bob"], next_cursor=1), mock.Mock(status_code=503)]
+
+        response = self.client.get("/api/posts/following/", **self.auth)
+
+        self.assertEqual(response.json()["results"], [])
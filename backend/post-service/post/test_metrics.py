@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from prometheus_client import REGISTRY
+
+from .metrics import (
+    MetricsMiddleware,
+    MongoCommandListener,
+    SERVICE,
+    _backend_time,
+    add_backend_time,
+    track,
+)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, {"service": SERVICE, **labels}) or 0
+
+
+class MetricsMiddlewareTests(SimpleTestCase):
+    def test_counts_requests_by_route_and_status(self):
+        labels = {"method": "GET", "route": "api/posts/health/"}
+        before = sample("http_requests_total", status="200", **labels)
+        latency_before = sample("http_request_duration_seconds_count", **labels)
+
+        response = self.client.get("/api/posts/health/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sample("http_requests_total", status="200", **labels), before + 1)
+        self.assertEqual(
+            sample("http_request_duration_seconds_count", **labels), latency_before + 1
+        )
+        self.assertEqual(sample("http_requests_in_progress", method="GET"), 0)
+
+    def test_unresolved_paths_share_one_route(self):
+        labels = {"method": "GET", "route": "<unmatched>", "status": "404"}
+        before = sample("http_requests_total", **labels)
+
+        self.client.get("/no/such/page/")
+        self.client.get("/another/missing/page/")
+
+        self.assertEqual(sample("http_requests_total", **labels), before + 2)
+
+    def test_backend_time_is_observed_per_request(self):
+        labels = {"backend": "http", "route": "<unmatched>"}
+        before = sample("http_request_backend_seconds_count", **labels)
+
+        def view(request):
+            add_backend_time("http", 0.02)
+            add_backend_time("http", 0.03)
+            return HttpResponse()
+
+        MetricsMiddleware(view)(RequestFactory().get("/"))
+
+        self.assertEqual(sample("http_request_backend_seconds_count", **labels), before + 1)
+        # Backends the request never touched are not observed
+        self.assertEqual(
+            sample("http_request_backend_seconds_count", backend="redis", route="<unmatched>"), 0
+        )
+
+    def test_async_requests(self):
+        labels = {"method": "GET", "route": "<unmatched>", "status": "201"}
+        before = sample("http_requests_total", **labels)
+
+        async def view(request):
+            with track("mongo"):
+                await asyncio.sleep(0)
+            return HttpResponse(status=201)
+
+        middleware = MetricsMiddleware(view)
+        response = asyncio.run(middleware(RequestFactory().get("/")))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sample("http_requests_total", **labels), before + 1)
+
+    def test_failed_requests_count_as_500(self):
+        labels = {"method": "POST", "route": "<unmatched>", "status": "500"}
+        before = sample("http_requests_total", **labels)
+
+        def view(request):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            MetricsMiddleware(view)(RequestFactory().post("/"))
+
+        self.assertEqual(sample("http_requests_total", **labels), before + 1)
+        self.assertEqual(sample("http_requests_in_progress", method="POST"), 0)
+
+
+class BackendHookTests(SimpleTestCase):
+    def test_track_outside_a_request_is_a_no_op(self):
+        with track("redis"):
+            pass
+        self.assertIsNone(_backend_time.get())
+
+    def test_mongo_listener_charges_the_current_request(self):
+        before = sample("mongo_command_duration_seconds_count", command="find")
+        token = _backend_time.set({"mongo": 0.0, "redis": 0.0, "http": 0.0})
+        try:
+            MongoCommandListener().succeeded(
+                SimpleNamespace(command_name="find", duration_micros=1500)
+            )
+            self.assertAlmostEqual(_backend_time.get()["mongo"], 0.0015)
+        finally:
+            _backend_time.reset(token)
+        self.assertEqual(sample("mongo_command_duration_seconds_count", command="find"), before + 1)
+
+
+class MetricsViewTests(SimpleTestCase):
+    def test_exposes_prometheus_text(self):
+        self.client.get("/api/posts/ready/")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"http_requests_total{", response.content)
+        self.assertIn(b"http_request_duration_seconds_bucket{", response.content)
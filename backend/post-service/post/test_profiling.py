@@ -0,0 +1,136 @@
+import asyncio
+from itertools import count
+from types import SimpleNamespace
+
+from bson import ObjectId
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .profiling import (
+    ProfilingCommandListener,
+    QueryProfilerMiddleware,
+    mongo_shape,
+    profile,
+    query_budget,
+)
+
+request_ids = count()
+
+
+def run_command(command_name, command, duration_micros=1000):
+    """Feed a started/succeeded pair to the listener, as pymongo would."""
+    listener = ProfilingCommandListener()
+    event = SimpleNamespace(
+        command_name=command_name,
+        command=command,
+        connection_id=("localhost", 27017),
+        request_id=next(request_ids),
+        duration_micros=duration_micros,
+    )
+    listener.started(event)
+    listener.succeeded(event)
+
+
+def count_likes(post_id):
+    run_command("count", {"count": "likes", "query": {"post": post_id}, "$db": "posts"})
+
+
+class MongoShapeTests(SimpleTestCase):
+    def test_values_do_not_change_the_shape(self):
+        first = mongo_shape("find", {"find": "likes", "filter": {"post": ObjectId()}, "limit": 1})
+        second = mongo_shape("find", {"find": "likes", "filter": {"post": ObjectId()}, "limit": 5})
+        self.assertEqual(first, second)
+
+    def test_in_lists_of_any_length_match(self):
+        short = mongo_shape("find", {"find": "posts", "filter": {"_id": {"$in": [ObjectId()]}}})
+        long = mongo_shape(
+            "find", {"find": "posts", "filter": {"_id": {"$in": [ObjectId() for _ in range(9)]}}}
+        )
+        self.assertEqual(short, long)
+
+    def test_collection_and_fields_change_the_shape(self):
+        likes = mongo_shape("find", {"find": "likes", "filter": {"post": 1}})
+        comments = mongo_shape("find", {"find": "comments", "filter": {"post": 1}})
+        by_user = mongo_shape("find", {"find": "likes", "filter": {"username": "a"}})
+        self.assertEqual(len({likes, comments, by_user}), 3)
+
+    def test_get_more_uses_the_collection(self):
+        first = mongo_shape("getMore", {"getMore": 1234, "collection": "posts"})
+        second = mongo_shape("getMore", {"getMore": 5678, "collection": "posts"})
+        self.assertEqual(first, second)
+        self.assertIn("posts", first)
+
+
+class ProfileTests(SimpleTestCase):
+    def test_commands_outside_a_profile_are_ignored(self):
+        count_likes(ObjectId())
+        with profile() as current:
+            pass
+        self.assertEqual(current.count(), 0)
+
+    def test_repeated_shapes_are_reported(self):
+        with profile() as current:
+            for _ in range(6):
+                count_likes(ObjectId())
+            run_command("find", {"find": "posts", "filter": {}})
+
+        self.assertEqual(current.count("mongo"), 7)
+        repeated = current.repeated(5)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0][2], 6)
+        self.assertIn("count likes", repeated[0][1])
+
+    def test_nested_profiles_share_queries(self):
+        with profile() as outer:
+            with profile() as inner:
+                count_likes(ObjectId())
+        self.assertIs(outer, inner)
+        self.assertEqual(outer.count(), 1)
+
+
+class QueryBudgetTests(SimpleTestCase):
+    def test_within_budget(self):
+        with query_budget(mongo=2):
+            count_likes(ObjectId())
+            count_likes(ObjectId())
+
+    def test_over_budget(self):
+        with self.assertRaisesMessage(AssertionError, "3 mongo queries issued, budget is 2"):
+            with query_budget(mongo=2):
+                for _ in range(3):
+                    count_likes(ObjectId())
+
+
+def n_plus_one_view(request):
+    run_command("find", {"find": "posts", "filter": {}}, duration_micros=2000)
+    for _ in range(5):
+        count_likes(ObjectId())
+    return HttpResponse()
+
+
+class QueryProfilerMiddlewareTests(SimpleTestCase):
+    @override_settings(QUERY_PROFILING=True, N_PLUS_ONE_THRESHOLD=5)
+    def test_adds_server_timing_and_logs_n_plus_one(self):
+        middleware = QueryProfilerMiddleware(n_plus_one_view)
+
+        with self.assertLogs("post.profiling", "WARNING") as logs:
+            response = middleware(RequestFactory().get("/api/posts/posts/"))
+
+        self.assertEqual(response["Server-Timing"], 'mongo;desc="6 queries";dur=7.0')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Possible N+1 in GET /api/posts/posts/: 5 x mongo count likes", logs.output[0])
+
+    @override_settings(QUERY_PROFILING=True)
+    def test_async_requests(self):
+        async def view(request):
+            count_likes(ObjectId())
+            return HttpResponse()
+
+        response = asyncio.run(QueryProfilerMiddleware(view)(RequestFactory().get("/")))
+
+        self.assertTrue(response["Server-Timing"].startswith('mongo;desc="1 queries"'))
+
+    @override_settings(QUERY_PROFILING=False)
+    def test_disabled_by_default(self):
+        response = self.client.get("/api/posts/health/")
+        self.assertNotIn("Server-Timing", response)
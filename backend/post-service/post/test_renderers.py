@@ -0,0 +1,146 @@
+import datetime
+import decimal
+import io
+from collections import OrderedDict
+from unittest import mock
+
+from bson import ObjectId
+from django.test import SimpleTestCase
+from django.utils import timezone
+from drf_orjson import ORJSONParser, ORJSONRenderer
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+
+
+def feed_page(size=10):
+    """Build a payload shaped like a paginated `PostSerializer` response."""
+    results = ReturnList(serializer=None)
+    for i in range(size):
+        results.append(OrderedDict([
+            ("id", str(ObjectId())),
+            ("username", f"user{i}"),
+            ("content", f"Post number {i} ❤ café \U0001F680"),
+            ("image", None if i % 2 else f"http://localhost:8001/media/posts/user{i}/{i}.jpg"),
+            ("hashtags", ["#AI (Used 3 times)", "#日本"]),
+            ("updated_at", "2024-11-30T18:22:01.123000Z"),
+            ("likes", i * 7),
+            ("comments_count", i),
+            ("timestamp", "2024-11-30T18:22:01.123000Z"),
+        ]))
+    return OrderedDict([
+        ("count", 1234),
+        ("next", "http://testserver/api/posts/posts/?page=2"),
+        ("previous", None),
+        ("results", results),
+    ])
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """
+    The orjson renderer must produce exactly the bytes of DRF's JSONRenderer.
+    """
+
+    def assertSameBytes(self, data):
+        expected = JSONRenderer().render(data)
+        self.assertEqual(ORJSONRenderer().render(data), expected)
+
+    def test_feed_page(self):
+        self.assertSameBytes(feed_page())
+
+    def test_hashtag_list(self):
+        self.assertSameBytes(ReturnDict(
+            [("id", "656f1c2e9b1e8a0012345678"), ("tag", "#AI"), ("count", 2),
+             ("posts", ["656f1c2e9b1e8a0012345679", "656f1c2e9b1e8a001234567a"]),
+             ("last_updated", "2024-11-30T18:22:01Z")],
+            serializer=None,
+        ))
+
+    def test_scalars_and_errors(self):
+        self.assertSameBytes({
+            "liked": True,
+            "none": None,
+            "int": -42,
+            "float": 0.1,
+            "big": 2 ** 63 - 1,
+            "error": ErrorDetail("Hashtag '#a b' contains invalid characters.", code="invalid"),
+            "nested": [[1, 2], (3, 4), {"a": []}],
+        })
+
+    def test_datetimes(self):
+        self.assertSameBytes({
+            "naive": datetime.datetime(2024, 11, 30, 18, 22, 1, 123456),
+            "naive_no_micro": datetime.datetime(2024, 11, 30, 18, 22, 1),
+            "utc": datetime.datetime(2024, 11, 30, 18, 22, 1, 123000, tzinfo=datetime.timezone.utc),
+            "aware": timezone.make_aware(
+                datetime.datetime(2024, 11, 30, 18, 22, 1),
+                datetime.timezone(datetime.timedelta(hours=5, minutes=30)),
+            ),
+            "date": datetime.date(2024, 11, 30),
+            "time": datetime.time(18, 22, 1, 500),
+            "duration": datetime.timedelta(minutes=15),
+        })
+
+    def test_decimal(self):
+        self.assertSameBytes({"price": decimal.Decimal("12.50"), "zero": decimal.Decimal("0")})
+
+    def test_exponent_floats(self):
+        self.assertSameBytes({
+            "tiny": 1e-7,
+            "small": 2.5e-05,
+            "huge": 1e16,
+            "ratio": [0.0001, 1.5e300, -3e-5],
+            "decimal": decimal.Decimal("1E-7"),
+        })
+        self.assertSameBytes(1e-7)
+
+    def test_plain_floats_are_not_rendered_twice(self):
+        data = {"ratio": [0.5, 0.0001, 12.25, 1e15], "content": "2.5e-05 or 0.00001"}
+        with mock.patch.object(JSONRenderer, "render") as render:
+            ORJSONRenderer().render(data)
+        render.assert_not_called()
+
+    def test_non_finite_floats_render_as_null(self):
+        # JSONRenderer raises instead; orjson cannot tell them apart from None in its output
+        for value in (float("nan"), float("inf"), -float("inf")):
+            self.assertEqual(ORJSONRenderer().render({"score": value}), b'{"score":null}')
+
+    def test_line_separators_are_escaped(self):
+        self.assertSameBytes({"content": "line\u2028break\u2029paragraph"})
+
+    def test_object_id(self):
+        oid = ObjectId()
+        self.assertEqual(ORJSONRenderer().render({"id": oid}), JSONRenderer().render({"id": str(oid)}))
+
+    def test_int_overflow_falls_back(self):
+        self.assertSameBytes({"huge": 2 ** 70})
+
+    def test_indent_falls_back(self):
+        data = feed_page(2)
+        self.assertEqual(
+            ORJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+
+class ORJSONParserTests(SimpleTestCase):
+
+    def test_matches_json_parser(self):
+        body = JSONRenderer().render(feed_page(3))
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"content": '))
+
+    def test_nan_is_rejected(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"likes": NaN}'))
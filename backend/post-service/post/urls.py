@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -9,6 +10,7 @@ from .views import (
     HashtagGeneratorViewSet,
     DummyViewSet,
     HealthCheckView,
+    ReadinessView,
 )
 
 router = DefaultRouter()
@@ -26,4 +28,60 @@ router.register(r"dummy", DummyViewSet, basename="dummy")
 urlpatterns = [
     path("", include(router.urls)),
     path("health/", HealthCheckView.as_view(), name="health_check"),
+    path("ready/", ReadinessView.as_view(), name="readiness_check"),
 ]
+
+if settings.ASYNC_READ_PATH:
+    from . import async_views
+    from .async_views import async_read_view
+
+    # Matched before the router; non-GET requests fall through to the same viewset actions
+    urlpatterns = [
+        path(
+            "posts/",
+            async_read_view(
+                async_views.post_list,
+                PostViewSet.as_view({"get": "list", "post": "create"}),
+            ),
+        ),
+        path(
+            "following/",
+            async_read_view(
+                async_views.following_post_list,
+                SpecificPostViewSet.as_view({"get": "list", "post": "create"}),
+            ),
+        ),
+        path(
+            "hashtags/",
+            async_read_view(
+                async_views.hashtag_list,
+                HashtagViewSet.as_view({"get": "list", "post": "create"}),
+            ),
+        ),
+        path(
+            "hashtags/<str:id>/",
+            async_read_view(
+                async_views.hashtag_detail,
+                HashtagViewSet.as_view({
+                    "get": "retrieve",
+                    "put": "update",
+                    "patch": "partial_update",
+                    "delete": "destroy",
+                }),
+            ),
+        ),
+        path(
+            "comments/by_post/<str:post_id>/",
+            async_read_view(
+                async_views.comment_list,
+                CommentViewSet.as_view({"get": "list_comments"}),
+            ),
+        ),
+        path(
+            "likes/<str:id>/check/",
+            async_read_view(
+                async_views.like_check,
+                LikeViewSet.as_view({"get": "check"}),
+            ),
+        ),
+    ] + urlpatterns
@@ -1,7 +1,7 @@
 import os
 import base64
-import openai
 import requests
+from django.conf import settings
 from django.core.cache import cache
 from rest_framework_mongoengine.viewsets import ModelViewSet, GenericViewSet
 from rest_framework.pagination import PageNumberPagination
@@ -18,7 +18,20 @@ from .serializers import (
     CommentSerializer,
     HashtagSerializer,
 )
+from .authors import embed_authors
+from .blocks import blocked_usernames, filter_posts, viewer
+from .events import (
+    COMMENT_ADDED,
+    COMMENT_REMOVED,
+    LIKE_ADDED,
+    LIKE_REMOVED,
+    POST_CREATED,
+    POST_DELETED,
+    post_event,
+)
+from .metrics import track
 from .permissions import IsAuthenticatedCustom
+from .warmup import warm_up
 import logging
 
 # Configure logging
@@ -31,6 +44,9 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
+PREDEFINED_HASHTAGS = ["America", "USA", "TrumpWon", "ElonMusk", "Twitter"]
+
+
 class CustomPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
@@ -47,11 +63,14 @@ class PostViewSet(ModelViewSet):
     ViewSet for handling CRUD operations on posts.
     """
 
-    queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedCustom]
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        # Built per request: touching `Post.objects` at import time opens the connection
+        return Post.objects.all()
+
     def get_permissions(self):
         """Allow unauthenticated access to list and retrieve"""
         if self.action in ["list", "retrieve", "by_user"]:
@@ -66,9 +85,9 @@ class PostViewSet(ModelViewSet):
 
             if page is not None:
                 serializer = self.get_serializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
+                return self.get_paginated_response(embed_authors(serializer.data))
             serializer = self.get_serializer(posts, many=True)
-            return Response(serializer.data)
+            return Response(embed_authors(serializer.data))
         except Exception as e:
             return Response(
                 {"error": f"Failed to retrieve posts from user {username}"},
@@ -78,12 +97,15 @@ class PostViewSet(ModelViewSet):
     def list(self, request, *args, **kwargs):
         """Get all posts"""
         queryset = self.filter_queryset(self.get_queryset())
+        blocked = blocked_usernames(viewer(request))
+        if blocked:
+            queryset = queryset.filter(username__nin=list(blocked))
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(embed_authors(serializer.data))
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(embed_authors(serializer.data))
 
     def create(self, request, *args, **kwargs):
         """Create a new post"""
@@ -140,10 +162,23 @@ class PostViewSet(ModelViewSet):
 
     def perform_create(self, serializer):
         try:
-            serializer.save(username=self.request.user)
+            post = serializer.save(username=self.request.user)
         except Exception as e:
             logger.error(f"Error in perform_create: {str(e)}")
             raise
+        post_event(
+            POST_CREATED, post.id,
+            username=post.username, hashtags=[hashtag.tag for hashtag in post.hashtags],
+        )
+
+    def perform_destroy(self, instance):
+        post_id, username = instance.id, instance.username
+        instance.delete()
+        post_event(POST_DELETED, post_id, username=username)
+
+
+# user-service's largest page size
+FOLLOWING_PAGE_SIZE = 500
 
 
 class SpecificPostViewSet(ModelViewSet):
@@ -151,7 +186,6 @@ class SpecificPostViewSet(ModelViewSet):
     ViewSet for handling posts from followed users.
     """
 
-    queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedCustom]
     pagination_class = CustomPagination
@@ -167,16 +201,25 @@ class SpecificPostViewSet(ModelViewSet):
             # Get the authenticated user's username
             username = str(self.request.user)
 
-            # Call the user service with the correct endpoint including username
-            response = requests.get(
-                f"http://user-service:8000/api/users/following/{username}/",
-                headers={"Authorization": auth_token},
-            )
-            if response.status_code == 200:
-                # Extract usernames from the following users list
-                following_users = [user["username"] for user in response.json()]
-                return Post.objects.filter(username__in=following_users)
-            return Post.objects.none()
+            # Call the user service, following its cursor pages to the end
+            following_users = []
+            params = {"limit": FOLLOWING_PAGE_SIZE}
+            while True:
+                with track("http"):
+                    response = requests.get(
+                        f"{settings.USER_SERVICE_URL}/api/users/following/{username}/",
+                        headers={"Authorization": auth_token},
+                        params=params,
+                        timeout=settings.USER_SERVICE_TIMEOUT,
+                    )
+                if response.status_code != 200:
+                    return Post.objects.none()
+                page = response.json()
+                following_users.extend(user["username"] for user in page["results"])
+                if page["next_cursor"] is None:
+                    break
+                params["cursor"] = page["next_cursor"]
+            return Post.objects.filter(username__in=following_users)
         except requests.RequestException:
             return Post.objects.none()
 
@@ -186,9 +229,15 @@ class SpecificPostViewSet(ModelViewSet):
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(embed_authors(serializer.data))
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(embed_authors(serializer.data))
+
+
+def post_author(post_id):
+    """Username of the post's author, for events about it; None if the post is gone."""
+    post = Post.objects(id=post_id).only("username").first()
+    return post.username if post else None
 
 
 class LikeViewSet(ModelViewSet):
@@ -196,10 +245,12 @@ class LikeViewSet(ModelViewSet):
     ViewSet for handling likes on posts.
     """
 
-    queryset = Like.objects.all()
     serializer_class = LikeSerializer
     permission_classes = [IsAuthenticatedCustom]
 
+    def get_queryset(self):
+        return Like.objects.all()
+
     @action(detail=True, methods=["get"], url_path="check")
     def check(self, request, id=None):
         """Check if a user has liked a post"""
@@ -232,6 +283,7 @@ class LikeViewSet(ModelViewSet):
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        post_event(LIKE_ADDED, post.id, username=request.user, author=post.username)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=["delete"])
@@ -241,6 +293,7 @@ class LikeViewSet(ModelViewSet):
         try:
             like = Like.objects.get(post=id, username=request.user)
             like.delete()
+            post_event(LIKE_REMOVED, id, username=request.user, author=post_author(id))
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Like.DoesNotExist:
             return Response(
@@ -253,7 +306,6 @@ class CommentViewSet(ModelViewSet):
     ViewSet for handling comments on posts.
     """
 
-    queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedCustom]
     pagination_class = CustomPagination
@@ -275,12 +327,15 @@ class CommentViewSet(ModelViewSet):
         Retrieve all comments for a specific post by post ID.
         """
         comments = Comment.objects.filter(post=post_id)
+        blocked = blocked_usernames(viewer(request))
+        if blocked:
+            comments = comments.filter(username__nin=list(blocked))
         page = self.paginate_queryset(comments)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(embed_authors(serializer.data))
         serializer = self.get_serializer(comments, many=True)
-        return Response(serializer.data)
+        return Response(embed_authors(serializer.data))
 
     @action(detail=False, methods=["post"], url_path=r"add/(?P<post_id>[^/.]+)")
     def create_comment(self, request, post_id=None):
@@ -302,15 +357,19 @@ class CommentViewSet(ModelViewSet):
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        post_event(
+            COMMENT_ADDED, post.id,
+            comment_id=str(serializer.instance.id), username=request.user, author=post.username,
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=["delete"], url_path="delete")
-    def delete_comment(self, request, pk=None):
+    def delete_comment(self, request, id=None):
         """
         Delete a comment. Only the comment creator can delete their own comments.
         """
         try:
-            comment = Comment.objects.get(id=pk)
+            comment = Comment.objects.get(id=id)
 
             # Check if the requesting user is the comment creator
             if str(comment.username) != str(request.user):
@@ -319,7 +378,13 @@ class CommentViewSet(ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
+            # The raw reference, without loading the post
+            post_id = comment.to_mongo()["post"]
             comment.delete()
+            post_event(
+                COMMENT_REMOVED, post_id,
+                comment_id=id, username=comment.username, author=post_author(post_id),
+            )
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         except Comment.DoesNotExist:
@@ -339,11 +404,13 @@ class HashtagViewSet(ModelViewSet):
     ViewSet for handling hashtags and their associated posts.
     """
 
-    queryset = Hashtag.objects.all()
     serializer_class = HashtagSerializer
     permission_classes = []
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        return Hashtag.objects.all()
+
     def list(self, request, *args, **kwargs):
         """Get all hashtags with Redis caching"""
         # Try to get hashtags from cache
@@ -368,12 +435,20 @@ class HashtagViewSet(ModelViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         """Get posts for a specific hashtag with Redis caching"""
-        tag = kwargs.get("pk")
+        tag = kwargs.get(self.lookup_field)
+
+        # The cached page is shared by every viewer, so blocks are applied per request
+        blocked = blocked_usernames(viewer(request))
 
         # Try to get from cache
         cached_data = cache.get(f"hashtag_{tag}")
         if cached_data is not None:
-            return Response(cached_data)
+            return Response(
+                {
+                    **cached_data,
+                    "posts": embed_authors(filter_posts(cached_data["posts"], blocked)),
+                }
+            )
 
         # If not in cache, get from database
         hashtag = Hashtag.objects(tag=tag).first()
@@ -389,7 +464,12 @@ class HashtagViewSet(ModelViewSet):
 
         # Cache the results
         cache.set(f"hashtag_{tag}", response_data, timeout=900)  # Cache for 15 minutes
-        return Response(response_data)
+        return Response(
+            {
+                **response_data,
+                "posts": embed_authors(filter_posts(response_data["posts"], blocked)),
+            }
+        )
 
 
 class HashtagGeneratorViewSet(GenericViewSet):
@@ -405,6 +485,9 @@ class HashtagGeneratorViewSet(GenericViewSet):
 
     def _generate_hashtags(self, text=None, image=None):
         """Generate hashtags using OpenAI"""
+        # Imported on first use, the SDK takes most of a second to load
+        import openai
+
         openai.api_key = os.getenv("OPENAI_API_KEY")
 
         if text and not image:
@@ -489,7 +572,7 @@ class HashtagGeneratorViewSet(GenericViewSet):
             return Response({"hashtags": cached_hashtags})
 
         # If not in cache, get the predefined list
-        hashtags = ["America", "USA", "TrumpWon", "ElonMusk", "Twitter"]
+        hashtags = PREDEFINED_HASHTAGS
 
         # Cache the results
         cache.set("predefined_hashtags", hashtags, timeout=3600)  # Cache for 1 hour
@@ -519,3 +602,20 @@ class HealthCheckView(APIView):
                 {"status": "unhealthy", "error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class ReadinessView(APIView):
+    """
+    Readiness endpoint for the post service.
+    Reports ready only once this worker's connections and caches are warm.
+    """
+
+    permission_classes = []
+
+    def get(self, request):
+        if warm_up():
+            return Response({"status": "ready"})
+        return Response(
+            {"status": "warming up"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
@@ -0,0 +1,76 @@
+"""
+Per-process connection lifecycle for the production server.
+
+Clients are created lazily on first use. The app is imported once in the
+gunicorn master and then forked, so anything the master did open is discarded
+in each worker before use. Workers then open their own MongoDB and Redis
+connections and prime the caches before reporting ready.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from mongoengine import disconnect, register_connection
+from mongoengine.connection import DEFAULT_CONNECTION_NAME
+
+from .events import publisher
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_lock = threading.Lock()
+
+
+def reset_connections():
+    """Drop clients inherited from the parent process. Called right after fork."""
+    _ready.clear()
+    close_connections()
+
+
+def close_connections():
+    """Close the MongoDB client and cache connections. The next query reconnects."""
+    # disconnect() also forgets the connection settings, so register them again
+    disconnect(alias=DEFAULT_CONNECTION_NAME)
+    register_connection(
+        DEFAULT_CONNECTION_NAME,
+        db=settings.MONGO_DB_NAME,
+        host=settings.MONGO_HOST,
+        connect=False,
+    )
+    for backend in caches.all(initialized_only=True):
+        backend.close()
+    if settings.ASYNC_READ_PATH:
+        from .async_db import close_clients
+
+        close_clients()
+    publisher.close()
+
+
+def warm_up():
+    """
+    Open the MongoDB and Redis connections and prime the shared caches.
+    Returns True once the process is ready to serve traffic.
+    """
+    if _ready.is_set():
+        return True
+    with _lock:
+        if _ready.is_set():
+            return True
+        try:
+            from .models import Post
+            from .views import PREDEFINED_HASHTAGS
+
+            Post.objects.first()
+            if cache.get("predefined_hashtags") is None:
+                cache.set("predefined_hashtags", PREDEFINED_HASHTAGS, timeout=3600)
+        except Exception as e:
+            logger.error(f"Warm-up failed: {str(e)}")
+            return False
+        _ready.set()
+        logger.info("Warm-up complete, worker is ready")
+        return True
+
+
+def is_ready():
+    return _ready.is_set()
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -63,6 +63,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "user.metrics.MetricsMiddleware",  # Outermost, so it times the whole stack
+    "user.profiling.QueryProfilerMiddleware",  # Only active with QUERY_PROFILING
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -108,11 +110,59 @@ DATABASES = {
     }
 }
 
+# Redis cache, shared with post-service; KEY_PREFIX keeps the two apart
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": config("REDIS_URL", default="redis://redis:6379/0"),
+        "KEY_PREFIX": "user",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # Charges Redis time to the current request, see user.metrics
+            "CONNECTION_POOL_CLASS": "user.metrics.InstrumentedConnectionPool",
+        },
+    }
+}
+
+# Seconds a follower/following/blocked count is cached; relationship changes overwrite it
+DEGREE_CACHE_TTL = config("DEGREE_CACHE_TTL", default=3600, cast=int)
+# Seconds a viewer's follow/block status with another user is cached
+RELATIONSHIP_CACHE_TTL = config("RELATIONSHIP_CACHE_TTL", default=60, cast=int)
+
+# "Who to follow": list length, how long a list is cached, how many of a user's
+# follows are expanded, the on-demand time budget in seconds, and how many days
+# a recent login keeps boosting a candidate
+RECOMMENDATIONS_SIZE = config("RECOMMENDATIONS_SIZE", default=20, cast=int)
+RECOMMENDATIONS_CACHE_TTL = config("RECOMMENDATIONS_CACHE_TTL", default=6 * 3600, cast=int)
+RECOMMENDATIONS_MAX_FRIENDS = config("RECOMMENDATIONS_MAX_FRIENDS", default=200, cast=int)
+RECOMMENDATIONS_TIMEOUT = config("RECOMMENDATIONS_TIMEOUT", default=0.5, cast=float)
+RECENT_ACTIVITY_DAYS = config("RECENT_ACTIVITY_DAYS", default=30, cast=int)
+
 # for local environment
 
 NEO4J_URI = config("NEO4J_URI")
 NEO4J_USERNAME = config("NEO4J_USERNAME")
 NEO4J_PASSWORD = config("NEO4J_PASSWORD")
+# None uses the server's default database. With a neo4j:// URI reads are routed to replicas
+NEO4J_DATABASE = config("NEO4J_DATABASE", default=None)
+NEO4J_MAX_CONNECTION_POOL_SIZE = config("NEO4J_MAX_CONNECTION_POOL_SIZE", default=50, cast=int)
+# Seconds a request waits for a pooled connection before failing
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = config(
+    "NEO4J_CONNECTION_ACQUISITION_TIMEOUT", default=5.0, cast=float
+)
+# Seconds before a connection is retired, kept below any proxy or firewall idle timeout
+NEO4J_MAX_CONNECTION_LIFETIME = config("NEO4J_MAX_CONNECTION_LIFETIME", default=900, cast=int)
+
+KAFKA_BOOTSTRAP_SERVERS = config("KAFKA_BOOTSTRAP_SERVERS", default="kafka:9092", cast=Csv())
+# The producer waits up to KAFKA_LINGER_MS to fill batches of KAFKA_BATCH_SIZE bytes
+KAFKA_LINGER_MS = config("KAFKA_LINGER_MS", default=20, cast=int)
+KAFKA_BATCH_SIZE = config("KAFKA_BATCH_SIZE", default=65536, cast=int)
+KAFKA_COMPRESSION = config("KAFKA_COMPRESSION", default="gzip")
+
+# Profile the MySQL and Neo4j queries of every request: adds a Server-Timing header
+# and logs query shapes repeated N_PLUS_ONE_THRESHOLD times or more
+QUERY_PROFILING = config("QUERY_PROFILING", default=False, cast=bool)
+N_PLUS_ONE_THRESHOLD = config("N_PLUS_ONE_THRESHOLD", default=5, cast=int)
 
 # DATABASES = {
 #     'default': {
@@ -145,10 +195,22 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = "user.CustomUser"
 
+# Render and parse JSON with orjson (falls back to the stdlib when disabled)
+USE_ORJSON = config("USE_ORJSON", default=True, cast=bool)
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ]
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "drf_orjson.renderers.ORJSONRenderer" if USE_ORJSON else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "drf_orjson.parsers.ORJSONParser" if USE_ORJSON else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SIMPLE_JWT = {
@@ -181,6 +243,9 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Origin browsers reach this service at; avatar URLs handed to other services are absolute
+PUBLIC_URL = config("PUBLIC_URL", default="http://localhost:8000")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
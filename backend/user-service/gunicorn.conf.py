@@ -0,0 +1,86 @@
+"""
+Gunicorn configuration for user-service.
+
+    gunicorn -c gunicorn.conf.py
+
+The Django app is imported once in the master (preload_app) and forked into
+workers. No client is opened at import time; every worker drops anything it
+inherited, warms its own MySQL and Neo4j connections before it accepts
+requests and closes them when it exits.
+
+Environment:
+    GUNICORN_WORKER_CLASS  sync | gthread | uvicorn.workers.UvicornWorker (default: sync)
+    WEB_CONCURRENCY        number of worker processes (default: 2 * CPUs + 1)
+    GUNICORN_THREADS       threads per gthread worker (default: 4)
+    GUNICORN_MAX_REQUESTS  recycle a worker after this many requests, 0 disables (default: 1000)
+    GUNICORN_MAX_REQUESTS_JITTER  random extra requests before recycling (default: 100)
+    GUNICORN_TIMEOUT       seconds before a silent worker is killed (default: 30)
+    PROMETHEUS_MULTIPROC_DIR  where workers write metrics for /metrics (default: /tmp/prometheus)
+"""
+import multiprocessing
+import os
+import shutil
+import time
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4 if worker_class == "gthread" else 1))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# ASGI workers serve config.asgi, the rest config.wsgi
+wsgi_app = "config.asgi:application" if "uvicorn" in worker_class else "config.wsgi:application"
+preload_app = True
+
+# Must be set before prometheus_client is imported by the app
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Metric files left by a previous run would be summed into the new one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def when_ready(server):
+    # Import the URLconf, views and serializers once in the master so workers inherit them
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+
+def post_fork(server, worker):
+    from user.warmup import reset_connections
+
+    worker.boot_started = time.monotonic()
+    reset_connections()
+
+
+def post_worker_init(worker):
+    from user.warmup import warm_up
+
+    if not warm_up():
+        worker.log.warning("Worker started before its connections were warm, /ready/ will retry")
+    worker.log.info(
+        "Worker %s booted in %.3fs", worker.pid, time.monotonic() - worker.boot_started
+    )
+
+
+def worker_exit(server, worker):
+    from user.warmup import close_connections
+
+    close_connections()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import CustomUser
+from .models import CustomUser, OutboxEvent
 
 # Register your models here.
 
-admin.site.register(CustomUser)
\ No newline at end of file
+admin.site.register(CustomUser)
+admin.site.register(OutboxEvent)
@@ -1,6 +1,14 @@
+import atexit
+
 from django.apps import AppConfig
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from .warmup import close_connections
+
+        # Clients are opened lazily; close whatever this process opened when it exits
+        atexit.register(close_connections)
@@ -0,0 +1,27 @@
+"""
+The Kafka producer user-service publishes its events with.
+
+Requests never talk to Kafka: they record events in the outbox, and the
+`relay_outbox` command publishes them through one long-lived producer that
+batches (KAFKA_LINGER_MS, KAFKA_BATCH_SIZE) and compresses messages. Values
+are encoded with their topic's schema, see `eventschema`.
+"""
+from django.conf import settings
+
+
+def create_producer():
+    from eventschema.serializers import EventSerializer
+    from kafka import KafkaProducer
+
+    return KafkaProducer(
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+        acks="all",
+        linger_ms=settings.KAFKA_LINGER_MS,
+        batch_size=settings.KAFKA_BATCH_SIZE,
+        compression_type=settings.KAFKA_COMPRESSION,
+        retries=3,
+        # More in flight would let a retried batch land after the next one
+        max_in_flight_requests_per_connection=1,
+        key_serializer=lambda k: str(k).encode("utf-8"),
+        value_serializer=EventSerializer(),
+    )
@@ -0,0 +1,63 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from drf_orjson import ORJSONParser, ORJSONRenderer
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+def followers_list(size):
+    """Build a payload shaped like a `FollowersListView` response."""
+    return [
+        {
+            "id": i,
+            "username": f"user{i}",
+            "first_name": "First",
+            "last_name": "Last",
+            "profile_image": f"profile_images/user{i}.jpg",
+        }
+        for i in range(size)
+    ]
+
+
+def best_of(func, iterations, repeat=5):
+    """Return the best wall time, in seconds, of `repeat` runs of `iterations` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the stdlib and orjson JSON renderers/parsers on followers lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--followers", type=int, nargs="+", default=[100, 10000])
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        for size in options["followers"]:
+            data = followers_list(size)
+            body = JSONRenderer().render(data)
+            if ORJSONRenderer().render(data) != body:
+                self.stderr.write(self.style.ERROR(f"followers={size}: renderer output differs"))
+
+            cases = [
+                ("render", lambda: JSONRenderer().render(data), lambda: ORJSONRenderer().render(data)),
+                ("parse", lambda: JSONParser().parse(io.BytesIO(body)),
+                 lambda: ORJSONParser().parse(io.BytesIO(body))),
+            ]
+            for name, stdlib, fast in cases:
+                slow_time = best_of(stdlib, iterations)
+                fast_time = best_of(fast, iterations)
+                self.stdout.write(
+                    f"followers={size:<6} {name:<6} ({len(body)} bytes): "
+                    f"json {slow_time / iterations * 1e6:9.1f}us  "
+                    f"orjson {fast_time / iterations * 1e6:9.1f}us  "
+                    f"speedup x{slow_time / fast_time:.1f}"
+                )
@@ -0,0 +1,123 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.utils.neo4j_conn import neo4j_connection
+
+LABEL = "BenchUser"
+INDEX = "bench_user_id"
+
+# The follow and followers/following queries from user/views.py, on the benchmark label
+QUERIES = {
+    "follow check": """
+        MATCH (u1:BenchUser {id: $user_id}), (u2:BenchUser {id: $other_id})
+        OPTIONAL MATCH (u1)-[block:BLOCK]-(u2)
+        WITH u1, u2, count(block) AS blocks
+        OPTIONAL MATCH (u1)-[existing:FOLLOW]->(u2)
+        RETURN blocks, count(existing) AS follows
+    """,
+    "following": """
+        MATCH (u1:BenchUser {id: $user_id})-[:FOLLOW]->(u2:BenchUser)
+        RETURN u2
+    """,
+    "followers": """
+        MATCH (u1:BenchUser)-[:FOLLOW]->(u2:BenchUser {id: $user_id})
+        RETURN u1
+    """,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the follow and followers queries on a generated :BenchUser graph "
+        "with and without an index on id. Does not touch :User."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--degree", type=int, default=10, help="Follows per user.")
+        parser.add_argument("--samples", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--keep", action="store_true", help="Keep the generated graph.")
+
+    def handle(self, *args, **options):
+        users = options["users"]
+        self.drop_graph()
+        # Generating edges looks users up by id, so build the graph with the index
+        self.create_index()
+        self.generate(users, options["degree"], options["batch_size"])
+
+        rng = random.Random(42)
+        params = [
+            {"user_id": rng.randrange(users), "other_id": rng.randrange(users)}
+            for _ in range(options["samples"])
+        ]
+        with_index = self.measure(params)
+        self.drop_index()
+        without_index = self.measure(params)
+
+        self.stdout.write(f"{'query':<14}{'indexed p50':>14}{'p95':>10}{'label scan p50':>18}{'p95':>10}")
+        for name in QUERIES:
+            fast, slow = with_index[name], without_index[name]
+            self.stdout.write(
+                f"{name:<14}{fast[0]:>12.2f}ms{fast[1]:>8.2f}ms{slow[0]:>16.2f}ms{slow[1]:>8.2f}ms"
+            )
+
+        if not options["keep"]:
+            self.drop_graph()
+
+    def generate(self, users, degree, batch_size):
+        start = time.perf_counter()
+        for first in range(0, users, batch_size):
+            neo4j_connection.write(
+                f"UNWIND range($first, $last) AS i CREATE (:{LABEL} {{id: i, username: 'bench' + i}})",
+                {"first": first, "last": min(first + batch_size, users) - 1},
+            )
+        per_batch = max(1, batch_size // degree)
+        for first in range(0, users, per_batch):
+            neo4j_connection.write(
+                f"""
+                UNWIND range($first, $last) AS i
+                MATCH (a:{LABEL} {{id: i}})
+                UNWIND range(1, $degree) AS k
+                MATCH (b:{LABEL} {{id: toInteger(rand() * $users)}})
+                CREATE (a)-[:FOLLOW]->(b)
+                """,
+                {"first": first, "last": min(first + per_batch, users) - 1,
+                 "degree": degree, "users": users},
+            )
+        self.stdout.write(
+            f"Generated {users} users and {users * degree} follows in {time.perf_counter() - start:.1f}s"
+        )
+
+    def measure(self, params):
+        """Return (p50, p95) in milliseconds for each query."""
+        results = {}
+        for name, query in QUERIES.items():
+            neo4j_connection.read(query, params[0])  # warm the plan cache
+            timings = []
+            for parameters in params:
+                start = time.perf_counter()
+                neo4j_connection.read(query, parameters)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = (
+                statistics.median(timings),
+                timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            )
+        return results
+
+    def create_index(self):
+        neo4j_connection.write(f"CREATE INDEX {INDEX} IF NOT EXISTS FOR (n:{LABEL}) ON (n.id)")
+        neo4j_connection.query("CALL db.awaitIndexes(300)")
+
+    def drop_index(self):
+        neo4j_connection.write(f"DROP INDEX {INDEX} IF EXISTS")
+
+    def drop_graph(self):
+        neo4j_connection.query(
+            f"MATCH (n:{LABEL}) CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 10000 ROWS"
+        )
+        self.drop_index()
@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from neo4j.exceptions import ServiceUnavailable
+
+from user.utils.neo4j_conn import neo4j_connection
+
+# Every lookup in the views matches :User by id or username. Uniqueness
+# constraints are backed by a range index, so these also serve as the indexes.
+CONSTRAINTS = [
+    ("user_id_unique", "User", "id"),
+    ("user_username_unique", "User", "username"),
+]
+
+
+def create_constraint(name, label, prop):
+    neo4j_connection.write(
+        f"CREATE CONSTRAINT {name} IF NOT EXISTS "
+        f"FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+    )
+
+
+def online_indexes():
+    """Map (label, property) to the state of every single-property node index."""
+    records = neo4j_connection.query(
+        "SHOW INDEXES YIELD labelsOrTypes, properties, state, entityType "
+        "WHERE entityType = 'NODE' RETURN labelsOrTypes, properties, state"
+    )
+    return {
+        (record["labelsOrTypes"][0], record["properties"][0]): record["state"]
+        for record in records
+        if record["labelsOrTypes"] and record["properties"] and len(record["properties"]) == 1
+    }
+
+
+class Command(BaseCommand):
+    help = "Create the Neo4j constraints and indexes on :User and verify they are online. Safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout", type=int, default=60,
+            help="Seconds to wait for Neo4j to accept connections and for indexes to come online.",
+        )
+
+    def handle(self, *args, **options):
+        deadline = time.monotonic() + options["timeout"]
+        self.wait_for_neo4j(deadline)
+
+        for name, label, prop in CONSTRAINTS:
+            try:
+                create_constraint(name, label, prop)
+            except Exception as e:
+                raise CommandError(
+                    f"Could not create {name} on :{label}({prop}), "
+                    f"check for duplicate values: {str(e)}"
+                )
+
+        while True:
+            states = online_indexes()
+            pending = [
+                (label, prop) for _, label, prop in CONSTRAINTS
+                if states.get((label, prop)) != "ONLINE"
+            ]
+            if not pending:
+                break
+            if time.monotonic() > deadline:
+                missing = ", ".join(
+                    f":{label}({prop}) {states.get((label, prop), 'missing')}"
+                    for label, prop in pending
+                )
+                raise CommandError(f"Indexes not online: {missing}")
+            time.sleep(1)
+
+        for name, label, prop in CONSTRAINTS:
+            self.stdout.write(f"{name}: :{label}({prop}) ONLINE")
+        self.stdout.write(self.style.SUCCESS("Neo4j schema is up to date"))
+
+    def wait_for_neo4j(self, deadline):
+        while True:
+            try:
+                neo4j_connection.verify_connectivity()
+                return
+            except ServiceUnavailable as e:
+                if time.monotonic() > deadline:
+                    raise CommandError(f"Neo4j is unavailable: {str(e)}")
+                self.stdout.write("Waiting for Neo4j...")
+                time.sleep(2)
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user.models import CustomUser
+from user.utils.recommendations import find_candidates, rank, store_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute and cache the who-to-follow list of every user who logged in "
+        "recently, so their requests never run the traversal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--active-days", type=int, default=7,
+            help="Users who logged in within this many days count as active.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Seconds between passes. Runs once when 0.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.precompute(options["active_days"], options["batch_size"])
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def precompute(self, active_days, batch_size):
+        start = time.perf_counter()
+        active = CustomUser.objects.filter(
+            last_login__gte=timezone.now() - timedelta(days=active_days)
+        ).order_by("id")
+        users = 0
+        cursor = 0
+        while True:
+            batch = list(active.filter(id__gt=cursor).values_list("id", flat=True)[:batch_size])
+            if not batch:
+                break
+            rankings = rank(find_candidates(batch))
+            # Users missing from the graph still get an empty list cached
+            store_recommendations({user_id: rankings.get(user_id, []) for user_id in batch})
+            users += len(batch)
+            cursor = batch[-1]
+
+        self.stdout.write(
+            f"Precomputed recommendations for {users} users in {time.perf_counter() - start:.1f}s"
+        )
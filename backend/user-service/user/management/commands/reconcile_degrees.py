@@ -0,0 +1,91 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from user.utils.degrees import PATTERNS, PROPERTIES, cache_key
+from user.utils.neo4j_conn import neo4j_connection
+
+# Counts every user's relationships in the degree store and rewrites the
+# counters that differ. Drifted users are write-locked and recounted before the
+# SET, so a follow committed meanwhile is not overwritten with a stale count.
+RECONCILE = """
+    MATCH (u:User) WHERE u.id > $cursor
+    WITH u ORDER BY u.id LIMIT $batch_size
+    WITH u, {counts}
+    WITH u, {counts_again}, {drifted} AS drifted
+    CALL {{
+        WITH u, drifted
+        WITH u WHERE drifted
+        SET {lock}
+        SET {recount}
+    }}
+    RETURN u.id AS id, drifted, {current}
+    ORDER BY id
+"""
+
+
+def reconcile_query():
+    kinds = list(PATTERNS)
+    return RECONCILE.format(
+        counts=", ".join(f"COUNT {{ {PATTERNS[kind]} }} AS {kind}" for kind in kinds),
+        counts_again=", ".join(kinds),
+        drifted=" OR ".join(
+            f"u.{PROPERTIES[kind]} IS NULL OR u.{PROPERTIES[kind]} <> {kind}" for kind in kinds
+        ),
+        lock=", ".join(f"u.{PROPERTIES[kind]} = coalesce(u.{PROPERTIES[kind]}, 0)" for kind in kinds),
+        recount=", ".join(f"u.{PROPERTIES[kind]} = COUNT {{ {PATTERNS[kind]} }}" for kind in kinds),
+        current=", ".join(f"u.{PROPERTIES[kind]} AS {kind}" for kind in kinds),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every user's follower, following and blocked counters with the "
+        "Neo4j degree store and fix the counters and cache entries that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Seconds between passes. Runs once when 0.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.reconcile(options["batch_size"])
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def reconcile(self, batch_size):
+        query = reconcile_query()
+        checked = drifted = stale = 0
+        cursor = -1
+        while True:
+            records = neo4j_connection.write(
+                query, parameters={"cursor": cursor, "batch_size": batch_size}
+            )[0]
+            if not records:
+                break
+            checked += len(records)
+            drifted += sum(1 for record in records if record["drifted"])
+
+            # Only rewrite cache entries that exist and are wrong
+            counts = {
+                cache_key(record["id"], kind): record[kind]
+                for record in records for kind in PATTERNS
+            }
+            cached = cache.get_many(counts.keys())
+            wrong = {key: counts[key] for key, value in cached.items() if value != counts[key]}
+            if wrong:
+                cache.set_many(wrong, timeout=settings.DEGREE_CACHE_TTL)
+                stale += len(wrong)
+
+            cursor = records[-1]["id"]
+
+        self.stdout.write(
+            f"Checked {checked} users: fixed {drifted} counters and {stale} cache entries"
+        )
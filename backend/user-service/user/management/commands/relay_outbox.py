@@ -0,0 +1,63 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from prometheus_client import start_http_server
+
+from user.events import create_producer
+from user.models import OutboxEvent
+from user.outbox import observe_lag, relay
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply pending outbox events to Neo4j and publish them to Kafka, in "
+        "batches, then delete processed events older than --keep-days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Seconds between passes. Runs once when 0.",
+        )
+        parser.add_argument("--keep-days", type=int, default=7)
+        parser.add_argument(
+            "--max-attempts", type=int, default=10,
+            help="Tries before an event that keeps failing is parked.",
+        )
+        parser.add_argument(
+            "--metrics-port", type=int, default=None,
+            help="Serve the outbox lag metrics on this port.",
+        )
+
+    def handle(self, *args, **options):
+        if options["metrics_port"]:
+            start_http_server(options["metrics_port"])
+        producer = create_producer()
+        try:
+            while True:
+                relayed = self.drain(producer, options["batch_size"], options["max_attempts"])
+                self.purge(options["keep_days"])
+                if not options["interval"]:
+                    self.stdout.write(f"Relayed {relayed} outbox events")
+                    return
+                time.sleep(options["interval"])
+        finally:
+            producer.close()
+
+    def drain(self, producer, batch_size, max_attempts):
+        relayed = 0
+        while True:
+            processed = relay(producer, batch_size, max_attempts)
+            relayed += processed
+            # A short batch means the outbox is empty or a run failed
+            if processed < batch_size:
+                observe_lag()
+                return relayed
+
+    def purge(self, keep_days):
+        OutboxEvent.objects.filter(
+            processed_at__lt=timezone.now() - timedelta(days=keep_days)
+        ).delete()
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django_redis import get_redis_connection
+
+from user.utils.blocks import key
+from user.utils.neo4j_conn import neo4j_connection
+
+BLOCK_SETS = """
+    MATCH (u:User)-[:BLOCK]-(other:User)
+    RETURN u.username AS username, collect(DISTINCT other.username) AS blocked
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the blocks:<username> sets post-service filters feeds with from "
+        "the BLOCK relationships in Neo4j, and delete sets of users with no blocks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        redis = get_redis_connection("default")
+        written = set()
+        pipe = redis.pipeline()
+        for record in neo4j_connection.stream(BLOCK_SETS):
+            name = key(record["username"])
+            # Replaced inside MULTI, so readers never see a half-written set
+            pipe.delete(name)
+            pipe.sadd(name, *record["blocked"])
+            written.add(name)
+            if len(pipe) >= options["batch_size"] * 2:
+                pipe.execute()
+        pipe.execute()
+
+        stale = [
+            name for name in redis.scan_iter(match=key("*"), count=options["batch_size"])
+            if name.decode() not in written
+        ]
+        if stale:
+            redis.delete(*stale)
+
+        self.stdout.write(f"Wrote {len(written)} block sets, removed {len(stale)} stale ones")
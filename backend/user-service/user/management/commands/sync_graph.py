@@ -0,0 +1,128 @@
+import time
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from user.models import CustomUser
+from user.outbox import CREATE_USERS
+from user.utils.neo4j_conn import neo4j_connection
+
+# Seconds between progress lines within a phase
+REPORT_EVERY = 5
+
+# Follows across a block are skipped, as FollowUserView refuses them
+SYNC_FOLLOWS = """
+    UNWIND $rows AS row
+    MATCH (u1:User {id: row.follower_id}), (u2:User {id: row.followee_id})
+    WHERE NOT EXISTS { (u1)-[:BLOCK]-(u2) }
+    SET u1.following_count = coalesce(u1.following_count, 0),
+        u2.followers_count = coalesce(u2.followers_count, 0)
+    MERGE (u1)-[:FOLLOW]->(u2)
+    SET u1.following_count = COUNT { (u1)-[:FOLLOW]->() },
+        u2.followers_count = COUNT { (u2)<-[:FOLLOW]-() }
+"""
+
+# Like BlockUserView, a block removes the follows between the two users
+SYNC_BLOCKS = """
+    UNWIND $rows AS row
+    MATCH (u1:User {id: row.blocker_id}), (u2:User {id: row.blocked_id})
+    SET u1.blocked_count = coalesce(u1.blocked_count, 0),
+        u2.followers_count = coalesce(u2.followers_count, 0)
+    MERGE (u1)-[:BLOCK]->(u2)
+    WITH u1, u2
+    OPTIONAL MATCH (u1)-[follow:FOLLOW]-(u2)
+    DELETE follow
+    WITH DISTINCT u1, u2
+    SET u1.following_count = COUNT { (u1)-[:FOLLOW]->() },
+        u1.followers_count = COUNT { (u1)<-[:FOLLOW]-() },
+        u1.blocked_count = COUNT { (u1)-[:BLOCK]->() },
+        u2.following_count = COUNT { (u2)-[:FOLLOW]->() },
+        u2.followers_count = COUNT { (u2)<-[:FOLLOW]-() }
+"""
+
+
+def checkpoint_key(phase):
+    return f"sync_graph:{phase}"
+
+
+def users(after):
+    for user in (
+        CustomUser.objects.filter(id__gt=after).order_by("id")
+        .values("id", "username", "first_name", "last_name").iterator(chunk_size=2000)
+    ):
+        yield user["id"], {
+            "user_id": user["id"], "username": user["username"],
+            "first_name": user["first_name"], "last_name": user["last_name"],
+        }
+
+
+def follows(after):
+    # A row in `followers` puts the follower in to_customuser
+    for row_id, followee_id, follower_id in (
+        CustomUser.followers.through.objects.filter(id__gt=after).order_by("id")
+        .values_list("id", "from_customuser_id", "to_customuser_id").iterator(chunk_size=2000)
+    ):
+        yield row_id, {"follower_id": follower_id, "followee_id": followee_id}
+
+
+def blocks(after):
+    for row_id, blocker_id, blocked_id in (
+        CustomUser.blocked_users.through.objects.filter(id__gt=after).order_by("id")
+        .values_list("id", "from_customuser_id", "to_customuser_id").iterator(chunk_size=2000)
+    ):
+        yield row_id, {"blocker_id": blocker_id, "blocked_id": blocked_id}
+
+
+# Users first, so the edge phases find both ends
+PHASES = [
+    ("users", users, CREATE_USERS),
+    ("follows", follows, SYNC_FOLLOWS),
+    ("blocks", blocks, SYNC_BLOCKS),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert every MySQL user into Neo4j and add the follows and blocks stored "
+        "in MySQL as graph edges. Edges only in Neo4j are kept. Run "
+        "reconcile_degrees and sync_blocked_pairs afterwards to refresh caches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--resume", action="store_true",
+            help="Continue after the last batch a previous run completed.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["resume"]:
+            cache.delete_many([checkpoint_key(phase) for phase, _, _ in PHASES])
+        for phase, rows, query in PHASES:
+            self.sync(phase, rows, query, options["batch_size"])
+        cache.delete_many([checkpoint_key(phase) for phase, _, _ in PHASES])
+
+    def sync(self, phase, rows, query, batch_size):
+        after = cache.get(checkpoint_key(phase), 0)
+        stream = rows(after)
+        synced = 0
+        start = reported = time.monotonic()
+        while True:
+            batch = list(islice(stream, batch_size))
+            if not batch:
+                break
+            neo4j_connection.write(query, parameters={"rows": [row for _, row in batch]})
+            # Saved once Neo4j has the batch, so --resume never skips rows
+            cache.set(checkpoint_key(phase), batch[-1][0], timeout=None)
+            synced += len(batch)
+
+            now = time.monotonic()
+            if now - reported >= REPORT_EVERY:
+                self.stdout.write(f"{phase}: {synced} rows, {synced / (now - start):.0f} rows/s")
+                reported = now
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            f"Synced {synced} {phase} in {elapsed:.1f}s ({synced / elapsed if elapsed else 0:.0f} rows/s)"
+        )
@@ -0,0 +1,182 @@
+"""
+Prometheus metrics for user-service.
+
+`MetricsMiddleware` records request counts, latency and in-flight requests per
+route, plus the time each request spent waiting on MySQL, Neo4j and Redis. Datastore
+time is accumulated in a context variable by the hooks below and observed once
+when the response is returned.
+
+Under gunicorn, set `PROMETHEUS_MULTIPROC_DIR` so that `/metrics` aggregates
+every worker instead of whichever one answered the scrape.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from redis.connection import Connection, ConnectionPool
+
+SERVICE = "user-service"
+
+BACKENDS = ("mysql", "neo4j", "redis")
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "Requests handled, by route and status code",
+    ["service", "method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route",
+    ["service", "method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled",
+    ["service", "method"],
+    multiprocess_mode="livesum",
+)
+BACKEND_TIME = Histogram(
+    "http_request_backend_seconds",
+    "Time a request spent waiting on a backend, by route",
+    ["service", "backend", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+NEO4J_TRANSACTION_WAIT = Histogram(
+    "neo4j_transaction_wait_seconds",
+    "Time from asking for a Neo4j transaction until it starts: connection pool wait plus BEGIN",
+    ["service", "access_mode"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+KAFKA_MESSAGES = Counter(
+    "kafka_messages_total",
+    "Events the outbox relay handed to Kafka, by topic and outcome: delivered or failed",
+    ["service", "topic", "outcome"],
+)
+OUTBOX_EVENTS = Counter(
+    "outbox_events_total",
+    "Outbox events handled by the relay, by kind and outcome: relayed, failed or parked",
+    ["service", "kind", "outcome"],
+)
+OUTBOX_PENDING = Gauge(
+    "outbox_pending_events",
+    "Outbox events not relayed yet, as of the relay's last pass",
+    ["service"],
+    multiprocess_mode="max",
+)
+OUTBOX_FAILED = Gauge(
+    "outbox_failed_events",
+    "Outbox events parked after failing too often, as of the relay's last pass",
+    ["service"],
+    multiprocess_mode="max",
+)
+OUTBOX_LAG = Gauge(
+    "outbox_lag_seconds",
+    "Age of the oldest outbox event not relayed yet, as of the relay's last pass",
+    ["service"],
+    multiprocess_mode="max",
+)
+
+# Seconds spent per backend by the current request, None outside a request
+_backend_time = ContextVar("backend_time", default=None)
+
+
+def add_backend_time(backend, seconds):
+    timings = _backend_time.get()
+    if timings is not None:
+        timings[backend] += seconds
+
+
+@contextmanager
+def track(backend):
+    """Charge the time spent in the block to `backend` for the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_backend_time(backend, time.perf_counter() - start)
+
+
+def mysql_wrapper(execute, sql, params, many, context):
+    with track("mysql"):
+        return execute(sql, params, many, context)
+
+
+class InstrumentedRedisConnection(Connection):
+    """Redis connection that charges socket time to the current request."""
+
+    def send_packed_command(self, command, check_health=True):
+        with track("redis"):
+            return super().send_packed_command(command, check_health)
+
+    def read_response(self, *args, **kwargs):
+        with track("redis"):
+            return super().read_response(*args, **kwargs)
+
+
+class InstrumentedConnectionPool(ConnectionPool):
+    """Pool for django-redis' `CONNECTION_POOL_CLASS` that hands out instrumented connections."""
+
+    def __init__(self, connection_class=InstrumentedRedisConnection, **kwargs):
+        super().__init__(connection_class=connection_class, **kwargs)
+
+
+def get_route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.route if match is not None else "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Records per-route request metrics. Kept synchronous so the MySQL wrapper is
+    installed on the same thread-local connection the view uses.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        REQUESTS_IN_PROGRESS.labels(SERVICE, request.method).inc()
+        timings = dict.fromkeys(BACKENDS, 0.0)
+        token = _backend_time.set(timings)
+        start = time.perf_counter()
+        response = None
+        try:
+            with connections["default"].execute_wrapper(mysql_wrapper):
+                response = self.get_response(request)
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            _backend_time.reset(token)
+            REQUESTS_IN_PROGRESS.labels(SERVICE, request.method).dec()
+
+            route = get_route(request)
+            status_code = response.status_code if response is not None else 500
+            REQUEST_COUNT.labels(SERVICE, request.method, route, status_code).inc()
+            REQUEST_LATENCY.labels(SERVICE, request.method, route).observe(elapsed)
+            for backend, seconds in timings.items():
+                if seconds:
+                    BACKEND_TIME.labels(SERVICE, backend, route).observe(seconds)
+
+
+def metrics_view(request):
+    """Expose the metrics in the Prometheus text format."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
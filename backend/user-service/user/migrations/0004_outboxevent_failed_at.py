@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
@@ -42,3 +44,23 @@ class CustomUser(AbstractUser):
     def is_blocked(self, user):
         """Check if the user has blocked another user"""
         return self.blocked_users.filter(id=user.id).exists()
+
+
+class OutboxEvent(models.Model):
+    """A Neo4j and Kafka write saved in the transaction of the MySQL change it belongs to. See user/outbox.py."""
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField()
+    # Sent as a Kafka header; kafka-consumer uses it to send one welcome email per signup
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    # Set when the relay gave up on the event; it is then skipped
+    failed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['processed_at', 'id'], name='outbox_pending_idx')]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
@@ -0,0 +1,228 @@
+"""
+Transactional outbox for the Neo4j and Kafka side of MySQL changes.
+
+Views call `record()` inside the `transaction.atomic()` block that makes the
+MySQL change, so the event is saved if and only if the change commits. The
+`relay_outbox` command then drains pending events in id order. Each run of
+events of the same kind becomes one `UNWIND` statement in Neo4j. Next the
+events are published to Kafka, with their idempotency key in a header, and
+only then marked processed. Handlers are idempotent, so events relayed again
+after a crash change nothing in the graph. Events that keep failing are parked
+with `failed_at` and left for an operator, see `relay`.
+
+Follows and blocks are still written to Neo4j in the request. A follow edge
+records when it was made, and an unfollow only deletes an edge made before the
+unfollow was recorded, so relaying an unfollow late cannot undo a follow that
+came after it.
+"""
+import logging
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from .metrics import KAFKA_MESSAGES, OUTBOX_EVENTS, OUTBOX_FAILED, OUTBOX_LAG, OUTBOX_PENDING, SERVICE
+from .models import CustomUser, OutboxEvent
+from .utils.degrees import FOLLOWERS, FOLLOWING, store_degrees
+from .utils.neo4j_conn import neo4j_connection
+from .utils.relationships import invalidate_relationship
+
+logger = logging.getLogger(__name__)
+
+USER_CREATED = "user_created"
+UNFOLLOW = "unfollow"
+
+# Seconds to wait for Kafka to acknowledge a batch
+SEND_TIMEOUT = 30
+
+CREATE_USERS = """
+    UNWIND $rows AS row
+    MERGE (u:User {id: row.user_id})
+    SET u.username = row.username, u.first_name = row.first_name, u.last_name = row.last_name
+"""
+
+# Same locking and recount as the follow statement in views.py, once per row.
+# Edges without `followed_at` predate it and are always deleted.
+UNFOLLOW_USERS = """
+    UNWIND $rows AS row
+    MATCH (u1:User {id: row.follower_id}), (u2:User {id: row.followee_id})
+    SET u1.following_count = coalesce(u1.following_count, 0),
+        u2.followers_count = coalesce(u2.followers_count, 0)
+    WITH row, u1, u2
+    OPTIONAL MATCH (u1)-[r:FOLLOW]->(u2)
+    WHERE r.followed_at IS NULL OR r.followed_at < row.recorded_at
+    DELETE r
+    WITH DISTINCT row, u1, u2
+    SET u1.following_count = COUNT { (u1)-[:FOLLOW]->() },
+        u2.followers_count = COUNT { (u2)<-[:FOLLOW]-() }
+    RETURN row.follower_id AS follower_id, row.follower AS follower,
+           row.followee_id AS followee_id, row.followee AS followee,
+           u1.following_count AS following, u2.followers_count AS followers
+"""
+
+
+def record(kind, payload):
+    """Save an event for the relay. Call inside the transaction of the change it describes."""
+    return OutboxEvent.objects.create(kind=kind, payload=payload)
+
+
+def user_node(user):
+    """The properties of `user`'s :User node, as CREATE_USERS sets them."""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+    }
+
+
+def handler_rows(events):
+    """The rows handed to a Neo4j handler: each payload plus when it was recorded."""
+    return [{**event.payload, "recorded_at": event.created_at.timestamp()} for event in events]
+
+
+def apply_user_created(rows):
+    neo4j_connection.write(CREATE_USERS, parameters={"rows": rows})
+
+
+def apply_unfollow(rows):
+    records = neo4j_connection.write(UNFOLLOW_USERS, parameters={"rows": rows})[0]
+    for record in records:
+        store_degrees(record["follower_id"], {FOLLOWING: record["following"]})
+        store_degrees(record["followee_id"], {FOLLOWERS: record["followers"]})
+        invalidate_relationship(
+            CustomUser(id=record["follower_id"], username=record["follower"]),
+            CustomUser(id=record["followee_id"], username=record["followee"]),
+        )
+
+
+def apply_pending_unfollows(follower, followee):
+    """
+    Apply the unfollows of `followee` by `follower` that the relay has not
+    reached yet, so that following again right away is not refused as a
+    duplicate. The relay applies them once more later, which leaves the new
+    follow alone as it was made after them.
+    """
+    events = OutboxEvent.objects.filter(
+        kind=UNFOLLOW,
+        processed_at__isnull=True,
+        failed_at__isnull=True,
+        payload__follower_id=follower.id,
+        payload__followee_id=followee.id,
+    ).order_by("id")
+    rows = handler_rows(events)
+    if rows:
+        apply_unfollow(rows)
+
+
+# kind: (Neo4j handler, Kafka topic, payload field used as the message key)
+HANDLERS = {
+    USER_CREATED: (apply_user_created, "user_signup", "user_id"),
+    UNFOLLOW: (apply_unfollow, "user_unfollowed", "follower_id"),
+}
+
+
+def publish(producer, kind, events):
+    """Send `events` and wait until Kafka has them all; the producer retries failed sends itself."""
+    _, topic, key = HANDLERS[kind]
+    try:
+        futures = [
+            producer.send(
+                topic,
+                value=event.payload,
+                key=event.payload[key],
+                headers=[("idempotency_key", str(event.idempotency_key).encode())],
+            )
+            for event in events
+        ]
+        producer.flush(SEND_TIMEOUT)
+        for future in futures:
+            future.get(SEND_TIMEOUT)
+    except Exception:
+        KAFKA_MESSAGES.labels(SERVICE, topic, "failed").inc(len(events))
+        raise
+    KAFKA_MESSAGES.labels(SERVICE, topic, "delivered").inc(len(events))
+
+
+def is_transient(error):
+    """True for outages that fail every event alike; they never park an event."""
+    from kafka.errors import KafkaError, KafkaTimeoutError
+
+    if isinstance(error, (ServiceUnavailable, SessionExpired, TransientError, KafkaTimeoutError)):
+        return True
+    return isinstance(error, KafkaError) and error.retriable
+
+
+def relay_run(producer, kind, run, max_attempts):
+    """
+    Apply and publish a run of events of one kind. Returns the ids relayed and
+    whether an event failed, in which case the events after it were not tried.
+    """
+    try:
+        HANDLERS[kind][0](handler_rows(run))
+        publish(producer, kind, run)
+    except Exception as e:
+        if len(run) > 1 and not is_transient(e):
+            # Find the event at fault, relaying the ones before it
+            relayed = []
+            for event in run:
+                ids, failed = relay_run(producer, kind, [event], max_attempts)
+                relayed.extend(ids)
+                if failed:
+                    return relayed, True
+            return relayed, False
+        logger.error(f"Error relaying {len(run)} {kind} events: {str(e)}")
+        OUTBOX_EVENTS.labels(SERVICE, kind, "failed").inc(len(run))
+        ids = [event.id for event in run]
+        OutboxEvent.objects.filter(id__in=ids).update(attempts=F("attempts") + 1, last_error=str(e))
+        if not is_transient(e):
+            parked = OutboxEvent.objects.filter(id__in=ids, attempts__gte=max_attempts).update(
+                failed_at=timezone.now()
+            )
+            if parked:
+                logger.error(f"Parked {parked} {kind} events after {max_attempts} attempts")
+                OUTBOX_EVENTS.labels(SERVICE, kind, "parked").inc(parked)
+        return [], True
+    OUTBOX_EVENTS.labels(SERVICE, kind, "relayed").inc(len(run))
+    return [event.id for event in run], False
+
+
+def relay(producer, batch_size, max_attempts=10):
+    """
+    Relay one batch of pending events and return how many were processed.
+
+    The batch is locked without SKIP LOCKED, so a second relay waits for the
+    first to commit and then takes the events after it: relays run one at a
+    time and events of one user stay in order. Relaying stops at the first
+    event that fails, for the same reason; it is retried on the next pass. An
+    event that keeps failing for a reason of its own, such as a payload its
+    schema rejects, is parked with `failed_at` after `max_attempts` tries so
+    the events behind it can go on. Outages of Neo4j or Kafka never park events.
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update()
+            .filter(processed_at__isnull=True, failed_at__isnull=True)
+            .order_by("id")[:batch_size]
+        )
+        processed = []
+        for kind, run in groupby(events, key=lambda event: event.kind):
+            relayed, failed = relay_run(producer, kind, list(run), max_attempts)
+            processed.extend(relayed)
+            if failed:
+                break
+
+        OutboxEvent.objects.filter(id__in=processed).update(processed_at=timezone.now())
+    return len(processed)
+
+
+def observe_lag():
+    pending = OutboxEvent.objects.filter(processed_at__isnull=True, failed_at__isnull=True)
+    oldest = pending.order_by("id").values_list("created_at", flat=True).first()
+    OUTBOX_PENDING.labels(SERVICE).set(pending.count())
+    OUTBOX_FAILED.labels(SERVICE).set(OutboxEvent.objects.filter(failed_at__isnull=False).count())
+    OUTBOX_LAG.labels(SERVICE).set(
+        (timezone.now() - oldest).total_seconds() if oldest is not None else 0
+    )
@@ -0,0 +1,45 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .utils.neo4j_conn import neo4j_connection
+
+
+class Neo4jCursorPagination:
+    """
+    SKIP-free pagination of Neo4j neighbour lists, ordered by user id.
+
+    The query must filter on `u.id > $cursor`, `ORDER BY u.id` and `LIMIT $limit`.
+    Each page starts after the last id of the previous one, so no page costs
+    more than the ones before it and concurrent changes never shift results.
+    """
+
+    default_limit = 50
+    max_limit = 500
+
+    def __init__(self, request):
+        try:
+            # User ids start at 1, so -1 means "from the beginning"
+            self.cursor = int(request.query_params.get("cursor", -1))
+            self.limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            raise ValidationError({"error": "cursor and limit must be integers"})
+        if self.limit < 1:
+            raise ValidationError({"error": "limit must be positive"})
+        self.limit = min(self.limit, self.max_limit)
+
+    def paginate(self, query, parameters):
+        # One extra row tells whether there is a next page
+        records = neo4j_connection.read(
+            query, parameters={**parameters, "cursor": self.cursor, "limit": self.limit + 1}
+        )
+        self.has_next = len(records) > self.limit
+        return [dict(record) for record in records[: self.limit]]
+
+    def get_paginated_response(self, results, count):
+        return Response(
+            {
+                "results": results,
+                "next_cursor": results[-1]["id"] if self.has_next else None,
+                "count": count,
+            }
+        )
@@ -0,0 +1,168 @@
+"""
+Per-request MySQL and Neo4j query profiler.
+
+Every query a request runs is grouped by its shape: the statement with its
+literals replaced by `?`, so the same lookup issued for 20 different users is
+one shape seen 20 times. With `QUERY_PROFILING` on, `QueryProfilerMiddleware`
+logs shapes repeated `N_PLUS_ONE_THRESHOLD` times or more (the usual sign of a
+query issued once per item in a loop) and reports the totals in a
+`Server-Timing` header.
+
+In tests, `query_budget()` collects the same data and fails when an endpoint
+issues more queries than allowed.
+"""
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+
+def statement_shape(statement):
+    """Fingerprint an SQL or Cypher statement by collapsing whitespace and literals."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _LITERALS.sub("?", shape)
+    # `IN (%s, %s, ...)` of any length is one shape
+    return _PLACEHOLDER_LIST.sub("(...)", shape)
+
+
+class QueryProfile:
+    """Queries issued while the profile is active, grouped by backend and shape."""
+
+    def __init__(self):
+        self.queries = defaultdict(list)
+
+    def record(self, backend, shape, seconds):
+        self.queries[(backend, shape)].append(seconds)
+
+    def count(self, backend=None):
+        return sum(
+            len(timings) for (name, _), timings in self.queries.items()
+            if backend is None or name == backend
+        )
+
+    def duration(self, backend=None):
+        return sum(
+            sum(timings) for (name, _), timings in self.queries.items()
+            if backend is None or name == backend
+        )
+
+    def backends(self):
+        return sorted({backend for backend, _ in self.queries})
+
+    def repeated(self, threshold):
+        """Shapes issued at least `threshold` times, most frequent first."""
+        found = [
+            (backend, shape, len(timings))
+            for (backend, shape), timings in self.queries.items()
+            if len(timings) >= threshold
+        ]
+        return sorted(found, key=lambda item: -item[2])
+
+    def server_timing(self):
+        return ", ".join(
+            f'{backend};desc="{self.count(backend)} queries";dur={self.duration(backend) * 1000:.1f}'
+            for backend in self.backends()
+        )
+
+    def summary(self):
+        return "\n".join(
+            f"  {len(timings)} x {backend} {shape}"
+            for (backend, shape), timings in sorted(
+                self.queries.items(), key=lambda item: -len(item[1])
+            )
+        )
+
+
+_profile = ContextVar("query_profile", default=None)
+
+
+@contextmanager
+def profile():
+    """
+    Collect the queries issued inside the block. Nested calls share the outer
+    profile. MySQL queries are seen on the default connection of this thread.
+    """
+    current = _profile.get()
+    if current is not None:
+        yield current
+        return
+    current = QueryProfile()
+    token = _profile.set(current)
+    try:
+        with connections["default"].execute_wrapper(mysql_wrapper):
+            yield current
+    finally:
+        _profile.reset(token)
+
+
+@contextmanager
+def profile_query(backend, statement):
+    """Add the statement run inside the block to the active profile, if any."""
+    current = _profile.get()
+    if current is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.record(backend, statement_shape(statement), time.perf_counter() - start)
+
+
+def mysql_wrapper(execute, sql, params, many, context):
+    with profile_query("mysql", sql):
+        return execute(sql, params, many, context)
+
+
+def report(request, current):
+    for backend, shape, count in current.repeated(settings.N_PLUS_ONE_THRESHOLD):
+        logger.warning(
+            f"Possible N+1 in {request.method} {request.path}: {count} x {backend} {shape}"
+        )
+
+
+class QueryProfilerMiddleware:
+    """Profiles every request when `QUERY_PROFILING` is on, otherwise removes itself."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profile() as current:
+            response = self.get_response(request)
+        report(request, current)
+        if current.queries:
+            response["Server-Timing"] = current.server_timing()
+        return response
+
+
+@contextmanager
+def query_budget(**limits):
+    """
+    Fail if the block issues more queries than allowed per backend, e.g.
+
+        with query_budget(mysql=2, neo4j=1):
+            self.client.get("/api/users/following/alice/")
+    """
+    with profile() as current:
+        yield current
+    for backend, limit in limits.items():
+        issued = current.count(backend)
+        if issued > limit:
+            raise AssertionError(
+                f"{issued} {backend} queries issued, budget is {limit}:\n{current.summary()}"
+            )
@@ -1,9 +1,11 @@
+from urllib.parse import urljoin
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User, make_password
+from django.db import transaction
 from .models import CustomUser
-from .utils.neo4j_conn import neo4j_connection
-from kafka import KafkaProducer
-import json
+from .outbox import USER_CREATED, record
 
 
 class UserSignupSerializer(serializers.ModelSerializer):
@@ -19,40 +21,26 @@ class UserSignupSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        user = CustomUser.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
-        )
-        user.first_name = validated_data.get('first_name', '')
-        user.last_name = validated_data.get('last_name', '')
-        user.bio = validated_data.get('bio', '')
-        user.profile_image = validated_data.get('profile_image', None)
-        user.save()
-
-        query = """
-            MERGE (u:User {id: $user_id})
-            SET u.username = $username, u.first_name = $first_name, u.last_name = $last_name
-        """
-
-        neo4j_connection.query(query, parameters={
-            'user_id': user.id,
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name
-        })
-        producer = KafkaProducer(
-            bootstrap_servers=['kafka:9092'],  # Replace with your Kafka server address
-            value_serializer=lambda v: json.dumps(v).encode('utf-8')
-        )
-        topic = "user_signup"
-        producer.send(topic, {
-            'user_id': user.id,
-            'first_name': user.first_name,
-            'username': user.username,
-            'email': user.email
-        })
-        producer.close()
+        # The graph node and the user_signup event are written by relay_outbox
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username=validated_data['username'],
+                email=validated_data['email'],
+                password=validated_data['password']
+            )
+            user.first_name = validated_data.get('first_name', '')
+            user.last_name = validated_data.get('last_name', '')
+            user.bio = validated_data.get('bio', '')
+            user.profile_image = validated_data.get('profile_image', None)
+            user.save()
+
+            record(USER_CREATED, {
+                'user_id': user.id,
+                'username': user.username,
+                'first_name': user.first_name,
+                'last_name': user.last_name,
+                'email': user.email
+            })
         return user
 
 
@@ -75,3 +63,28 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
 
 class FollowSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
+
+
+class RelationshipStatusSerializer(serializers.Serializer):
+    usernames = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False, max_length=300
+    )
+
+
+class AuthorCardSerializer(serializers.ModelSerializer):
+    display_name = serializers.SerializerMethodField()
+    avatar_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CustomUser
+        fields = ['username', 'display_name', 'avatar_url']
+
+    def get_display_name(self, obj):
+        return f"{obj.first_name} {obj.last_name}".strip() or obj.username
+
+    def get_avatar_url(self, obj):
+        # Cards are embedded in post-service payloads, so the URL must not be
+        # relative to whichever service the browser fetched them from
+        if not obj.profile_image:
+            return None
+        return urljoin(settings.PUBLIC_URL, obj.profile_image.url)
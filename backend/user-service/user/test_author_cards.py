@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import CustomUser
+from .profiling import query_budget
+
+
+class AuthorCardsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(
+            username="alice", password="secret", first_name="Alice", last_name="Liddell"
+        )
+        cls.bob = CustomUser.objects.create_user(username="bob", password="secret")
+
+    def test_cards_for_every_known_username(self):
+        # One query however many authors, and a forwarded token is not looked up
+        token = AccessToken.for_user(self.alice)
+        with query_budget(mysql=1):
+            response = self.client.get(
+                "/api/users/profiles/?usernames=alice,bob,nobody,alice",
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["profiles"], {
+            "alice": {"username": "alice", "display_name": "Alice Liddell", "avatar_url": None},
+            "bob": {"username": "bob", "display_name": "bob", "avatar_url": None},
+        })
+
+    @override_settings(PUBLIC_URL="https://users.threadhive.example")
+    def test_avatar_urls_are_absolute(self):
+        self.bob.profile_image = "profile_images/bob.jpg"
+        self.bob.save()
+
+        response = self.client.get("/api/users/profiles/?usernames=bob")
+
+        self.assertEqual(
+            response.data["profiles"]["bob"]["avatar_url"],
+            "https://users.threadhive.example/profile_images/bob.jpg",
+        )
+
+    def test_usernames_are_required(self):
+        response = self.client.get("/api/users/profiles/")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_too_many_usernames(self):
+        usernames = ",".join(f"user{i}" for i in range(101))
+
+        response = self.client.get(f"/api/users/profiles/?usernames={usernames}")
+
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch("user.utils.authors.get_redis_connection")
+    def test_profile_update_is_published(self, get_redis_connection):
+        self.client.force_authenticate(self.alice)
+
+        response = self.client.put("/api/users/profile/update/", {"bio": "Down the rabbit hole"})
+
+        self.assertEqual(response.status_code, 200)
+        get_redis_connection.return_value.publish.assert_called_once_with("author_cards", "alice")
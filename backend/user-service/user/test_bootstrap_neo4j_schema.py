@@ -0,0 +1,54 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+
+def index(label, prop, state="ONLINE"):
+    return {"labelsOrTypes": [label], "properties": [prop], "state": state}
+
+
+class BootstrapNeo4jSchemaTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("user.management.commands.bootstrap_neo4j_schema.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_creates_constraints_idempotently(self):
+        self.neo4j.query.return_value = [index("User", "id"), index("User", "username")]
+        out = StringIO()
+
+        call_command("bootstrap_neo4j_schema", stdout=out)
+
+        statements = [call.args[0] for call in self.neo4j.write.call_args_list]
+        self.assertEqual(len(statements), 2)
+        for statement in statements:
+            self.assertIn("IF NOT EXISTS", statement)
+            self.assertIn("IS UNIQUE", statement)
+        self.assertIn("REQUIRE n.id IS UNIQUE", statements[0])
+        self.assertIn("REQUIRE n.username IS UNIQUE", statements[1])
+        self.assertIn("Neo4j schema is up to date", out.getvalue())
+
+    def test_waits_for_indexes_to_come_online(self):
+        self.neo4j.query.side_effect = [
+            [index("User", "id", "POPULATING"), index("User", "username")],
+            [index("User", "id"), index("User", "username")],
+        ]
+
+        with mock.patch("user.management.commands.bootstrap_neo4j_schema.time.sleep"):
+            call_command("bootstrap_neo4j_schema", stdout=StringIO())
+
+        self.assertEqual(self.neo4j.query.call_count, 2)
+
+    def test_fails_when_an_index_is_missing(self):
+        self.neo4j.query.return_value = [index("User", "id")]
+
+        with self.assertRaisesMessage(CommandError, ":User(username) missing"):
+            call_command("bootstrap_neo4j_schema", "--timeout=0", stdout=StringIO())
+
+    def test_reports_duplicate_values(self):
+        self.neo4j.write.side_effect = Exception("Both Node(1) and Node(2) have the label `User`")
+
+        with self.assertRaisesMessage(CommandError, "check for duplicate values"):
+            call_command("bootstrap_neo4j_schema", stdout=StringIO())
@@ -0,0 +1,18 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from eventschema.serializers import EventSerializer
+
+from .events import create_producer
+
+
+class CreateProducerTests(SimpleTestCase):
+    @mock.patch("kafka.KafkaProducer")
+    def test_producer_config(self, kafka_producer):
+        create_producer()
+
+        config = kafka_producer.call_args.kwargs
+        self.assertEqual(config["acks"], "all")
+        self.assertEqual(config["max_in_flight_requests_per_connection"], 1)
+        self.assertIsInstance(config["value_serializer"], EventSerializer)
+        self.assertEqual(config["key_serializer"](1), b"1")
@@ -0,0 +1,44 @@
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from prometheus_client import REGISTRY
+
+from .metrics import SERVICE, MetricsMiddleware
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, {"service": SERVICE, **labels}) or 0
+
+
+class MetricsMiddlewareTests(TestCase):
+    def test_counts_requests_by_route_and_status(self):
+        labels = {"method": "GET", "route": "api/users/ready/"}
+        response = self.client.get("/api/users/ready/")
+        status = str(response.status_code)
+        before = sample("http_requests_total", status=status, **labels)
+
+        self.client.get("/api/users/ready/")
+
+        self.assertEqual(sample("http_requests_total", status=status, **labels), before + 1)
+        self.assertEqual(sample("http_requests_in_progress", method="GET"), 0)
+
+    def test_mysql_time_is_charged_to_the_request(self):
+        labels = {"backend": "mysql", "route": "<unmatched>"}
+        before = sample("http_request_backend_seconds_count", **labels)
+
+        def view(request):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return HttpResponse()
+
+        MetricsMiddleware(view)(RequestFactory().get("/"))
+
+        self.assertEqual(sample("http_request_backend_seconds_count", **labels), before + 1)
+
+
+class MetricsViewTests(SimpleTestCase):
+    def test_exposes_prometheus_text(self):
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_requests_total", response.content)
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+from neo4j import READ_ACCESS
+from prometheus_client import REGISTRY
+
+from .metrics import SERVICE
+from .utils.neo4j_conn import Neo4jConnection
+
+
+class FakeResult:
+    def __init__(self, records):
+        self.records = records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def consume(self):
+        return SimpleNamespace(counters=SimpleNamespace(relationships_created=len(self.records)))
+
+
+class FakeSession:
+    def __init__(self, records, **config):
+        self.records = records
+        self.config = config
+        self.calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None):
+        return FakeResult(self.records)
+
+    def execute_read(self, work):
+        self.calls.append("read")
+        self.work = work
+        return work(self)
+
+    def execute_write(self, work):
+        self.calls.append("write")
+        return work(self)
+
+
+class Neo4jConnectionTests(SimpleTestCase):
+    def setUp(self):
+        self.records = [{"id": 1}, {"id": 2}]
+        self.sessions = []
+
+        def session(**config):
+            self.sessions.append(FakeSession(self.records, **config))
+            return self.sessions[-1]
+
+        self.driver = mock.Mock(session=session)
+        patcher = mock.patch(
+            "user.utils.neo4j_conn.GraphDatabase.driver", return_value=self.driver
+        )
+        self.build_driver = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connection = Neo4jConnection(
+            "neo4j://graph:7687",
+            "neo4j",
+            "secret",
+            database="social",
+            max_connection_pool_size=20,
+            connection_acquisition_timeout=2.0,
+            max_connection_lifetime=300,
+        )
+
+    def test_driver_is_built_lazily_with_the_pool_settings(self):
+        self.build_driver.assert_not_called()
+
+        self.connection.read("MATCH (u:User) RETURN u")
+        self.connection.read("MATCH (u:User) RETURN u")
+
+        self.build_driver.assert_called_once_with(
+            "neo4j://graph:7687",
+            auth=("neo4j", "secret"),
+            max_connection_pool_size=20,
+            connection_acquisition_timeout=2.0,
+            max_connection_lifetime=300,
+        )
+
+    def test_driver_is_rebuilt_in_a_forked_process(self):
+        self.connection.read("RETURN 1")
+        with mock.patch("user.utils.neo4j_conn.os.getpid", return_value=-1):
+            self.connection.read("RETURN 1")
+        self.assertEqual(self.build_driver.call_count, 2)
+
+    def test_read_and_write_use_managed_transactions(self):
+        self.assertEqual(self.connection.read("MATCH (u) RETURN u"), self.records)
+        records, counters = self.connection.write("MERGE (u:User {id: 1})")
+
+        self.assertEqual(records, self.records)
+        self.assertEqual(counters.relationships_created, 2)
+        self.assertEqual([s.calls for s in self.sessions], [["read"], ["write"]])
+        self.assertEqual(self.sessions[0].config["database"], "social")
+
+    def test_read_timeout(self):
+        self.connection.read("RETURN 1")
+        self.connection.read("RETURN 1", timeout=0.5)
+
+        self.assertFalse(hasattr(self.sessions[0].work, "timeout"))
+        self.assertEqual(self.sessions[1].work.timeout, 0.5)
+
+    def test_transaction_wait_is_observed(self):
+        labels = {"service": SERVICE, "access_mode": "read"}
+        before = REGISTRY.get_sample_value("neo4j_transaction_wait_seconds_count", labels) or 0
+
+        self.connection.read("RETURN 1")
+
+        self.assertEqual(
+            REGISTRY.get_sample_value("neo4j_transaction_wait_seconds_count", labels), before + 1
+        )
+
+    def test_stream(self):
+        records = self.connection.stream("MATCH (u) RETURN u", fetch_size=500)
+
+        # Nothing runs until the caller starts iterating
+        self.assertEqual(self.sessions, [])
+        self.assertEqual(list(records), self.records)
+        self.assertEqual(self.sessions[0].config["default_access_mode"], READ_ACCESS)
+        self.assertEqual(self.sessions[0].config["fetch_size"], 500)
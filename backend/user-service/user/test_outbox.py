@@ -0,0 +1,284 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from eventschema import SchemaError, decode, encode
+from neo4j.exceptions import ServiceUnavailable
+from prometheus_client import REGISTRY
+from rest_framework.test import APITestCase
+
+from .metrics import SERVICE
+from .models import CustomUser, OutboxEvent
+from .outbox import UNFOLLOW, UNFOLLOW_USERS, USER_CREATED, observe_lag, relay
+from .utils.degrees import FOLLOWERS, FOLLOWING, cache_key
+
+
+def kafka_messages(topic, outcome):
+    labels = {"service": SERVICE, "topic": topic, "outcome": outcome}
+    return REGISTRY.get_sample_value("kafka_messages_total", labels) or 0
+
+
+def outbox_events(kind, outcome):
+    labels = {"service": SERVICE, "kind": kind, "outcome": outcome}
+    return REGISTRY.get_sample_value("outbox_events_total", labels) or 0
+
+
+def unfollow(follower_id, followee_id):
+    return OutboxEvent.objects.create(kind=UNFOLLOW, payload={
+        "follower_id": follower_id, "follower": f"user{follower_id}",
+        "followee_id": followee_id, "followee": f"user{followee_id}",
+    })
+
+
+class SignupOutboxTests(TestCase):
+    @mock.patch("user.outbox.neo4j_connection")
+    def test_signup_only_writes_mysql(self, neo4j):
+        response = self.client.post("/api/users/signup/", {
+            "username": "alice", "email": "alice@example.com", "password": "secret",
+            "first_name": "Alice",
+        })
+
+        self.assertEqual(response.status_code, 201)
+        neo4j.write.assert_not_called()
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.kind, USER_CREATED)
+        self.assertEqual(event.payload["username"], "alice")
+        self.assertIsNone(event.processed_at)
+
+    @mock.patch("user.outbox.neo4j_connection")
+    def test_signup_payload_matches_its_schema(self, neo4j):
+        self.client.post("/api/users/signup/", {
+            "username": "alice", "email": "alice@example.com", "password": "secret",
+        })
+
+        payload = OutboxEvent.objects.get().payload
+        self.assertEqual(decode("user_signup", encode("user_signup", payload)), payload)
+
+
+class RelayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("user.outbox.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.producer = mock.Mock()
+
+    def created(self, user_id):
+        return OutboxEvent.objects.create(kind=USER_CREATED, payload={
+            "user_id": user_id, "username": f"user{user_id}", "first_name": "", "last_name": "",
+            "email": f"user{user_id}@example.com",
+        })
+
+    def test_runs_of_one_kind_share_a_statement(self):
+        self.created(1)
+        self.created(2)
+        unfollow(1, 2)
+        self.neo4j.write.return_value = ([], None)
+
+        self.assertEqual(relay(self.producer, batch_size=10), 3)
+
+        self.assertEqual(self.neo4j.write.call_count, 2)
+        rows = self.neo4j.write.call_args_list[0].kwargs["parameters"]["rows"]
+        self.assertEqual([row["user_id"] for row in rows], [1, 2])
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_events_carry_their_idempotency_key(self):
+        event = self.created(1)
+        self.neo4j.write.return_value = ([], None)
+        delivered = kafka_messages("user_signup", "delivered")
+
+        relay(self.producer, batch_size=10)
+
+        self.producer.send.assert_called_once_with(
+            "user_signup",
+            value=event.payload,
+            key=1,
+            headers=[("idempotency_key", str(event.idempotency_key).encode())],
+        )
+        self.producer.flush.assert_called_once()
+        self.assertEqual(kafka_messages("user_signup", "delivered"), delivered + 1)
+
+    def test_unfollow_writes_counts_through(self):
+        unfollow(1, 2)
+        self.neo4j.write.return_value = ([{
+            "follower_id": 1, "follower": "user1", "followee_id": 2, "followee": "user2",
+            "following": 0, "followers": 3,
+        }], None)
+
+        relay(self.producer, batch_size=10)
+
+        self.assertEqual(cache.get(cache_key(1, FOLLOWING)), 0)
+        self.assertEqual(cache.get(cache_key(2, FOLLOWERS)), 3)
+
+    def test_failed_run_stops_the_batch(self):
+        first = self.created(1)
+        failing = unfollow(1, 2)
+        last = self.created(3)
+        self.neo4j.write.side_effect = [([], None), Exception("Neo4j unavailable")]
+        failed = outbox_events(UNFOLLOW, "failed")
+
+        self.assertEqual(relay(self.producer, batch_size=10), 1)
+
+        first.refresh_from_db()
+        failing.refresh_from_db()
+        last.refresh_from_db()
+        self.assertIsNotNone(first.processed_at)
+        self.assertIsNone(failing.processed_at)
+        self.assertEqual(failing.attempts, 1)
+        self.assertEqual(failing.last_error, "Neo4j unavailable")
+        # Later events wait, so one user's events are applied in order
+        self.assertIsNone(last.processed_at)
+        self.assertEqual(outbox_events(UNFOLLOW, "failed"), failed + 1)
+
+    def test_relays_wait_for_each_other(self):
+        self.created(1)
+        self.neo4j.write.return_value = ([], None)
+
+        with CaptureQueriesContext(connection) as queries:
+            relay(self.producer, 10)
+
+        # Skipping locked rows would let a second relay publish later events of a user first
+        locking = [query["sql"] for query in queries if "FOR UPDATE" in query["sql"]]
+        self.assertEqual(len(locking), 1)
+        self.assertNotIn("SKIP LOCKED", locking[0])
+
+    def test_failed_publish_is_retried(self):
+        event = self.created(1)
+        self.neo4j.write.return_value = ([], None)
+        self.producer.send.return_value.get.side_effect = Exception("Broker not available")
+        failed = kafka_messages("user_signup", "failed")
+
+        self.assertEqual(relay(self.producer, batch_size=10), 0)
+
+        event.refresh_from_db()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(kafka_messages("user_signup", "failed"), failed + 1)
+
+    def test_event_that_keeps_failing_is_parked(self):
+        events = [self.created(user_id) for user_id in (1, 2, 3)]
+
+        def write(query, parameters):
+            if any(row["user_id"] == 2 for row in parameters["rows"]):
+                raise SchemaError("Expected string, got NoneType")
+            return [], None
+        self.neo4j.write.side_effect = write
+
+        # The failing run is retried event by event, so user 1 is not held back
+        self.assertEqual(relay(self.producer, batch_size=10, max_attempts=2), 1)
+        self.assertEqual(relay(self.producer, batch_size=10, max_attempts=2), 0)
+        self.assertEqual(relay(self.producer, batch_size=10, max_attempts=2), 1)
+
+        for event in events:
+            event.refresh_from_db()
+        self.assertIsNotNone(events[0].processed_at)
+        self.assertIsNone(events[1].processed_at)
+        self.assertIsNotNone(events[1].failed_at)
+        self.assertEqual(events[1].attempts, 2)
+        self.assertEqual(events[1].last_error, "Expected string, got NoneType")
+        self.assertIsNotNone(events[2].processed_at)
+
+        observe_lag()
+        self.assertEqual(REGISTRY.get_sample_value("outbox_pending_events", {"service": SERVICE}), 0)
+        self.assertEqual(REGISTRY.get_sample_value("outbox_failed_events", {"service": SERVICE}), 1)
+
+    def test_outages_never_park_events(self):
+        event = self.created(1)
+        self.created(2)
+        self.neo4j.write.side_effect = ServiceUnavailable("Unable to retrieve routing information")
+
+        for _ in range(3):
+            self.assertEqual(relay(self.producer, batch_size=10, max_attempts=2), 0)
+
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 3)
+        self.assertIsNone(event.failed_at)
+        # Not retried one event at a time either
+        self.assertEqual(self.neo4j.write.call_count, 3)
+
+    @mock.patch("user.management.commands.relay_outbox.create_producer")
+    def test_command_drains_and_purges(self, create_producer):
+        for user_id in range(5):
+            self.created(user_id)
+        old = self.created(9)
+        OutboxEvent.objects.filter(id=old.id).update(
+            processed_at=timezone.now() - timedelta(days=30)
+        )
+        self.neo4j.write.return_value = ([], None)
+        out = StringIO()
+
+        call_command("relay_outbox", batch_size=2, stdout=out)
+
+        self.assertEqual(self.neo4j.write.call_count, 3)
+        self.assertIn("Relayed 5 outbox events", out.getvalue())
+        self.assertFalse(OutboxEvent.objects.filter(id=old.id).exists())
+        create_producer.return_value.close.assert_called_once()
+        self.assertEqual(
+            REGISTRY.get_sample_value("outbox_pending_events", {"service": SERVICE}), 0
+        )
+
+
+class UnfollowOrderingTests(APITestCase):
+    """An unfollow relayed after the user followed again must not remove the new follow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(username="alice", password="secret")
+        cls.bob = CustomUser.objects.create_user(username="bob", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.alice)
+        # One graph behind every module, so the order of statements shows
+        self.neo4j = mock.Mock()
+        for target in ("user.outbox.neo4j_connection", "user.views.neo4j_connection"):
+            patcher = mock.patch(target, self.neo4j)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def unfollow_rows(self):
+        return [
+            call.kwargs["parameters"]["rows"]
+            for call in self.neo4j.write.call_args_list if call.args[0] == UNFOLLOW_USERS
+        ]
+
+    def test_unfollow_then_follow_before_the_relay(self):
+        self.client.post("/api/users/unfollow/bob/")
+        self.neo4j.write.side_effect = [
+            ([], None),
+            ([{"blocked": False, "following": 1, "followers": 1}], mock.Mock(relationships_created=1)),
+        ]
+
+        response = self.client.post("/api/users/follow/bob/")
+
+        # The pending unfollow removes the old edge first, so this is a new follow
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["message"], "You are now following bob")
+        (rows,) = self.unfollow_rows()
+        follow = self.neo4j.write.call_args_list[1]
+        self.assertNotEqual(follow.args[0], UNFOLLOW_USERS)
+        self.assertGreater(follow.kwargs["parameters"]["followed_at"], rows[0]["recorded_at"])
+
+        self.neo4j.write.side_effect = None
+        self.neo4j.write.return_value = ([], None)
+        relay(mock.Mock(), batch_size=10)
+
+        # The relay repeats the unfollow as recorded, which only deletes older edges
+        self.assertEqual(self.unfollow_rows()[1], rows)
+        self.assertIn("r.followed_at < row.recorded_at", UNFOLLOW_USERS)
+        self.assertIsNotNone(OutboxEvent.objects.get().processed_at)
+
+    def test_follow_without_pending_unfollows(self):
+        self.neo4j.write.return_value = (
+            [{"blocked": False, "following": 1, "followers": 1}], mock.Mock(relationships_created=1)
+        )
+
+        self.client.post("/api/users/follow/bob/")
+
+        self.neo4j.write.assert_called_once()
+        self.assertEqual(self.unfollow_rows(), [])
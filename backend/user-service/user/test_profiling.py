@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import CustomUser
+from .profiling import (
+    QueryProfilerMiddleware,
+    profile,
+    profile_query,
+    query_budget,
+    statement_shape,
+)
+from .utils.degrees import FOLLOWERS, FOLLOWING, store_degrees
+
+FOLLOWING_QUERY = """
+    MATCH (u1:User {id: $user_id})-[:FOLLOW]->(u2:User)
+    RETURN u2
+"""
+
+
+class StatementShapeTests(SimpleTestCase):
+    def test_whitespace_and_literals_are_collapsed(self):
+        self.assertEqual(
+            statement_shape("SELECT *\n  FROM user WHERE id = 42 AND name = 'bob'"),
+            "SELECT * FROM user WHERE id = ? AND name = ?",
+        )
+
+    def test_placeholder_lists_of_any_length_match(self):
+        self.assertEqual(
+            statement_shape("SELECT * FROM user WHERE id IN (%s, %s, %s)"),
+            statement_shape("SELECT * FROM user WHERE id IN (%s)"),
+        )
+
+    def test_cypher_parameters_are_kept(self):
+        self.assertEqual(
+            statement_shape(FOLLOWING_QUERY),
+            "MATCH (u1:User {id: $user_id})-[:FOLLOW]->(u2:User) RETURN u2",
+        )
+
+
+class ProfileTests(TestCase):
+    def test_counts_mysql_and_neo4j_queries(self):
+        with profile() as current:
+            CustomUser.objects.filter(username="nobody").exists()
+            for _ in range(3):
+                with profile_query("neo4j", FOLLOWING_QUERY):
+                    pass
+
+        self.assertEqual(current.count("mysql"), 1)
+        self.assertEqual(current.count("neo4j"), 3)
+        self.assertEqual(current.backends(), ["mysql", "neo4j"])
+
+    def test_queries_outside_a_profile_are_ignored(self):
+        CustomUser.objects.filter(username="nobody").exists()
+        with profile() as current:
+            pass
+        self.assertEqual(current.count(), 0)
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="alice", password="secret")
+
+    def test_profile_lookup(self):
+        token = AccessToken.for_user(self.user)
+        cache.clear()
+        store_degrees(self.user.id, {FOLLOWERS: 0, FOLLOWING: 0})
+
+        # One query authenticates the token's user, one loads the profile,
+        # and the counts come from the cache
+        with query_budget(mysql=2, neo4j=0):
+            response = self.client.get(
+                "/api/users/profile/alice/", HTTP_AUTHORIZATION=f"Bearer {token}"
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_over_budget(self):
+        with self.assertRaisesMessage(AssertionError, "2 mysql queries issued, budget is 1"):
+            with query_budget(mysql=1):
+                CustomUser.objects.filter(username="a").exists()
+                CustomUser.objects.filter(username="b").exists()
+
+
+def n_plus_one_view(request):
+    for user_id in range(5):
+        CustomUser.objects.filter(id=user_id).exists()
+    return HttpResponse()
+
+
+class QueryProfilerMiddlewareTests(TestCase):
+    @override_settings(QUERY_PROFILING=True, N_PLUS_ONE_THRESHOLD=5)
+    def test_adds_server_timing_and_logs_n_plus_one(self):
+        middleware = QueryProfilerMiddleware(n_plus_one_view)
+
+        with self.assertLogs("user.profiling", "WARNING") as logs:
+            response = middleware(RequestFactory().get("/api/users/following/alice/"))
+
+        self.assertTrue(response["Server-Timing"].startswith('mysql;desc="5 queries";dur='))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Possible N+1 in GET /api/users/following/alice/: 5 x mysql", logs.output[0])
+
+    @override_settings(QUERY_PROFILING=False)
+    def test_disabled_by_default(self):
+        response = self.client.get("/api/users/ready/")
+        self.assertNotIn("Server-Timing", response)
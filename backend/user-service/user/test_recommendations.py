@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from neo4j.exceptions import ClientError
+from rest_framework.test import APITestCase
+
+from .models import CustomUser
+from .utils.recommendations import cache_key, rank
+
+
+def candidate(user, mutuals):
+    return {"id": user.id, "username": user.username, "mutuals": mutuals}
+
+
+class RankTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.active = CustomUser.objects.create_user(username="active", password="secret", last_login=now)
+        cls.idle = CustomUser.objects.create_user(
+            username="idle", password="secret", last_login=now - timedelta(days=90)
+        )
+        cls.never = CustomUser.objects.create_user(username="never", password="secret")
+
+    def test_recent_activity_outranks_one_more_mutual(self):
+        rankings = rank({1: [candidate(self.idle, 3), candidate(self.never, 3), candidate(self.active, 2)]})
+
+        self.assertEqual([c["username"] for c in rankings[1]], ["active", "idle", "never"])
+
+    @override_settings(RECOMMENDATIONS_SIZE=2)
+    def test_keeps_the_top_n(self):
+        rankings = rank({1: [candidate(self.idle, 3), candidate(self.never, 2), candidate(self.active, 1)]})
+
+        self.assertEqual(len(rankings[1]), 2)
+
+
+class RecommendationsViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(username="alice", password="secret")
+        cls.bob = CustomUser.objects.create_user(username="bob", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.alice)
+        patcher = mock.patch("user.utils.recommendations.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_precomputed_list_skips_the_graph(self):
+        cache.set(cache_key(self.alice.id), [candidate(self.bob, 4)])
+
+        response = self.client.get("/api/users/recommendations/")
+
+        self.assertEqual(response.data["results"], [candidate(self.bob, 4)])
+        self.neo4j.read.assert_not_called()
+
+    @override_settings(RECOMMENDATIONS_TIMEOUT=0.25)
+    def test_cold_user_is_computed_within_the_time_budget(self):
+        self.neo4j.read.return_value = [
+            {"user_id": self.alice.id, "candidates": [candidate(self.bob, 2)]}
+        ]
+
+        response = self.client.get("/api/users/recommendations/")
+        self.client.get("/api/users/recommendations/")
+
+        self.assertEqual(response.data["results"], [candidate(self.bob, 2)])
+        self.neo4j.read.assert_called_once()
+        self.assertEqual(self.neo4j.read.call_args.kwargs["timeout"], 0.25)
+        self.assertEqual(self.neo4j.read.call_args.kwargs["parameters"]["user_ids"], [self.alice.id])
+
+    def test_timeout_returns_nothing(self):
+        self.neo4j.read.side_effect = ClientError("The transaction has been terminated")
+
+        response = self.client.get("/api/users/recommendations/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+
+    @mock.patch("user.views.neo4j_connection")
+    def test_follow_drops_the_cached_list(self, views_neo4j):
+        cache.set(cache_key(self.alice.id), [candidate(self.bob, 4)])
+        views_neo4j.write.return_value = (
+            [{"blocked": False, "following": 1, "followers": 1}],
+            mock.Mock(relationships_created=1),
+        )
+
+        self.client.post("/api/users/follow/bob/")
+
+        self.assertIsNone(cache.get(cache_key(self.alice.id)))
+
+
+class PrecomputeRecommendationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("user.utils.recommendations.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_caches_lists_of_active_users_only(self):
+        now = timezone.now()
+        active = [
+            CustomUser.objects.create_user(username=f"user{i}", password="secret", last_login=now)
+            for i in range(3)
+        ]
+        idle = CustomUser.objects.create_user(
+            username="idle", password="secret", last_login=now - timedelta(days=30)
+        )
+        self.neo4j.read.side_effect = lambda query, parameters, timeout=None: [
+            {"user_id": user_id, "candidates": [candidate(idle, 1)]}
+            for user_id in parameters["user_ids"]
+        ]
+        out = StringIO()
+
+        call_command("precompute_recommendations", "--batch-size=2", stdout=out)
+
+        batches = [call.kwargs["parameters"]["user_ids"] for call in self.neo4j.read.call_args_list]
+        self.assertEqual(batches, [[active[0].id, active[1].id], [active[2].id]])
+        for user in active:
+            self.assertEqual(cache.get(cache_key(user.id)), [candidate(idle, 1)])
+        self.assertIsNone(cache.get(cache_key(idle.id)))
+        self.assertIn("Precomputed recommendations for 3 users", out.getvalue())
+
+    def test_logging_in_makes_a_user_active(self):
+        user = CustomUser.objects.create_user(username="alice", password="secret")
+        self.neo4j.read.return_value = []
+
+        response = self.client.post(
+            "/api/users/login/", {"username": "alice", "password": "secret"}, content_type="application/json"
+        )
+        call_command("precompute_recommendations", stdout=StringIO())
+
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+        self.assertEqual(self.neo4j.read.call_args.kwargs["parameters"]["user_ids"], [user.id])
@@ -0,0 +1,60 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from .utils.degrees import FOLLOWERS, FOLLOWING, cache_key
+
+
+def row(user_id, drifted=False, following=0, followers=0, blocked=0):
+    return {
+        "id": user_id, "drifted": drifted,
+        "following": following, "followers": followers, "blocked": blocked,
+    }
+
+
+class ReconcileDegreesTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("user.management.commands.reconcile_degrees.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_walks_every_batch(self):
+        self.neo4j.write.side_effect = [
+            ([row(1), row(4, drifted=True, followers=2)], None),
+            ([row(9)], None),
+            ([], None),
+        ]
+        out = StringIO()
+
+        call_command("reconcile_degrees", "--batch-size=2", stdout=out)
+
+        cursors = [call.kwargs["parameters"]["cursor"] for call in self.neo4j.write.call_args_list]
+        self.assertEqual(cursors, [-1, 4, 9])
+        self.assertIn("Checked 3 users: fixed 1 counters and 0 cache entries", out.getvalue())
+
+    def test_fixes_stale_cache_entries_only(self):
+        cache.set(cache_key(4, FOLLOWERS), 7)
+        cache.set(cache_key(4, FOLLOWING), 1)
+        self.neo4j.write.side_effect = [([row(4, following=1, followers=2)], None), ([], None)]
+        out = StringIO()
+
+        call_command("reconcile_degrees", stdout=out)
+
+        self.assertEqual(cache.get(cache_key(4, FOLLOWERS)), 2)
+        self.assertEqual(cache.get(cache_key(4, FOLLOWING)), 1)
+        # Users that were not cached stay uncached
+        self.assertIsNone(cache.get(cache_key(1, FOLLOWERS)))
+        self.assertIn("fixed 0 counters and 1 cache entries", out.getvalue())
+
+    def test_recounts_drifted_users_under_a_lock(self):
+        self.neo4j.write.return_value = ([], None)
+
+        call_command("reconcile_degrees", stdout=StringIO())
+
+        query = self.neo4j.write.call_args.args[0]
+        self.assertIn("u.followers_count <> followers", query)
+        self.assertIn("u.following_count = COUNT { (u)-[:FOLLOW]->() }", query)
@@ -0,0 +1,377 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from .models import CustomUser, OutboxEvent
+from .utils import relationships
+from .utils.degrees import BLOCKED, FOLLOWERS, FOLLOWING, cache_key
+
+
+def summary(records=(), created=0, deleted=0):
+    """The `(records, counters)` pair returned by `Neo4jConnection.write`."""
+    return list(records), SimpleNamespace(
+        relationships_created=created, relationships_deleted=deleted
+    )
+
+
+class RelationshipViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(username="alice", password="secret")
+        cls.bob = CustomUser.objects.create_user(username="bob", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.alice)
+        patcher = mock.patch("user.views.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("user.utils.blocks.get_redis_connection")
+        self.redis = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_follow(self):
+        self.neo4j.write.return_value = summary([{"blocked": False, "following": 1, "followers": 4}], created=1)
+
+        response = self.client.post("/api/users/follow/bob/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["message"], "You are now following bob")
+        # Checks and MERGE go to Neo4j as a single statement
+        self.neo4j.write.assert_called_once()
+        parameters = self.neo4j.write.call_args.kwargs["parameters"]
+        self.assertEqual(parameters["follower"]["id"], self.alice.id)
+        self.assertEqual(parameters["followee"]["id"], self.bob.id)
+
+    def test_follow_writes_counts_through(self):
+        self.neo4j.write.return_value = summary(
+            [{"blocked": False, "following": 1, "followers": 4}], created=1
+        )
+
+        self.client.post("/api/users/follow/bob/")
+
+        self.assertEqual(cache.get(cache_key(self.alice.id, FOLLOWING)), 1)
+        self.assertEqual(cache.get(cache_key(self.bob.id, FOLLOWERS)), 4)
+
+    def test_unfollow_is_left_to_the_outbox(self):
+        self.alice.following.add(self.bob)
+
+        response = self.client.post("/api/users/unfollow/bob/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.alice.following.exists())
+        self.neo4j.write.assert_not_called()
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.kind, "unfollow")
+        self.assertEqual(event.payload["followee"], "bob")
+
+    def test_follow_when_blocked(self):
+        self.neo4j.write.return_value = summary([{"blocked": True, "following": 0, "followers": 3}])
+
+        response = self.client.post("/api/users/follow/bob/")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_follow_twice(self):
+        self.neo4j.write.return_value = summary([{"blocked": False, "following": 1, "followers": 4}])
+
+        response = self.client.post("/api/users/follow/bob/")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["message"], "You are already following bob")
+
+    def test_follow_user_missing_from_graph(self):
+        # bob's signup has not been relayed yet, so the follow creates his node
+        self.neo4j.write.return_value = summary([{"blocked": False, "following": 1, "followers": 1}], created=1)
+
+        response = self.client.post("/api/users/follow/bob/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("MERGE (u2:User {id: $followee.id})", self.neo4j.write.call_args.args[0])
+        self.assertEqual(self.neo4j.write.call_args.kwargs["parameters"]["followee"], {
+            "id": self.bob.id, "username": "bob", "first_name": "", "last_name": "",
+        })
+
+    def test_block(self):
+        self.neo4j.write.return_value = summary([{
+            "already_blocked": False,
+            "blocker": {"following": 0, "followers": 0, "blocked": 1},
+            "blocked": {"following": 0, "followers": 0},
+        }], created=1, deleted=2)
+
+        response = self.client.post(f"/api/users/block/{self.bob.id}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.neo4j.write.assert_called_once()
+
+    def test_block_twice(self):
+        self.neo4j.write.return_value = summary([{
+            "already_blocked": True,
+            "blocker": {"following": 0, "followers": 0, "blocked": 1},
+            "blocked": {"following": 0, "followers": 0},
+        }])
+
+        response = self.client.post(f"/api/users/block/{self.bob.id}/")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["message"], "You have already blocked bob")
+
+    def test_unblock(self):
+        self.neo4j.write.return_value = summary([{"blocked": 0, "blocked_back": False}], deleted=1)
+
+        response = self.client.post("/api/users/unblock/bob/")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_block_writes_counts_through(self):
+        self.neo4j.write.return_value = summary([{
+            "already_blocked": False,
+            "blocker": {"following": 2, "followers": 5, "blocked": 1},
+            "blocked": {"following": 7, "followers": 0},
+        }], created=1, deleted=2)
+
+        self.client.post(f"/api/users/block/{self.bob.id}/")
+
+        self.assertEqual(cache.get(cache_key(self.alice.id, BLOCKED)), 1)
+        self.assertEqual(cache.get(cache_key(self.alice.id, FOLLOWERS)), 5)
+        self.assertEqual(cache.get(cache_key(self.bob.id, FOLLOWING)), 7)
+
+    def test_block_publishes_both_directions(self):
+        self.neo4j.write.return_value = summary([{
+            "already_blocked": False,
+            "blocker": {"following": 0, "followers": 0, "blocked": 1},
+            "blocked": {"following": 0, "followers": 0},
+        }], created=1)
+
+        self.client.post(f"/api/users/block/{self.bob.id}/")
+
+        pipe = self.redis.pipeline.return_value
+        pipe.sadd.assert_has_calls([mock.call("blocks:alice", "bob"), mock.call("blocks:bob", "alice")])
+        pipe.execute.assert_called_once()
+
+    def test_unblock_unpublishes_the_pair(self):
+        self.neo4j.write.return_value = summary([{"blocked": 0, "blocked_back": False}], deleted=1)
+
+        self.client.post("/api/users/unblock/bob/")
+
+        pipe = self.redis.pipeline.return_value
+        pipe.srem.assert_has_calls([mock.call("blocks:alice", "bob"), mock.call("blocks:bob", "alice")])
+
+    def test_unblock_keeps_the_pair_while_blocked_back(self):
+        self.neo4j.write.return_value = summary([{"blocked": 0, "blocked_back": True}], deleted=1)
+
+        response = self.client.post("/api/users/unblock/bob/")
+
+        self.assertEqual(response.status_code, 200)
+        self.redis.pipeline.assert_not_called()
+
+    def test_unblock_when_not_blocked(self):
+        self.neo4j.write.return_value = summary([{"blocked": 0, "blocked_back": False}])
+
+        response = self.client.post("/api/users/unblock/bob/")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["message"], "bob is not blocked")
+
+
+class RelationshipListTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(username="alice", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.alice)
+        patcher = mock.patch("user.pagination.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("user.utils.degrees.neo4j_connection")
+        self.degrees = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.degrees.read.return_value = [{"following": 3, "followers": 3, "blocked": 3}]
+
+    def users(self, *ids):
+        return [{"id": i, "username": f"user{i}"} for i in ids]
+
+    def test_first_page(self):
+        self.neo4j.read.return_value = self.users(2, 5, 9)
+
+        response = self.client.get("/api/users/followers/alice/?limit=2")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            {"results": self.users(2, 5), "next_cursor": 5, "count": 3},
+        )
+        parameters = self.neo4j.read.call_args.kwargs["parameters"]
+        self.assertEqual(parameters, {"user_id": self.alice.id, "cursor": -1, "limit": 3})
+
+    def test_last_page(self):
+        self.neo4j.read.return_value = self.users(9)
+
+        response = self.client.get("/api/users/following/alice/?cursor=5&limit=2")
+
+        self.assertEqual(response.data["results"], self.users(9))
+        self.assertIsNone(response.data["next_cursor"])
+        self.assertEqual(self.neo4j.read.call_args.kwargs["parameters"]["cursor"], 5)
+
+    def test_limit_is_capped(self):
+        self.neo4j.read.return_value = []
+
+        self.client.get("/api/users/blocked-list/?limit=100000")
+
+        self.assertEqual(self.neo4j.read.call_args.kwargs["parameters"]["limit"], 501)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/users/following/alice/?cursor=abc")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_counts_are_cached(self):
+        self.neo4j.read.return_value = []
+
+        self.client.get("/api/users/followers/alice/")
+        self.client.get("/api/users/followers/alice/")
+
+        self.degrees.read.assert_called_once()
+
+    @mock.patch("user.views.neo4j_connection")
+    def test_follow_updates_cached_counts(self, views_neo4j):
+        CustomUser.objects.create_user(username="bob", password="secret")
+        self.neo4j.read.return_value = []
+        self.client.get("/api/users/followers/bob/")
+        views_neo4j.write.return_value = summary(
+            [{"blocked": False, "following": 1, "followers": 4}], created=1
+        )
+
+        self.client.post("/api/users/follow/bob/")
+        response = self.client.get("/api/users/followers/bob/")
+
+        self.assertEqual(response.data["count"], 4)
+        self.degrees.read.assert_called_once()
+
+
+class ProfileCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(username="alice", password="secret")
+        cls.bob = CustomUser.objects.create_user(username="bob", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.alice)
+        patcher = mock.patch("user.utils.degrees.neo4j_connection")
+        self.degrees = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.degrees.read.return_value = [{"followers": 12, "following": 3}]
+
+    @mock.patch("user.utils.relationships.neo4j_connection")
+    def test_profile_includes_counts(self, relationships_neo4j):
+        relationships_neo4j.read.return_value = []
+
+        response = self.client.get("/api/users/profile/bob/")
+
+        self.assertEqual(response.data["followers"], 12)
+        self.assertEqual(response.data["following"], 3)
+        self.assertFalse(response.data["is_following"])
+        # Both counters come from one read of the node
+        self.degrees.read.assert_called_once()
+        self.assertEqual(self.degrees.read.call_args.kwargs["parameters"], {"user_id": self.bob.id})
+
+    def test_own_profile_includes_counts(self):
+        response = self.client.get("/api/users/profile/")
+
+        self.assertEqual(response.data["followers"], 12)
+        self.assertEqual(response.data["following"], 3)
+
+    def test_counts_are_cached(self):
+        self.client.get("/api/users/profile/")
+        self.client.get("/api/users/profile/")
+
+        self.degrees.read.assert_called_once()
+
+
+def status(username, following=False, followed_by=False, blocking=False, blocked_by=False):
+    return {
+        "username": username, "following": following, "followed_by": followed_by,
+        "blocking": blocking, "blocked_by": blocked_by,
+    }
+
+
+class RelationshipStatusTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(username="alice", password="secret")
+        cls.bob = CustomUser.objects.create_user(username="bob", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.alice)
+        patcher = mock.patch("user.utils.relationships.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_query_for_every_username(self):
+        self.neo4j.read.return_value = [
+            status("bob", following=True, followed_by=True),
+            status("carol", blocked_by=True),
+        ]
+
+        response = self.client.post(
+            "/api/users/relationships/",
+            {"usernames": ["bob", "carol", "nobody", "bob"]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["relationships"], {
+            "bob": {"following": True, "followed_by": True, "blocking": False, "blocked_by": False},
+            "carol": {"following": False, "followed_by": False, "blocking": False, "blocked_by": True},
+        })
+        self.neo4j.read.assert_called_once()
+        self.assertEqual(
+            self.neo4j.read.call_args.kwargs["parameters"],
+            {"viewer_id": self.alice.id, "usernames": ["bob", "carol", "nobody"]},
+        )
+
+    def test_only_uncached_usernames_are_queried(self):
+        self.neo4j.read.return_value = [status("bob", following=True)]
+        self.client.post("/api/users/relationships/", {"usernames": ["bob"]}, format="json")
+        self.neo4j.read.return_value = [status("carol")]
+
+        response = self.client.post(
+            "/api/users/relationships/", {"usernames": ["bob", "carol"]}, format="json"
+        )
+
+        self.assertTrue(response.data["relationships"]["bob"]["following"])
+        self.assertEqual(self.neo4j.read.call_args.kwargs["parameters"]["usernames"], ["carol"])
+
+    @mock.patch("user.views.neo4j_connection")
+    def test_follow_invalidates_both_directions(self, views_neo4j):
+        cache.set(relationships.cache_key(self.alice.id, "bob"), status("bob"))
+        cache.set(relationships.cache_key(self.bob.id, "alice"), status("alice"))
+        views_neo4j.write.return_value = summary(
+            [{"blocked": False, "following": 1, "followers": 1}], created=1
+        )
+
+        self.client.post("/api/users/follow/bob/")
+
+        self.assertIsNone(cache.get(relationships.cache_key(self.alice.id, "bob")))
+        self.assertIsNone(cache.get(relationships.cache_key(self.bob.id, "alice")))
+
+    def test_rejects_too_many_usernames(self):
+        response = self.client.post(
+            "/api/users/relationships/",
+            {"usernames": [f"user{i}" for i in range(301)]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.neo4j.read.assert_not_called()
+
+    def test_rejects_empty_list(self):
+        response = self.client.post("/api/users/relationships/", {"usernames": []}, format="json")
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import io
+
+from django.test import SimpleTestCase
+from drf_orjson import ORJSONParser, ORJSONRenderer
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+
+def followers_list(size=100):
+    """Build a payload shaped like a `FollowersListView` response."""
+    return [
+        {
+            "id": i,
+            "username": f"user{i}",
+            "first_name": "Zoë",
+            "last_name": "O'Brien \U0001F41D",
+            "profile_image": "",
+        }
+        for i in range(size)
+    ]
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """
+    The orjson renderer must produce exactly the bytes of DRF's JSONRenderer.
+    """
+
+    def assertSameBytes(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_followers_list(self):
+        self.assertSameBytes(followers_list())
+
+    def test_profile_and_errors(self):
+        self.assertSameBytes({
+            "id": 7,
+            "username": "alice",
+            "bio": None,
+            "profile_image": None,
+            "username_errors": [ErrorDetail("A user with that username already exists.", code="invalid")],
+        })
+
+    def test_datetimes_and_decimals(self):
+        self.assertSameBytes({
+            "date_joined": datetime.datetime(2024, 11, 30, 18, 22, 1, 5, tzinfo=datetime.timezone.utc),
+            "last_login": datetime.datetime(2024, 11, 30, 18, 22, 1),
+            "score": decimal.Decimal("3.25"),
+        })
+
+    def test_exponent_floats(self):
+        self.assertSameBytes({
+            "tiny": 1e-7,
+            "small": 2.5e-05,
+            "huge": 1e16,
+            "ratio": [0.0001, 1.5e300, -3e-5],
+            "decimal": decimal.Decimal("1E-7"),
+        })
+
+    def test_non_finite_floats_render_as_null(self):
+        # JSONRenderer raises instead; orjson cannot tell them apart from None in its output
+        for value in (float("nan"), float("inf"), -float("inf")):
+            self.assertEqual(ORJSONRenderer().render({"score": value}), b'{"score":null}')
+
+    def test_line_separators_are_escaped(self):
+        self.assertSameBytes({"bio": "line\u2028break\u2029paragraph"})
+
+
+class ORJSONParserTests(SimpleTestCase):
+
+    def test_matches_json_parser(self):
+        body = JSONRenderer().render({"username": "alice", "password": "p@ss wörd", "bio": None})
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"username": '))
@@ -0,0 +1,35 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+
+class SyncBlockedPairsTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("user.management.commands.sync_blocked_pairs.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("user.management.commands.sync_blocked_pairs.get_redis_connection")
+        self.redis = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.pipe = self.redis.pipeline.return_value
+        self.pipe.__len__.return_value = 0
+
+    def test_rebuilds_sets_and_drops_stale_ones(self):
+        self.neo4j.stream.return_value = iter([
+            {"username": "alice", "blocked": ["bob", "carol"]},
+            {"username": "bob", "blocked": ["alice"]},
+        ])
+        self.redis.scan_iter.return_value = [b"blocks:alice", b"blocks:bob", b"blocks:dave"]
+        out = StringIO()
+
+        call_command("sync_blocked_pairs", stdout=out)
+
+        self.pipe.delete.assert_has_calls([mock.call("blocks:alice"), mock.call("blocks:bob")])
+        self.pipe.sadd.assert_has_calls([
+            mock.call("blocks:alice", "bob", "carol"),
+            mock.call("blocks:bob", "alice"),
+        ])
+        self.redis.delete.assert_called_once_with(b"blocks:dave")
+        self.assertIn("Wrote 2 block sets, removed 1 stale ones", out.getvalue())
@@ -0,0 +1,70 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from .management.commands.sync_graph import SYNC_BLOCKS, SYNC_FOLLOWS, checkpoint_key
+from .models import CustomUser
+from .outbox import CREATE_USERS
+
+
+class SyncGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(username=name, password="secret", first_name=name.title())
+            for name in ["alice", "bob", "carol"]
+        ]
+        alice, bob, carol = cls.users
+        alice.following.add(bob, carol)
+        carol.blocked_users.add(bob)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch("user.management.commands.sync_graph.neo4j_connection")
+        self.neo4j = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def batches(self, query):
+        return [
+            call.kwargs["parameters"]["rows"]
+            for call in self.neo4j.write.call_args_list if call.args[0] == query
+        ]
+
+    def test_syncs_users_and_edges_in_batches(self):
+        alice, bob, carol = self.users
+        out = StringIO()
+
+        call_command("sync_graph", batch_size=2, stdout=out)
+
+        users = self.batches(CREATE_USERS)
+        self.assertEqual([len(batch) for batch in users], [2, 1])
+        self.assertEqual(
+            users[0][0],
+            {"user_id": alice.id, "username": "alice", "first_name": "Alice", "last_name": ""},
+        )
+        self.assertEqual(self.batches(SYNC_FOLLOWS), [[
+            {"follower_id": alice.id, "followee_id": bob.id},
+            {"follower_id": alice.id, "followee_id": carol.id},
+        ]])
+        self.assertEqual(self.batches(SYNC_BLOCKS), [[{"blocker_id": carol.id, "blocked_id": bob.id}]])
+        self.assertIn("Synced 3 users", out.getvalue())
+        # A finished run leaves nothing to resume
+        self.assertIsNone(cache.get(checkpoint_key("users")))
+
+    def test_resume_skips_synced_rows(self):
+        cache.set(checkpoint_key("users"), self.users[1].id)
+
+        call_command("sync_graph", resume=True, stdout=StringIO())
+
+        self.assertEqual([row["username"] for row in self.batches(CREATE_USERS)[0]], ["carol"])
+
+    def test_failed_batch_keeps_the_checkpoint(self):
+        self.neo4j.write.side_effect = [None, Exception("Neo4j unavailable")]
+
+        with self.assertRaises(Exception):
+            call_command("sync_graph", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(cache.get(checkpoint_key("users")), self.users[1].id)
@@ -11,8 +11,12 @@ from .views import (
     BlockedListView,
     FollowingListView,
     FollowersListView,
+    RelationshipStatusView,
+    RecommendationsView,
+    AuthorCardsView,
     LogoutView,
     HealthCheckView,
+    ReadinessView,
 )
 
 urlpatterns = [
@@ -35,5 +39,13 @@ urlpatterns = [
     path(
         "followers/<str:username>/", FollowersListView.as_view(), name="followers_list"
     ),
+    path(
+        "relationships/", RelationshipStatusView.as_view(), name="relationship_status"
+    ),
+    path(
+        "recommendations/", RecommendationsView.as_view(), name="recommendations"
+    ),
+    path("profiles/", AuthorCardsView.as_view(), name="author_cards"),
     path("health/", HealthCheckView.as_view(), name="health_check"),
+    path("ready/", ReadinessView.as_view(), name="readiness_check"),
 ]
@@ -0,0 +1,21 @@
+"""
+Tells post-service when a user's author card (display name, avatar) changes.
+
+post-service caches cards per process and evicts the username published on
+`author_cards`, see post/authors.py there.
+"""
+import logging
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "author_cards"
+
+
+def publish_profile_change(username):
+    try:
+        get_redis_connection("default").publish(CHANNEL, username)
+    except RedisError as e:
+        logger.error(f"Error publishing profile change for {username}: {str(e)}")
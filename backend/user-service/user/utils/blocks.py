@@ -0,0 +1,39 @@
+"""
+Each user's block set, published to Redis for post-service.
+
+`blocks:<username>` holds the usernames that user blocks or is blocked by, so
+post-service can hide either side's posts and comments with one SMEMBERS.
+The keys bypass the cache's KEY_PREFIX because both services read them.
+`sync_blocked_pairs` rebuilds every set from Neo4j.
+"""
+import logging
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+def key(username):
+    return f"blocks:{username}"
+
+
+def add_block(blocker, blocked):
+    try:
+        pipe = get_redis_connection("default").pipeline()
+        pipe.sadd(key(blocker.username), blocked.username)
+        pipe.sadd(key(blocked.username), blocker.username)
+        pipe.execute()
+    except RedisError as e:
+        logger.error(f"Error publishing block of {blocked.username} by {blocker.username}: {str(e)}")
+
+
+def remove_block(blocker, blocked):
+    """Call only once neither user blocks the other."""
+    try:
+        pipe = get_redis_connection("default").pipeline()
+        pipe.srem(key(blocker.username), blocked.username)
+        pipe.srem(key(blocked.username), blocker.username)
+        pipe.execute()
+    except RedisError as e:
+        logger.error(f"Error publishing unblock of {blocked.username} by {blocker.username}: {str(e)}")
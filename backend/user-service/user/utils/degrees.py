@@ -0,0 +1,66 @@
+"""
+Follower, following and blocked counts for a user.
+
+Each :User node carries `following_count`, `followers_count` and
+`blocked_count`. The follow, unfollow, block and unblock statements recompute
+them from Neo4j's degree store in the same transaction, and the views write the
+new values through to the cache. `reconcile_degrees` repairs any drift.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .neo4j_conn import neo4j_connection
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+BLOCKED = "blocked"
+
+PATTERNS = {
+    FOLLOWING: "(u)-[:FOLLOW]->()",
+    FOLLOWERS: "(u)<-[:FOLLOW]-()",
+    BLOCKED: "(u)-[:BLOCK]->()",
+}
+
+PROPERTIES = {
+    FOLLOWING: "following_count",
+    FOLLOWERS: "followers_count",
+    BLOCKED: "blocked_count",
+}
+
+
+def cache_key(user_id, kind):
+    return f"degree:{kind}:{user_id}"
+
+
+def get_degrees(user_id, *kinds):
+    """Return {kind: count}, reading the counters from Neo4j only on a cache miss."""
+    keys = {kind: cache_key(user_id, kind) for kind in kinds}
+    cached = cache.get_many(keys.values())
+    degrees = {kind: cached[key] for kind, key in keys.items() if key in cached}
+    missing = [kind for kind in kinds if kind not in degrees]
+    if missing:
+        # Nodes written before the counters existed fall back to the degree store
+        columns = ", ".join(
+            f"coalesce(u.{PROPERTIES[kind]}, COUNT {{ {PATTERNS[kind]} }}) AS {kind}"
+            for kind in missing
+        )
+        records = neo4j_connection.read(
+            f"MATCH (u:User {{id: $user_id}}) RETURN {columns}",
+            parameters={"user_id": user_id},
+        )
+        fetched = {kind: records[0][kind] if records else 0 for kind in missing}
+        store_degrees(user_id, fetched)
+        degrees.update(fetched)
+    return degrees
+
+
+def get_degree(user_id, kind):
+    return get_degrees(user_id, kind)[kind]
+
+
+def store_degrees(user_id, degrees):
+    """Cache counts returned by a relationship change, so readers never see the old value."""
+    cache.set_many(
+        {cache_key(user_id, kind): degree for kind, degree in degrees.items()},
+        timeout=settings.DEGREE_CACHE_TTL,
+    )
@@ -1,28 +1,140 @@
-from neo4j import GraphDatabase
-from django.conf import settings
 import os
+import threading
+import time
+
+from neo4j import GraphDatabase, READ_ACCESS, unit_of_work
+from django.conf import settings
+
+from ..metrics import NEO4J_TRANSACTION_WAIT, SERVICE, track
+from ..profiling import profile_query
 
 
 class Neo4jConnection:
-    def __init__(self, uri, username, password):
+    def __init__(
+        self,
+        uri,
+        username,
+        password,
+        database=None,
+        max_connection_pool_size=100,
+        connection_acquisition_timeout=60.0,
+        max_connection_lifetime=3600,
+    ):
         if not uri or not username or not password:
             raise ValueError("Missing Neo4j connection parameters. Ensure NEO4J_URI, NEO4J_USERNAME, and NEO4J_PASSWORD are set.")
 
-        self._driver = GraphDatabase.driver(uri, auth=(username, password))
+        self._uri = uri
+        self._auth = (username, password)
+        self._database = database
+        self._driver_config = {
+            "max_connection_pool_size": max_connection_pool_size,
+            "connection_acquisition_timeout": connection_acquisition_timeout,
+            "max_connection_lifetime": max_connection_lifetime,
+        }
+        self._driver = None
+        self._bookmark_manager = None
+        self._pid = None
+        self._lock = threading.Lock()
 
+    @property
+    def driver(self):
+        """
+        The driver for this process, created on first use. A driver inherited
+        through fork shares the parent's sockets, so a new process builds its own.
+        """
+        if self._driver is None or self._pid != os.getpid():
+            with self._lock:
+                if self._driver is None or self._pid != os.getpid():
+                    self._driver = GraphDatabase.driver(
+                        self._uri, auth=self._auth, **self._driver_config
+                    )
+                    # Shared by every session of this process, so a read routed to a
+                    # replica waits until it has caught up with our earlier writes
+                    self._bookmark_manager = GraphDatabase.bookmark_manager()
+                    self._pid = os.getpid()
+        return self._driver
 
     def close(self):
-        self._driver.close()
+        if self._driver is not None and self._pid == os.getpid():
+            self._driver.close()
+        self._driver = None
+        self._pid = None
+
+    def reset(self):
+        """Forget the current driver, e.g. in a worker process forked from the one that built it."""
+        self._driver = None
+        self._pid = None
+
+    def verify_connectivity(self):
+        self.driver.verify_connectivity()
+
+    def session(self, **config):
+        driver = self.driver
+        return driver.session(
+            database=self._database, bookmark_manager=self._bookmark_manager, **config
+        )
 
     def query(self, query, parameters=None):
-        with self._driver.session() as session:
+        with track("neo4j"), profile_query("neo4j", query), self.session() as session:
             result = session.run(query, parameters)
             return [record for record in result]
 
+    def _transaction(self, access_mode, query, parameters):
+        requested = time.perf_counter()
+        attempts = 0
+
+        def work(tx):
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                NEO4J_TRANSACTION_WAIT.labels(SERVICE, access_mode).observe(
+                    time.perf_counter() - requested
+                )
+            result = tx.run(query, parameters)
+            records = list(result)
+            return records, result.consume().counters
+
+        return work
+
+    def read(self, query, parameters=None, timeout=None):
+        """
+        Run `query` in a managed read transaction, routed to a read replica when
+        the URI uses the `neo4j://` scheme. Returns the records. With `timeout`
+        the server aborts the transaction after that many seconds.
+        """
+        work = self._transaction("read", query, parameters)
+        if timeout is not None:
+            work = unit_of_work(timeout=timeout)(work)
+        with track("neo4j"), profile_query("neo4j", query), self.session() as session:
+            records, _ = session.execute_read(work)
+            return records
+
+    def write(self, query, parameters=None):
+        """
+        Run `query` in a managed write transaction, retried by the driver on
+        transient errors. Returns the records and the summary's counters.
+        """
+        work = self._transaction("write", query, parameters)
+        with track("neo4j"), profile_query("neo4j", query), self.session() as session:
+            return session.execute_write(work)
+
+    def stream(self, query, parameters=None, fetch_size=1000):
+        """
+        Yield the records of a read query as they arrive, `fetch_size` at a time,
+        instead of holding the whole result in memory. Runs as an auto-commit
+        transaction: a half-consumed stream cannot be retried.
+        """
+        with self.session(default_access_mode=READ_ACCESS, fetch_size=fetch_size) as session:
+            yield from session.run(query, parameters)
+
 
-# Initialize the connection using settings
+# Configured here, connected on the first query
 neo4j_connection = Neo4jConnection(
     uri=settings.NEO4J_URI,
     username=settings.NEO4J_USERNAME,
-    password=settings.NEO4J_PASSWORD
+    password=settings.NEO4J_PASSWORD,
+    database=settings.NEO4J_DATABASE,
+    max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+    connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
 )
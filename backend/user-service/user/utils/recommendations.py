@@ -0,0 +1,109 @@
+"""
+"Who to follow" suggestions: users followed by the people a user follows.
+
+Candidates are ranked by how many of the user's follows also follow them,
+boosted for users who logged in recently. Users already followed and users
+blocked in either direction are left out. `precompute_recommendations` caches
+the lists of active users; anyone else gets theirs computed on demand, within
+RECOMMENDATIONS_TIMEOUT.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from neo4j.exceptions import Neo4jError
+
+from ..models import CustomUser
+from .neo4j_conn import neo4j_connection
+
+logger = logging.getLogger(__name__)
+
+# Two hops out, expanding only the first $max_friends follows of each user so
+# that accounts following thousands of others stay cheap
+CANDIDATES_QUERY = """
+    UNWIND $user_ids AS user_id
+    MATCH (viewer:User {id: user_id})
+    CALL {
+        WITH viewer
+        MATCH (viewer)-[:FOLLOW]->(friend:User)
+        WITH viewer, friend LIMIT $max_friends
+        MATCH (friend)-[:FOLLOW]->(candidate:User)
+        WHERE candidate <> viewer
+          AND NOT EXISTS { (viewer)-[:FOLLOW]->(candidate) }
+          AND NOT EXISTS { (viewer)-[:BLOCK]-(candidate) }
+        WITH candidate, count(DISTINCT friend) AS mutuals
+        ORDER BY mutuals DESC, candidate.id
+        LIMIT $limit
+        RETURN collect({id: candidate.id, username: candidate.username, mutuals: mutuals}) AS candidates
+    }
+    RETURN viewer.id AS user_id, candidates
+"""
+
+
+def cache_key(user_id):
+    return f"recommendations:{user_id}"
+
+
+def find_candidates(user_ids, timeout=None):
+    """Map each user id to its candidates, most mutual follows first."""
+    records = neo4j_connection.read(
+        CANDIDATES_QUERY,
+        parameters={
+            "user_ids": user_ids,
+            "max_friends": settings.RECOMMENDATIONS_MAX_FRIENDS,
+            # Leave room for recent activity to reorder the list
+            "limit": settings.RECOMMENDATIONS_SIZE * 3,
+        },
+        timeout=timeout,
+    )
+    return {record["user_id"]: record["candidates"] for record in records}
+
+
+def rank(candidates_by_user):
+    """Score every candidate and keep each user's top RECOMMENDATIONS_SIZE."""
+    candidate_ids = {
+        candidate["id"] for candidates in candidates_by_user.values() for candidate in candidates
+    }
+    last_login = dict(
+        CustomUser.objects.filter(id__in=candidate_ids).values_list("id", "last_login")
+    )
+    now = timezone.now()
+
+    def score(candidate):
+        # Up to double weight for a login today, fading out over RECENT_ACTIVITY_DAYS
+        login = last_login.get(candidate["id"])
+        recency = 0.0
+        if login:
+            recency = max(0.0, 1 - (now - login).days / settings.RECENT_ACTIVITY_DAYS)
+        return candidate["mutuals"] * (1 + recency)
+
+    return {
+        user_id: sorted(candidates, key=score, reverse=True)[:settings.RECOMMENDATIONS_SIZE]
+        for user_id, candidates in candidates_by_user.items()
+    }
+
+
+def store_recommendations(rankings):
+    cache.set_many(
+        {cache_key(user_id): ranking for user_id, ranking in rankings.items()},
+        timeout=settings.RECOMMENDATIONS_CACHE_TTL,
+    )
+
+
+def get_recommendations(user_id):
+    recommendations = cache.get(cache_key(user_id))
+    if recommendations is None:
+        try:
+            candidates = find_candidates([user_id], timeout=settings.RECOMMENDATIONS_TIMEOUT)
+        except Neo4jError as e:
+            # Usually the time budget ran out; suggestions are not worth a failed page
+            logger.error(f"Error computing recommendations for user {user_id}: {str(e)}")
+            return []
+        recommendations = rank(candidates).get(user_id, [])
+        store_recommendations({user_id: recommendations})
+    return recommendations
+
+
+def invalidate_recommendations(*user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,57 @@
+"""
+Follow and block status between a viewer and other users.
+
+Statuses are cached per (viewer, username) pair for
+`RELATIONSHIP_CACHE_TTL` seconds. Views that change a relationship call
+`invalidate_relationship` so both users see the change at once.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .neo4j_conn import neo4j_connection
+
+STATUS_QUERY = """
+    MATCH (viewer:User {id: $viewer_id})
+    UNWIND $usernames AS username
+    MATCH (other:User {username: username})
+    RETURN other.username AS username,
+           EXISTS { (viewer)-[:FOLLOW]->(other) } AS following,
+           EXISTS { (other)-[:FOLLOW]->(viewer) } AS followed_by,
+           EXISTS { (viewer)-[:BLOCK]->(other) } AS blocking,
+           EXISTS { (other)-[:BLOCK]->(viewer) } AS blocked_by
+"""
+
+
+def cache_key(viewer_id, username):
+    return f"relationship:{viewer_id}:{username}"
+
+
+def get_relationships(viewer_id, usernames):
+    """Return {username: status} for every username that exists in the graph."""
+    keys = {username: cache_key(viewer_id, username) for username in usernames}
+    cached = cache.get_many(keys.values())
+    statuses = {username: cached[key] for username, key in keys.items() if key in cached}
+    missing = [username for username in keys if username not in statuses]
+    if missing:
+        records = neo4j_connection.read(
+            STATUS_QUERY, parameters={"viewer_id": viewer_id, "usernames": missing}
+        )
+        fetched = {
+            record["username"]: {
+                "following": record["following"],
+                "followed_by": record["followed_by"],
+                "blocking": record["blocking"],
+                "blocked_by": record["blocked_by"],
+            }
+            for record in records
+        }
+        cache.set_many(
+            {keys[username]: status for username, status in fetched.items()},
+            timeout=settings.RELATIONSHIP_CACHE_TTL,
+        )
+        statuses.update(fetched)
+    return statuses
+
+
+def invalidate_relationship(user, other):
+    cache.delete_many([cache_key(user.id, other.username), cache_key(other.id, user.username)])
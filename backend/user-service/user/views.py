@@ -4,17 +4,30 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from .models import CustomUser
+from .outbox import UNFOLLOW, apply_pending_unfollows, record, user_node
+from .pagination import Neo4jCursorPagination
 from .serializers import (
     UserSignupSerializer,
     UserLoginSerializer,
     UserProfileSerializer,
     UpdateProfileSerializer,
     FollowSerializer,
+    RelationshipStatusSerializer,
+    AuthorCardSerializer,
 )
 from django.contrib.auth.models import User
+from .utils.authors import publish_profile_change
+from .utils.blocks import add_block, remove_block
+from .utils.degrees import BLOCKED, FOLLOWERS, FOLLOWING, get_degree, get_degrees, store_degrees
 from .utils.neo4j_conn import neo4j_connection
+from .utils.recommendations import get_recommendations, invalidate_recommendations
+from .utils.relationships import get_relationships, invalidate_relationship
+from .warmup import warm_up
 
 
 class SignupView(APIView):
@@ -38,6 +51,8 @@ class LoginView(APIView):
                 password=serializer.validated_data["password"],
             )
             if user:
+                # Recommendations rank and precompute by recent logins
+                update_last_login(None, user)
                 refresh = RefreshToken.for_user(user)
                 return Response(
                     {
@@ -84,13 +99,23 @@ class UserProfileView(APIView):
             try:
                 user = get_object_or_404(CustomUser, username=username)
                 serializer = UserProfileSerializer(user)
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                data = serializer.data
+                data.update(get_degrees(user.id, FOLLOWERS, FOLLOWING))
+                if user.id != request.user.id:
+                    # Follower lists are paginated, so they can no longer answer this
+                    relationship = get_relationships(request.user.id, [user.username])
+                    data["is_following"] = bool(
+                        relationship.get(user.username, {}).get("following")
+                    )
+                return Response(data, status=status.HTTP_200_OK)
             except User.DoesNotExist:
                 return Response(
                     {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
                 )
         serializer = UserProfileSerializer(request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = serializer.data
+        data.update(get_degrees(request.user.id, FOLLOWERS, FOLLOWING))
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class UpdateProfileView(APIView):
@@ -102,74 +127,106 @@ class UpdateProfileView(APIView):
         )
         if serializer.is_valid():
             serializer.save()
+            publish_profile_change(request.user.username)
             return Response(
                 {"message": "Profile updated successfully"}, status=status.HTTP_200_OK
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FollowUserView(APIView):
-    permission_classes = [IsAuthenticated]
+# Most authors a single /profiles/ request may ask for
+MAX_AUTHOR_CARDS = 100
 
-    def post(self, request, username):
-        try:
-            user_to_follow = get_object_or_404(CustomUser, username=username)
 
-            query_check_block = """
-                MATCH (u1:User {id: $user1_id})-[rel:BLOCK]->(u2:User {id: $user2_id})
-                RETURN rel
-            """
+class AuthorCardsView(APIView):
+    # Names and avatars are public, so a forwarded token is not even looked up
+    authentication_classes = []
 
-            blocked_by_you = neo4j_connection.query(
-                query_check_block,
-                parameters={"user1_id": request.user.id, "user2_id": user_to_follow.id},
+    def get(self, request):
+        usernames = [name for name in request.query_params.get("usernames", "").split(",") if name]
+        if not usernames:
+            return Response(
+                {"error": "usernames is required"}, status=status.HTTP_400_BAD_REQUEST
             )
-            blocked_by_them = neo4j_connection.query(
-                query_check_block,
-                parameters={"user1_id": user_to_follow.id, "user2_id": request.user.id},
+        if len(usernames) > MAX_AUTHOR_CARDS:
+            return Response(
+                {"error": f"At most {MAX_AUTHOR_CARDS} usernames per request"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-            # If a block exists, return an error response
-            if blocked_by_you or blocked_by_them:
-                return Response(
-                    {"error": "Follow action not allowed due to block relationship."},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
+        users = CustomUser.objects.filter(username__in=set(usernames)).only(
+            "username", "first_name", "last_name", "profile_image"
+        )
+        cards = AuthorCardSerializer(users, many=True).data
+        return Response(
+            {"profiles": {card["username"]: card for card in cards}},
+            status=status.HTTP_200_OK,
+        )
 
-            query_check = """
-                MATCH (u1:User {id: $follower_id})-[r:FOLLOW]->(u2:User {id: $followee_id})
-                RETURN r
-            """
-            existing_relation = neo4j_connection.query(
-                query_check,
-                parameters={
-                    "follower_id": request.user.id,
-                    "followee_id": user_to_follow.id,
-                },
-            )
 
-            if existing_relation:
-                return Response(
-                    {"message": f"You are already following {user_to_follow.username}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+class FollowUserView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, username):
+        try:
+            user_to_follow = get_object_or_404(CustomUser, username=username)
 
+            # An unfollow still in the outbox would make this look like a duplicate
+            apply_pending_unfollows(request.user, user_to_follow)
+
+            # Block check, duplicate check, MERGE and counters in one transaction.
+            # The first SET write-locks both users, so concurrent follows
+            # cannot read stale degrees. Users whose signup the outbox relay has
+            # not reached yet get their node here.
             query = """
-                MATCH (u1:User {id: $follower_id}), (u2:User {id: $followee_id})
-                CREATE (u1)-[:FOLLOW]->(u2)
+                MERGE (u1:User {id: $follower.id})
+                ON CREATE SET u1 += $follower
+                MERGE (u2:User {id: $followee.id})
+                ON CREATE SET u2 += $followee
+                SET u1.following_count = coalesce(u1.following_count, 0),
+                    u2.followers_count = coalesce(u2.followers_count, 0)
+                WITH u1, u2
+                OPTIONAL MATCH (u1)-[block:BLOCK]-(u2)
+                WITH u1, u2, count(block) AS blocks
+                OPTIONAL MATCH (u1)-[existing:FOLLOW]->(u2)
+                WITH u1, u2, blocks, count(existing) AS follows
+                FOREACH (ignored IN CASE WHEN blocks = 0 AND follows = 0 THEN [1] ELSE [] END |
+                    MERGE (u1)-[follow:FOLLOW]->(u2)
+                    ON CREATE SET follow.followed_at = $followed_at
+                )
+                SET u1.following_count = COUNT { (u1)-[:FOLLOW]->() },
+                    u2.followers_count = COUNT { (u2)<-[:FOLLOW]-() }
+                RETURN blocks > 0 AS blocked,
+                       u1.following_count AS following, u2.followers_count AS followers
             """
 
-            neo4j_connection.query(
+            records, counters = neo4j_connection.write(
                 query,
                 parameters={
-                    "follower_id": request.user.id,
-                    "followee_id": user_to_follow.id,
+                    "follower": user_node(request.user),
+                    "followee": user_node(user_to_follow),
+                    # Compared with when later unfollows were recorded, see user/outbox.py
+                    "followed_at": timezone.now().timestamp(),
                 },
             )
 
+            store_degrees(request.user.id, {FOLLOWING: records[0]["following"]})
+            store_degrees(user_to_follow.id, {FOLLOWERS: records[0]["followers"]})
+            if counters.relationships_created:
+                invalidate_relationship(request.user, user_to_follow)
+                invalidate_recommendations(request.user.id)
+                return Response(
+                    {"message": f"You are now following {user_to_follow.username}"},
+                    status=status.HTTP_200_OK,
+                )
+            if records[0]["blocked"]:
+                return Response(
+                    {"error": "Follow action not allowed due to block relationship."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
             return Response(
-                {"message": f"You are now following {user_to_follow.username}"},
-                status=status.HTTP_200_OK,
+                {"message": f"You are already following {user_to_follow.username}"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
         except CustomUser.DoesNotExist:
@@ -189,20 +246,15 @@ class UnfollowUserView(APIView):
         try:
             user_to_unfollow = get_object_or_404(CustomUser, username=username)
 
-            query = """
-                MATCH (u1:User {id: $follower_id})-[r:FOLLOW]->(u2:User {id: $followee_id})
-                DELETE r
-            """
-
-            neo4j_connection.query(
-                query,
-                parameters={
+            # The graph edge, counters and caches are updated by relay_outbox
+            with transaction.atomic():
+                request.user.following.remove(user_to_unfollow)
+                record(UNFOLLOW, {
                     "follower_id": request.user.id,
+                    "follower": request.user.username,
                     "followee_id": user_to_unfollow.id,
-                },
-            )
-
-            request.user.following.remove(user_to_unfollow)
+                    "followee": user_to_unfollow.username,
+                })
             return Response(
                 {"message": f"You unfollowed {user_to_unfollow.username}"},
                 status=status.HTTP_200_OK,
@@ -220,56 +272,61 @@ class BlockUserView(APIView):
         try:
             user_to_block = get_object_or_404(CustomUser, id=username)
 
-            query_check = """
-                MATCH (u1:User {id: $blocker_id})-[rel:BLOCK]->(u2:User {id: $blocked_id})
-                RETURN rel
-            """
-
-            result = neo4j_connection.query(
-                query_check,
-                parameters={
-                    "blocker_id": request.user.id,
-                    "blocked_id": user_to_block.id,
-                },
-            )
-
-            if result:
-                return Response(
-                    {"message": f"You have already blocked {user_to_block.username}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            query_unfollow = """
-                MATCH (u1:User {id: $user1_id})-[rel:FOLLOW]->(u2:User {id: $user2_id})
-                DELETE rel
-            """
-            # Unfollow from both sides
-            neo4j_connection.query(
-                query_unfollow,
-                parameters={"user1_id": request.user.id, "user2_id": user_to_block.id},
-            )
-            neo4j_connection.query(
-                query_unfollow,
-                parameters={"user1_id": user_to_block.id, "user2_id": request.user.id},
-            )
-
-            # Add block relationship in Neo4j
+            # Creates the block and removes follows in both directions, unless already
+            # blocked. Both users are write-locked before their degrees are read.
             query = """
-                MATCH (u1:User {id: $blocker_id}), (u2:User {id: $blocked_id})
-                CREATE (u1)-[:BLOCK]->(u2)
+                MERGE (u1:User {id: $blocker.id})
+                ON CREATE SET u1 += $blocker
+                MERGE (u2:User {id: $blocked.id})
+                ON CREATE SET u2 += $blocked
+                SET u1.following_count = coalesce(u1.following_count, 0),
+                    u1.followers_count = coalesce(u1.followers_count, 0),
+                    u1.blocked_count = coalesce(u1.blocked_count, 0),
+                    u2.following_count = coalesce(u2.following_count, 0),
+                    u2.followers_count = coalesce(u2.followers_count, 0)
+                WITH u1, u2
+                OPTIONAL MATCH (u1)-[existing:BLOCK]->(u2)
+                WITH u1, u2, count(existing) AS blocks
+                OPTIONAL MATCH (u1)-[follow:FOLLOW]-(u2)
+                WITH u1, u2, blocks, collect(follow) AS follows
+                FOREACH (ignored IN CASE WHEN blocks = 0 THEN [1] ELSE [] END |
+                    MERGE (u1)-[:BLOCK]->(u2)
+                )
+                FOREACH (follow IN CASE WHEN blocks = 0 THEN follows ELSE [] END |
+                    DELETE follow
+                )
+                SET u1.following_count = COUNT { (u1)-[:FOLLOW]->() },
+                    u1.followers_count = COUNT { (u1)<-[:FOLLOW]-() },
+                    u1.blocked_count = COUNT { (u1)-[:BLOCK]->() },
+                    u2.following_count = COUNT { (u2)-[:FOLLOW]->() },
+                    u2.followers_count = COUNT { (u2)<-[:FOLLOW]-() }
+                RETURN blocks > 0 AS already_blocked,
+                       u1 {following: u1.following_count, followers: u1.followers_count,
+                           blocked: u1.blocked_count} AS blocker,
+                       u2 {following: u2.following_count, followers: u2.followers_count} AS blocked
             """
 
-            neo4j_connection.query(
+            records, counters = neo4j_connection.write(
                 query,
                 parameters={
-                    "blocker_id": request.user.id,
-                    "blocked_id": user_to_block.id,
+                    "blocker": user_node(request.user),
+                    "blocked": user_node(user_to_block),
                 },
             )
 
+            store_degrees(request.user.id, records[0]["blocker"])
+            store_degrees(user_to_block.id, records[0]["blocked"])
+            if counters.relationships_created:
+                invalidate_relationship(request.user, user_to_block)
+                invalidate_recommendations(request.user.id, user_to_block.id)
+                add_block(request.user, user_to_block)
+                return Response(
+                    {"message": f"You have blocked {user_to_block.username}"},
+                    status=status.HTTP_200_OK,
+                )
             return Response(
-                {"message": f"You have blocked {user_to_block.username}"},
-                status=status.HTTP_200_OK,
+                {"message": f"You have already blocked {user_to_block.username}"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
         except CustomUser.DoesNotExist:
             return Response(
@@ -284,38 +341,35 @@ class UnblockUserView(APIView):
         try:
             user_to_unblock = get_object_or_404(CustomUser, username=username)
 
-            query_check = """
-                MATCH (u1:User {id: $blocker_id})-[rel:BLOCK]->(u2:User {id: $blocked_id})
-                RETURN rel
+            query = """
+                MATCH (u1:User {id: $blocker_id}), (u2:User {id: $blocked_id})
+                SET u1.blocked_count = coalesce(u1.blocked_count, 0)
+                WITH u1, u2
+                OPTIONAL MATCH (u1)-[rel:BLOCK]->(u2)
+                DELETE rel
+                WITH DISTINCT u1, u2
+                SET u1.blocked_count = COUNT { (u1)-[:BLOCK]->() }
+                RETURN u1.blocked_count AS blocked,
+                       EXISTS { (u2)-[:BLOCK]->(u1) } AS blocked_back
             """
 
-            result = neo4j_connection.query(
-                query_check,
+            records, counters = neo4j_connection.write(
+                query,
                 parameters={
                     "blocker_id": request.user.id,
                     "blocked_id": user_to_unblock.id,
                 },
             )
 
-            if not result:
+            if not counters.relationships_deleted:
                 return Response(
                     {"message": f"{user_to_unblock.username} is not blocked"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-
-            # Remove block relationship in Neo4j
-            query = """
-                MATCH (u1:User {id: $blocker_id})-[rel:BLOCK]->(u2:User {id: $blocked_id})
-                DELETE rel
-            """
-
-            neo4j_connection.query(
-                query,
-                parameters={
-                    "blocker_id": request.user.id,
-                    "blocked_id": user_to_unblock.id,
-                },
-            )
+            store_degrees(request.user.id, {BLOCKED: records[0]["blocked"]})
+            invalidate_relationship(request.user, user_to_unblock)
+            if not records[0]["blocked_back"]:
+                remove_block(request.user, user_to_unblock)
 
             return Response(
                 {"message": f"You have unblocked {user_to_unblock.username}"},
@@ -327,46 +381,68 @@ class UnblockUserView(APIView):
             )
 
 
+class RelationshipStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = RelationshipStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Usernames missing from the graph are left out of the response
+        relationships = get_relationships(
+            request.user.id, list(dict.fromkeys(serializer.validated_data["usernames"]))
+        )
+        return Response({"relationships": relationships}, status=status.HTTP_200_OK)
+
+
+class RecommendationsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(
+            {"results": get_recommendations(request.user.id)}, status=status.HTTP_200_OK
+        )
+
+
 class BlockedListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        paginator = Neo4jCursorPagination(request)
         query = """
-            MATCH (u1:User {id: $user_id})-[rel:BLOCK]->(u2:User)
-            RETURN u2.id AS id, u2.username AS username, u2.first_name AS first_name, u2.last_name AS last_name
+            MATCH (:User {id: $user_id})-[:BLOCK]->(u:User)
+            WHERE u.id > $cursor
+            RETURN u.id AS id, u.username AS username,
+                   coalesce(u.first_name, '') AS first_name, coalesce(u.last_name, '') AS last_name
+            ORDER BY u.id
+            LIMIT $limit
         """
-        blocked_users = neo4j_connection.query(
-            query, parameters={"user_id": request.user.id}
+        blocked_users = paginator.paginate(query, {"user_id": request.user.id})
+        return paginator.get_paginated_response(
+            blocked_users, get_degree(request.user.id, BLOCKED)
         )
 
-        response = {"blocked_users": [dict(record) for record in blocked_users]}
-        return Response(response, status=status.HTTP_200_OK)
-
 
 class FollowingListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, username=None):
         user = get_object_or_404(CustomUser, username=username)
-
+        paginator = Neo4jCursorPagination(request)
         query = """
-            MATCH (u1:User {id: $user_id})-[:FOLLOW]->(u2:User)
-            RETURN u2
+            MATCH (:User {id: $user_id})-[:FOLLOW]->(u:User)
+            WHERE u.id > $cursor
+            RETURN u.id AS id, u.username AS username,
+                   coalesce(u.first_name, '') AS first_name, coalesce(u.last_name, '') AS last_name,
+                   coalesce(u.profile_image, '') AS profile_image
+            ORDER BY u.id
+            LIMIT $limit
         """
-        results = neo4j_connection.query(query, parameters={"user_id": user.id})
-
-        following_users = [
-            {
-                "id": record["u2"]["id"],
-                "username": record["u2"]["username"],
-                "first_name": record["u2"].get("first_name", ""),
-                "last_name": record["u2"].get("last_name", ""),
-                "profile_image": record["u2"].get("profile_image", ""),
-            }
-            for record in results
-        ]
-
-        return Response(following_users, status=status.HTTP_200_OK)
+        following_users = paginator.paginate(query, {"user_id": user.id})
+        return paginator.get_paginated_response(
+            following_users, get_degree(user.id, FOLLOWING)
+        )
 
 
 class FollowersListView(APIView):
@@ -374,24 +450,18 @@ class FollowersListView(APIView):
 
     def get(self, request, username=None):
         user = get_object_or_404(CustomUser, username=username)
+        paginator = Neo4jCursorPagination(request)
         query = """
-            MATCH (u1:User)-[:FOLLOW]->(u2:User {id: $user_id})
-            RETURN u1
+            MATCH (u:User)-[:FOLLOW]->(:User {id: $user_id})
+            WHERE u.id > $cursor
+            RETURN u.id AS id, u.username AS username,
+                   coalesce(u.first_name, '') AS first_name, coalesce(u.last_name, '') AS last_name,
+                   coalesce(u.profile_image, '') AS profile_image
+            ORDER BY u.id
+            LIMIT $limit
         """
-        results = neo4j_connection.query(query, parameters={"user_id": user.id})
-
-        followers = [
-            {
-                "id": record["u1"]["id"],
-                "username": record["u1"]["username"],
-                "first_name": record["u1"].get("first_name", ""),
-                "last_name": record["u1"].get("last_name", ""),
-                "profile_image": record["u1"].get("profile_image", ""),
-            }
-            for record in results
-        ]
-
-        return Response(followers, status=status.HTTP_200_OK)
+        followers = paginator.paginate(query, {"user_id": user.id})
+        return paginator.get_paginated_response(followers, get_degree(user.id, FOLLOWERS))
 
 
 class HealthCheckView(APIView):
@@ -408,7 +478,7 @@ class HealthCheckView(APIView):
 
             # Check Neo4j connection by running a simple query
             query = "MATCH (n) RETURN n LIMIT 1"
-            neo4j_connection.query(query)
+            neo4j_connection.read(query)
 
             return Response(
                 {
@@ -422,3 +492,20 @@ class HealthCheckView(APIView):
                 {"status": "unhealthy", "error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class ReadinessView(APIView):
+    """
+    Readiness endpoint for the user service.
+    Reports ready only once this worker's connections are warm.
+    """
+
+    permission_classes = []
+
+    def get(self, request):
+        if warm_up():
+            return Response({"status": "ready"})
+        return Response(
+            {"status": "warming up"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
@@ -0,0 +1,65 @@
+"""
+Per-process connection lifecycle for the production server.
+
+Clients are created lazily on first use. The app is imported once in the
+gunicorn master and then forked, so anything the master did open is discarded
+in each worker before use. Workers then open their own MySQL and Neo4j
+connections before reporting ready.
+"""
+import logging
+import threading
+
+from django.core.cache import caches
+from django.db import connections
+
+from .utils.neo4j_conn import neo4j_connection
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_lock = threading.Lock()
+
+
+def reset_connections():
+    """Drop clients inherited from the parent process. Called right after fork."""
+    _ready.clear()
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+    for backend in caches.all(initialized_only=True):
+        backend.close()
+    # Never close the inherited driver here, that would close the parent's sockets
+    neo4j_connection.reset()
+
+
+def close_connections():
+    """Close the MySQL, Redis and Neo4j connections owned by this process."""
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+    for backend in caches.all(initialized_only=True):
+        backend.close()
+    neo4j_connection.close()
+
+
+def warm_up():
+    """
+    Open the MySQL and Neo4j connections.
+    Returns True once the process is ready to serve traffic.
+    """
+    if _ready.is_set():
+        return True
+    with _lock:
+        if _ready.is_set():
+            return True
+        try:
+            connections["default"].ensure_connection()
+            neo4j_connection.verify_connectivity()
+        except Exception as e:
+            logger.error(f"Warm-up failed: {str(e)}")
+            return False
+        _ready.set()
+        logger.info("Warm-up complete, worker is ready")
+        return True
+
+
+def is_ready():
+    return _ready.is_set()
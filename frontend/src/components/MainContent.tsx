@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import Post from "./shared/Post";
+import Post, { Author } from "./shared/Post";
 
 interface PostData {
   id: string;
@@ -9,6 +9,7 @@ interface PostData {
   likes: number;
   comments_count: number;
   image: string;
+  author?: Author | null;
 }
 
 interface ApiResponse {
@@ -112,6 +113,7 @@ const MainContent: React.FC<MainContentProps> = ({ refreshTrigger }) => {
           likes={post.likes}
           comments_count={post.comments_count}
           image={post.image}
+          author={post.author}
         />
       ))}
     </div>
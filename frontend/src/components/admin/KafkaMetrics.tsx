@@ -12,11 +12,17 @@ import {
   BarChart,
 } from "@tremor/react";
 
+export interface ConsumerGroupLag {
+  lag: number;
+  topics: Record<string, number>;
+}
+
 interface KafkaMetricsProps {
   metrics: {
     broker_count: number;
     topic_count: number;
     partition_count: number;
+    consumer_groups?: Record<string, ConsumerGroupLag>;
   };
 }
 
@@ -153,6 +159,25 @@ export function KafkaMetrics({ metrics }: KafkaMetricsProps) {
         />
       </Card>
 
+      <Card>
+        <Title>Consumer Lag</Title>
+        <Text className="mt-2">Records each consumer group has yet to process</Text>
+        {Object.entries(metrics.consumer_groups ?? {}).map(([group, { lag, topics }]) => (
+          <div key={group} className="mt-4">
+            <Flex>
+              <Text className="font-medium">{group}</Text>
+              <Badge color={lag > 0 ? "orange" : "emerald"}>{lag}</Badge>
+            </Flex>
+            {Object.entries(topics).map(([topic, topicLag]) => (
+              <Flex key={topic} className="mt-1">
+                <Text className="text-sm text-gray-500">{topic}</Text>
+                <Text className="text-sm">{topicLag}</Text>
+              </Flex>
+            ))}
+          </div>
+        ))}
+      </Card>
+
       <Card>
         <Title>Cluster Utilization</Title>
         <Metric className="mt-2">{utilizationPercentage.toFixed(1)}%</Metric>
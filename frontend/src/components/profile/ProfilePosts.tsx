@@ -1,4 +1,4 @@
-import Post from "../shared/Post";
+import Post, { Author } from "../shared/Post";
 import { useEffect, useState } from "react";
 
 interface ProfilePostsProps {
@@ -13,6 +13,7 @@ interface PostType {
   likes: number;
   comments_count: number;
   image?: string;
+  author?: Author | null;
 }
 
 export const ProfilePosts: React.FC<ProfilePostsProps> = ({ username }) => {
@@ -3,9 +3,17 @@ import { Heart, MessageCircle, User, Trash2 } from "lucide-react";
 import { formatDistanceToNowStrict } from "date-fns";
 import { useNavigate } from "react-router-dom";
 
+// Embedded by post-service; null when the author card is unavailable
+export interface Author {
+  username: string;
+  display_name: string;
+  avatar_url: string | null;
+}
+
 interface Comment {
   id: string;
   username: string;
+  author?: Author | null;
   content: string;
   created_at: string;
 }
@@ -18,6 +26,7 @@ interface PostProps {
   likes: number;
   comments_count: number;
   image?: string;
+  author?: Author | null;
 }
 
 const Post: React.FC<PostProps> = ({
@@ -28,6 +37,7 @@ const Post: React.FC<PostProps> = ({
   likes: initialLikes,
   comments_count: initialCommentsCount,
   image,
+  author,
 }) => {
   const [showComments, setShowComments] = useState(false);
   const [comments, setComments] = useState<Comment[]>([]);
@@ -176,7 +186,11 @@ const Post: React.FC<PostProps> = ({
     setAvatarErrors((prev) => new Set([...prev, username]));
   };
 
-  const renderAvatar = (username: string, size: "small" | "large") => {
+  const renderAvatar = (
+    username: string,
+    size: "small" | "large",
+    author?: Author | null
+  ) => {
     const dimensions = size === "small" ? "w-8 h-8" : "w-10 h-10";
     return avatarErrors.has(username) ? (
       <div
@@ -186,7 +200,7 @@ const Post: React.FC<PostProps> = ({
       </div>
     ) : (
       <img
-        src={`/images/avatar/${username}.jpg`}
+        src={author?.avatar_url || `/images/avatar/${username}.jpg`}
         alt={`${username}'s Avatar`}
         className={`${dimensions} rounded-full`}
         onError={() => handleAvatarError(username)}
@@ -202,7 +216,7 @@ const Post: React.FC<PostProps> = ({
             className="cursor-pointer mr-4"
             onClick={() => navigateToProfile(username)}
           >
-            {renderAvatar(username, "large")}
+            {renderAvatar(username, "large", author)}
           </div>
           <div className="flex-1">
             <div className="flex items-center justify-between">
@@ -210,7 +224,7 @@ const Post: React.FC<PostProps> = ({
                 className="font-semibold cursor-pointer hover:underline"
                 onClick={() => navigateToProfile(username)}
               >
-                {username}
+                {author?.display_name || username}
               </h3>
               <span className="text-sm text-gray-500">{formattedTime}</span>
             </div>
@@ -276,7 +290,7 @@ const Post: React.FC<PostProps> = ({
                         className="cursor-pointer"
                         onClick={() => navigateToProfile(comment.username)}
                       >
-                        {renderAvatar(comment.username, "small")}
+                        {renderAvatar(comment.username, "small", comment.author)}
                       </div>
                       <div className="flex-1">
                         <div className="flex items-start justify-between">
@@ -284,7 +298,7 @@ const Post: React.FC<PostProps> = ({
                             className="font-semibold cursor-pointer hover:underline"
                             onClick={() => navigateToProfile(comment.username)}
                           >
-                            {comment.username}
+                            {comment.author?.display_name || comment.username}
                           </div>
                           {currentUser === comment.username && (
                             <button
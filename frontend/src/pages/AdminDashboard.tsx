@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 import { ServiceHealth } from "@/components/admin/ServiceHealth";
-import { KafkaMetrics } from "@/components/admin/KafkaMetrics";
+import { KafkaMetrics, type ConsumerGroupLag } from "@/components/admin/KafkaMetrics";
 import { SystemMetrics } from "@/components/admin/SystemMetrics";
 import {
   Card,
@@ -35,6 +35,7 @@ interface DashboardData {
       broker_count: number;
       topic_count: number;
       partition_count: number;
+      consumer_groups?: Record<string, ConsumerGroupLag>;
     };
   };
   timestamp: string;
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import Post from "@/components/shared/Post";
+import Post, { Author } from "@/components/shared/Post";
 import { Card } from "@/components/ui/card";
 
 interface Post {
@@ -10,6 +10,7 @@ interface Post {
   username: string;
   likes: number;
   comments_count: number;
+  author?: Author | null;
 }
 
 const Explore = () => {
@@ -83,6 +84,7 @@ const Explore = () => {
             likes={post.likes}
             comments_count={post.comments_count}
             image={post.image}
+            author={post.author}
           />
         ))
       )}
@@ -28,8 +28,6 @@ const Profile: React.FC = () => {
 
   const profileUrl = `${BASE_URL}profile/${username}/`;
   const currentUserUrl = `${BASE_URL}profile/`;
-  const followersUrl = `${BASE_URL}followers/${username}/`;
-  const followingUrl = `${BASE_URL}following/${username}/`;
 
   useEffect(() => {
     const fetchProfile = async () => {
@@ -72,29 +70,10 @@ const Profile: React.FC = () => {
         };
 
         setProfile(transformedProfile);
+        setIsFollowing(Boolean(profileData.is_following));
+        setFollowersCount(profileData.followers);
+        setFollowingCount(profileData.following);
 
-        const followersResponse = await fetch(followersUrl, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (followersResponse.ok) {
-          const followersData = await followersResponse.json();
-
-          setFollowersCount(followersData.length);
-          setIsFollowing(
-            followersData.some(
-              (follower: any) => follower.username === currentUserData.username
-            )
-          );
-        }
-
-        // Fetch following count
-        const followingResponse = await fetch(followingUrl, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (followingResponse.ok) {
-          const followingData = await followingResponse.json();
-          setFollowingCount(followingData.length);
-        }
       } catch (err: any) {
         setError(err.message);
       } finally {
@@ -103,7 +82,7 @@ const Profile: React.FC = () => {
     };
 
     fetchProfile();
-  }, [currentUserUrl, profileUrl, followersUrl, followingUrl]);
+  }, [currentUserUrl, profileUrl]);
 
   const handleFollow = async () => {
     try {